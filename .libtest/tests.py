@@ -1,5 +1,30 @@
+import ast
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
-from flk import Parser
+from unittest import mock
+from flk import AsyncParser, Parser, CircularImportError
+from flk.cache import FileCache
+from flk.check import check_files
+from flk.codegen import generate, write_module
+from flk.expression import CompiledExpression
+from flk.fileio import atomic_write_many
+from flk.journal import EditJournal
+from flk.layers import overlay
+from flk.parallel import parse_many
+from flk.serializer import dump, load_binary
+from flk.server import Server
+from flk.shared import attach, publish_shared
+from flk.transaction import Transaction
+from flk.variable import Variable
+from flk.watcher import Watcher
+from flk.lexer import tokenize, ASSIGN, CONST, IMPORT
+from flk.syntax import build_module, Assignment, Expression, RawString
 
 class TestParser(unittest.TestCase):
 
@@ -51,5 +76,1226 @@ class TestParser(unittest.TestCase):
         self.assertEqual(var_type, 'float') 
         self.assertEqual(var_value, 3.0)
 
+
+class TestVariable(unittest.TestCase):
+
+    def test_get_value_copies_containers(self):
+        items = [1, 2]
+        variable = Variable("list", items)
+        value = variable.get_value()
+        value.append(3)
+        self.assertEqual(items, [1, 2])
+        self.assertEqual(Variable("float", 3).get_value(), 3.0)
+        text = Variable("str", "text")
+        self.assertIs(text.get_value(), text.value)
+
+    def test_get_view(self):
+        variable = Variable("dict", {"a": 1})
+        view = variable.get_view()
+        self.assertIs(variable.get_view(), view)
+        with self.assertRaises(TypeError):
+            view["a"] = 2
+        self.assertEqual(Variable("list", [1, 2]).get_view(), (1, 2))
+        variable.set_value({"b": 2})
+        self.assertEqual(dict(variable.get_view()), {"b": 2})
+        self.assertFalse(hasattr(variable, "__dict__"))
+
+
+class TestLexer(unittest.TestCase):
+
+    def test_tokenize(self):
+        source = (
+            "# comment\n"
+            "/*\nblock\n*/\n"
+            "(import) sub.module\n"
+            "const PI(float) = 3.14\n"
+            "my_dict(dict) = {\n"
+            "    a(key): b(int) = 1\n"
+            "}\n"
+        )
+        tokens = tokenize(source)
+        self.assertEqual([token.kind for token in tokens], [IMPORT, CONST, ASSIGN])
+        self.assertEqual(tokens[0].value, "sub.module")
+        self.assertEqual(tokens[2].value, "{ a(key): b(int) = 1 }")
+        self.assertEqual(tokens[2].line, 7)
+        self.assertEqual(source[tokens[2].start:tokens[2].end], "my_dict(dict) = {\n    a(key): b(int) = 1\n}")
+
+    def test_build_module(self):
+        module = build_module(tokenize('s(str) = "text"\nn(int) = $a + 1\n'))
+        self.assertIsInstance(module.statements[0], Assignment)
+        self.assertIsInstance(module.statements[0].value, RawString)
+        self.assertIsInstance(module.statements[1].value, Expression)
+
+    def test_unclosed_brace(self):
+        with self.assertRaises(ValueError):
+            tokenize("my_dict(dict) = {\n    a(key): b(int) = 1\n")
+
+    def test_parse_file_result(self):
+        data = Parser().parse_file("test.fl")
+        self.assertEqual(data["my_string"], '"Hello, world!"')
+        self.assertEqual(data["my_dict"], {"key_name_1": "Value String", "key_name_2": 1})
+        self.assertEqual(data["my_tuple"], (1, "string", True))
+        self.assertEqual(data["my_diff"], -9)
+        self.assertIs(data["my_logic_bool"], True)
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, "main.fl")
+        os.makedirs(os.path.join(self.tempdir.name, "sub"))
+        with open(os.path.join(self.tempdir.name, "sub", "module.fl"), "w", encoding="utf-8") as file:
+            file.write("base(int) = 2\n")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) sub.module\ntotal(int) = $base * 3\n")
+
+    def test_cache_hit(self):
+        first = Parser(cache=True).parse_file(self.path)
+        cache = FileCache()
+        second = Parser(cache=cache).parse_file(self.path)
+        self.assertEqual(first, second)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(os.path.exists(cache.cache_path(self.path)))
+
+    def test_cache_invalidated_by_import(self):
+        Parser(cache=True).parse_file(self.path)
+        with open(os.path.join(self.tempdir.name, "sub", "module.fl"), "w", encoding="utf-8") as file:
+            file.write("base(int) = 5\n")
+        cache = FileCache()
+        data = Parser(cache=cache).parse_file(self.path)
+        self.assertEqual(data["total"], 15)
+        self.assertEqual(cache.hits, 0)
+
+    def test_edit_after_cache_hit(self):
+        Parser(cache=True).parse_file(self.path)
+        cache = FileCache()
+        parser = Parser(cache=cache)
+        parser.parse_file(self.path)
+        self.assertEqual(cache.hits, 1)
+        parser.edit_var_value("base", "5")
+        self.assertEqual(parser.get_var("total").get_value(), 15)
+        self.assertEqual(Parser().parse_file(self.path)["total"], 15)
+
+    def test_foreign_record_is_miss(self):
+        Parser(cache=True).parse_file(self.path)
+        cache = FileCache()
+        cache_path = cache.cache_path(self.path)
+        with open(cache_path, "rb") as file:
+            content = file.read()
+        with open(cache_path, "wb") as file:
+            file.write(content.replace(b"Assignment", b"Assignmenz"))
+        self.assertEqual(Parser(cache=cache).parse_file(self.path)["total"], 6)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+
+class TestImports(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tempdir.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_diamond_import_parsed_once(self):
+        self.write("common.fl", "counter(int) = 1\n")
+        self.write("left.fl", "(import) common\nleft(int) = $counter + 1\n")
+        self.write("right.fl", "(import) common\nright(int) = $counter + 2\n")
+        path = self.write("main.fl", "(import) left\n(import) right\n")
+        parser = Parser()
+        read = []
+        read_source = parser.read_source
+        parser.read_source = lambda filename: read.append(filename) or read_source(filename)
+        data = parser.parse_file(path)
+        self.assertEqual(data, {"counter": 1, "left": 2, "right": 3})
+        self.assertEqual(len(read), 4)
+        self.assertEqual(len(parser.modules), 4)
+
+    def test_import_cycle(self):
+        self.write("a.fl", "(import) b\na(int) = 1\n")
+        self.write("b.fl", "(import) a\nb(int) = 2\n")
+        with self.assertRaises(CircularImportError) as context:
+            Parser().parse_file(os.path.join(self.tempdir.name, "a.fl"))
+        self.assertEqual([os.path.basename(path) for path in context.exception.cycle], ["a.fl", "b.fl", "a.fl"])
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        with open(os.path.join(tempdir.name, "module.fl"), "w", encoding="utf-8") as file:
+            file.write("base(int) = 2\n")
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) module\ntotal(int) = $base * 3\nitems(list) = [1, 2]\n")
+
+    def test_stats(self):
+        parser = Parser(profile=True)
+        self.assertEqual(parser.parse_file(self.path), {"base": 2, "total": 6, "items": [1, 2]})
+        stats = parser.stats()
+        self.assertEqual(stats["counters"]["files_opened"], 2)
+        self.assertEqual(stats["counters"]["lines_parsed"], 6)
+        self.assertEqual(stats["counters"]["expressions_evaluated"], 1)
+        self.assertEqual(stats["phases"]["imports"]["calls"], 1)
+        self.assertEqual(list(stats["imports"]), ["module"])
+        self.assertEqual(set(stats["variables"]), {"base", "total", "items"})
+        self.assertAlmostEqual(stats["total"], stats["files"][os.path.abspath(self.path)]["time"])
+        parser.profiler.reset()
+        self.assertEqual(parser.stats()["counters"]["files_opened"], 0)
+
+    def test_disabled(self):
+        parser = Parser()
+        self.assertNotIn("read_source", vars(parser))
+        with self.assertRaises(ValueError):
+            parser.stats()
+
+
+class TestParseMany(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.paths = []
+        for name, content in (("a.fl", "shared(int) = 1\na(int) = $shared + 1\n"),
+                              ("b.fl", "shared(int) = 2\nb(str) = text\n")):
+            path = os.path.join(self.tempdir.name, name)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(content)
+            self.paths.append(path)
+
+    def test_per_file(self):
+        result = parse_many(self.paths, workers=2)
+        self.assertEqual(list(result), self.paths)
+        self.assertEqual(result[self.paths[0]], {"shared": 1, "a": 2})
+        self.assertEqual(parse_many(self.paths, workers=1), result)
+
+    def test_merge_conflicts(self):
+        self.assertEqual(parse_many(self.paths, workers=2, merge=True)["shared"], 2)
+        self.assertEqual(parse_many(self.paths, merge=True, conflicts="first", threads=True)["shared"], 1)
+        with self.assertRaises(ValueError):
+            parse_many(self.paths, merge=True, conflicts="error")
+
+    def test_worker_error(self):
+        self.write_cycle()
+        with self.assertRaises(CircularImportError) as context:
+            parse_many(self.paths + [os.path.join(self.tempdir.name, "c.fl")], workers=2)
+        self.assertEqual(len(context.exception.cycle), 3)
+
+    def write_cycle(self):
+        for name, other in (("c", "d"), ("d", "c")):
+            with open(os.path.join(self.tempdir.name, name + ".fl"), "w", encoding="utf-8") as file:
+                file.write(f"(import) {other}\n")
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("const LIMIT(int) = 10\ncount(int) = 1\nitems(set) = {1, 2}\n")
+        self.server = Server([self.path])
+
+    def test_stream(self):
+        requests = ['{"op": "get", "key": "items"}', '{"op": "set", "key": "count", "value": 5}',
+                    '{"op": "get", "key": "LIMIT"}', "not json", '{"op": "get", "key": "missing"}']
+        output = io.StringIO()
+        self.server.serve_stream(io.StringIO("\n".join(requests) + "\n"), output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([response["ok"] for response in responses], [True, True, True, False, False])
+        self.assertEqual(sorted(responses[0]["value"]), [1, 2])
+        self.assertEqual([responses[1]["value"], responses[2]["value"]], [5, 10])
+        self.assertEqual(Parser().parse_file(self.path)["count"], 5)
+
+    def test_set_json_values(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write('greeting(str) = hi\nhosts(list) = ["a"]\nlimits(dict) = {}\ntotal(int) = 0\n')
+        server = Server([self.path])
+        self.assertEqual(server.handle({"op": "set", "key": "greeting", "value": "bye"})["value"], "bye")
+        self.assertEqual(list(server.handle({"op": "set", "key": "hosts", "value": ["b", "c"]})["value"]), ["b", "c"])
+        self.assertEqual(server.handle({"op": "set", "key": "items", "value": [3]})["value"], {3})
+        self.assertEqual(server.handle({"op": "set", "key": "limits", "value": {"cpu": 2}})["value"], {"cpu": 2})
+        self.assertEqual(server.handle({"op": "set", "key": "total", "source": "$count"})["value"], 1)
+        self.assertFalse(server.handle({"op": "set", "key": "total", "source": 5})["ok"])
+        self.assertFalse(server.handle({"op": "set", "key": "total", "value": "many"})["ok"])
+        self.assertEqual(server.handle({"op": "get", "key": "greeting"})["value"], "bye")
+        data = Parser().parse_file(self.path)
+        self.assertEqual([data["items"], data["hosts"], data["limits"], data["total"]],
+                         [{3}, ["b", "c"], {"cpu": 2}, 1])
+
+    def test_file_required(self):
+        other = os.path.join(os.path.dirname(self.path), "other.fl")
+        with open(other, "w", encoding="utf-8") as file:
+            file.write("count(int) = 2\n")
+        self.server.load(other)
+        self.assertFalse(self.server.handle({"op": "get", "key": "count"})["ok"])
+        self.assertEqual(self.server.handle({"op": "get", "key": "count", "file": other})["value"], 2)
+
+
+class TestExpression(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = Parser()
+        self.parser.parse_constant_line('const FACTOR(int) = 3')
+        self.parser.data["name"] = Variable("str", "flk")
+        self.parser.parse_line('items(list) = [1, 2]')
+        self.parser.parse_line('size(int) = 4')
+        self.parser.parse_line('table(dict) = { key(key): value(int) = 5 }')
+
+    def test_arithmetic(self):
+        self.assertEqual(self.parser.evaluate_expression("-$size ** 2 + FACTOR * (2 - 1) // 2"), -15)
+        self.assertEqual(self.parser.evaluate_expression("$size / 3"), 1.33333)
+        self.assertEqual(self.parser.evaluate_expression("$table.key * 2"), 10)
+
+    def test_strings_and_collections(self):
+        self.assertEqual(self.parser.evaluate_expression("$name + '-' + \"config\""), "flk-config")
+        self.assertEqual(self.parser.evaluate_expression("$items + $items"), [1, 2, 1, 2])
+
+    def test_compiled_once(self):
+        compiled = CompiledExpression("$size * FACTOR + 2 * 3", self.parser.constants)
+        self.assertEqual(compiled.references, {"size"})
+        self.assertEqual(compiled.evaluate(lambda name, reference: 10), 36)
+        self.parser.evaluate_expression("$size * 2")
+        self.parser.evaluate_expression("$items * 2")
+        self.assertEqual(len(self.parser.expression_templates), 1)
+        with mock.patch("builtins.eval", side_effect=AssertionError):
+            self.parser.data["size"].set_value(5)
+            self.assertEqual(self.parser.evaluate_expression("$size * 2"), 10)
+
+    def test_invalid(self):
+        for expression in ("1 +", "(1", "$size $size", "1 ? 2", "UNKNOWN * 2"):
+            with self.assertRaises(ValueError):
+                self.parser.evaluate_expression(expression)
+
+
+class TestLiteral(unittest.TestCase):
+
+    def test_nested(self):
+        parser = Parser()
+        parser.parse_line('nested(list) = [[1, 2], (3, "a, b"), { x(key): y(list) = [4, -5] }, []]')
+        parser.parse_line('negative(list) = [-1, 2.5]')
+        parser.parse_line('empty(tuple) = ()')
+        self.assertEqual(parser.get_var("nested").get_value(), [[1, 2], (3, "a, b"), {"x": [4, -5]}, []])
+        self.assertEqual(parser.get_var("negative").get_value(), [-1, 2.5])
+        self.assertEqual(parser.get_var("empty").get_value(), ())
+
+    def test_nested_dict_key_types(self):
+        parser = Parser()
+        parser.parse_line('top(dict) = {a(str): v(int) = 1}')
+        parser.parse_line('nested(list) = [{a(str): v(int) = 1}, {"b", "c"}]')
+        self.assertEqual(parser.get_var("nested").get_value(), [parser.get_var("top").get_value(), {"b", "c"}])
+
+    def test_numeric_arrays(self):
+        parser = Parser(numeric_arrays="array")
+        parser.parse_line('ints(list) = [1, -2, 3]')
+        parser.parse_line('floats(list) = [0.5, 1.5]')
+        parser.parse_line('mixed(list) = [1, 2.5, "three"]')
+        self.assertEqual(parser.data["ints"].value.typecode, "q")
+        self.assertEqual(parser.data["floats"].value.typecode, "d")
+        self.assertEqual(parser.get_var("ints").get_value(), [1, -2, 3])
+        self.assertEqual(parser.get_var("mixed").get_value(), [1, 2.5, "three"])
+        view = parser.get_view("floats")
+        self.assertEqual(view.tolist(), [0.5, 1.5])
+        with self.assertRaises(TypeError):
+            view[0] = 2.0
+        with self.assertRaises(ValueError):
+            Parser(numeric_arrays="matrix")
+
+
+class TestSerializer(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.folder = tempdir.name
+        self.path = os.path.join(self.folder, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("# comment\nconst LIMIT(int) = 10\nbase(int) = 1\nderived(int) = $base * 2\nname(str) = flk\n")
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    def test_dump_round_trip(self):
+        values = {
+            "text": "a - b",
+            "negative": -0.000001,
+            "items": [1, "x, y", (2.5, True), {"key": [-1]}],
+            "table": {"inner": {"deep": "v"}, "flag": False},
+            "tags": {1, 2},
+        }
+        path = os.path.join(self.folder, "out.fl")
+        dump(values, path)
+        self.assertEqual(Parser().parse_file(path), values)
+        with self.assertRaises(ValueError):
+            dump({"bad": "a // b"}, path)
+        self.assertEqual(Parser().parse_file(path), values)
+
+    def test_binary_and_json(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        parser.save(os.path.join(self.folder, "out.flb"))
+        parser.save(os.path.join(self.folder, "out.json"))
+        loaded = load_binary(os.path.join(self.folder, "out.flb"))
+        self.assertEqual(loaded.constants, {"LIMIT": 10})
+        self.assertEqual({name: variable.value for name, variable in loaded.data.items()},
+                         {"base": 1, "derived": 2, "name": "flk"})
+        self.assertEqual(json.loads(self.read(os.path.join(self.folder, "out.json"))),
+                         {"base": 1, "derived": 2, "name": "flk"})
+
+    def test_save_in_place(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        parser.data["base"].set_value(5)
+        parser.data["extra"] = Variable("list", [1, 2])
+        del parser.data["name"]
+        parser.save()
+        parser.save()
+        self.assertEqual(self.read(self.path), "# comment\nconst LIMIT(int) = 10\nbase(int) = 5\n"
+                                               "derived(int) = $base * 2\n\nextra(list) = [1, 2]\n")
+        self.assertEqual(parser.get_var("derived").get_value(), 10)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("const SCALE(int) = 2\na(int) = 1\nb(int) = $a * SCALE\nitems(list) = [1, 2]\n")
+
+    def test_copy_on_write(self):
+        parser = Parser(snapshots=True)
+        parser.parse_file(self.path)
+        first = parser.snapshot()
+        self.assertEqual(dict(first), {"a": 1, "b": 2, "items": (1, 2)})
+        self.assertEqual(first.constants["SCALE"], 2)
+        parser.edit_var_value("a", 5)
+        second = parser.snapshot()
+        self.assertEqual((first["a"], first["b"]), (1, 2))
+        self.assertEqual((second["a"], second["b"]), (5, 10))
+        self.assertIs(second["items"], first["items"])
+        self.assertGreater(second.version, first.version)
+        with self.assertRaises(RuntimeError):
+            with parser.transaction():
+                parser.edit_var_value("a", 7)
+                self.assertIs(parser.snapshot(), second)
+                raise RuntimeError
+        self.assertIs(parser.snapshot(), second)
+        with self.assertRaises(ValueError):
+            Parser().snapshot()
+
+    def test_concurrent_readers(self):
+        parser = Parser(snapshots=True)
+        parser.parse_file(self.path)
+        errors = []
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                snapshot = parser.snapshot()
+                if snapshot["b"] != snapshot["a"] * 2:
+                    errors.append(dict(snapshot))
+                time.sleep(0)
+
+        readers = [threading.Thread(target=read) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        for value in range(20):
+            parser.edit_var_value("a", value)
+        stop.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(parser.snapshot()["b"], 38)
+
+
+class TestShared(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.folder = tempdir.name
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("const SCALE(int) = 2\na(int) = 1\nb(int) = $a * SCALE\nitems(list) = [1, 2]\n")
+
+    def test_share_and_refresh(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        shared_path = os.path.join(self.folder, "config.shm")
+        self.assertEqual(parser.share(shared_path), 1)
+        with attach(shared_path) as shared:
+            self.assertEqual(dict(shared), {"a": 1, "b": 2, "items": [1, 2]})
+            self.assertEqual(shared.constants, {"SCALE": 2})
+            self.assertEqual(shared.get_type("items"), "list")
+            self.assertFalse(shared.refresh())
+            parser.edit_var_value("a", 5)
+            parser.create_var("c", "str", "new")
+            self.assertEqual(shared["a"], 1)
+            self.assertTrue(shared.refresh())
+            self.assertEqual((shared["a"], shared["b"], shared["c"]), (5, 10, "new"))
+            self.assertEqual(shared.version, 3)
+
+    def test_publish_failure_after_write(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        shared_path = os.path.join(self.folder, "config.shm")
+        parser.share(shared_path)
+        with mock.patch("flk.parser.publish_shared", side_effect=OSError("disk full")):
+            with self.assertLogs("flk.transaction", "ERROR"):
+                parser.edit_var_value("a", 5)
+        self.assertEqual(parser.get_var("b").get_value(), 10)
+        self.assertEqual(Parser().parse_file(self.path)["a"], 5)
+        parser.edit_var_value("a", 6)
+        with attach(shared_path) as shared:
+            self.assertEqual((shared["a"], shared["b"]), (6, 12))
+
+    def test_publish_mapping(self):
+        shared_path = os.path.join(self.folder, "config.shm")
+        publish_shared({"host": "localhost", "ports": (80, 443)}, shared_path)
+        with attach(shared_path) as shared:
+            self.assertEqual(shared["ports"], (80, 443))
+            self.assertNotIn("missing", shared)
+        with open(self.path, "rb") as source:
+            content = source.read()
+        with open(shared_path, "wb") as file:
+            file.write(content)
+        with self.assertRaises(ValueError):
+            attach(shared_path)
+
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(
+                "db_main(dict) = { primary(key): value(dict) = { host(key): value(str) = \"a\", port(key): value(int) = 5432 } }\n"
+                "db_replica(dict) = { primary(key): value(dict) = { host(key): value(str) = \"b\", port(key): value(int) = 5433 } }\n"
+                "cache_size(int) = 10\n"
+                "main_port(int) = $db_main.primary.port + 1\n"
+            )
+
+    def test_paths_and_patterns(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        self.assertEqual(parser.get_path("db_replica.primary.host"), "b")
+        self.assertEqual(parser.get_var("main_port").get_value(), 5433)
+        self.assertEqual(parser.find("db_*"), ["db_main", "db_replica"])
+        self.assertEqual(parser.find("db_*.primary.port"),
+                         ["db_main.primary.port", "db_replica.primary.port"])
+        self.assertEqual(parser.find("*.primary.h?st"), ["db_main.primary.host", "db_replica.primary.host"])
+        self.assertEqual(parser.find("cache_size.x"), [])
+        self.assertEqual(parser.scan("c", "db_r"), ["cache_size", "db_main"])
+        self.assertEqual(parser.scan(path="db_main.primary"), ["host", "port"])
+        with self.assertRaises(ValueError):
+            parser.get_path("db_main.secondary")
+        with self.assertRaises(ValueError):
+            parser.find("db_main..port")
+
+    def test_index_follows_changes(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        self.assertEqual(parser.find("db_*.primary.port"),
+                         ["db_main.primary.port", "db_replica.primary.port"])
+        parser.create_var("db_extra", "int", "1")
+        parser.remove_var("db_replica")
+        parser.edit_var_value("db_main", "{ backup(key): value(int) = 1, primary(key): value(dict) = { port(key): value(int) = 1 } }")
+        self.assertEqual(parser.find("db_*"), ["db_extra", "db_main"])
+        self.assertEqual(parser.find("db_*.*"), ["db_main.backup", "db_main.primary"])
+        self.assertEqual(parser.get_var("main_port").get_value(), 2)
+        with self.assertRaises(RuntimeError):
+            with parser.transaction():
+                parser.create_var("db_temp", "int", "2")
+                raise RuntimeError
+        self.assertEqual(parser.find("db_t*"), [])
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        self.source = "# Настройки\na(int) = 1\nb(int) = 2\nc(int) = $a + $b\ne(int) = 5\n"
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(self.source)
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as file:
+            return file.read()
+
+    def test_concurrent_writers(self):
+        first = Parser(journal=True)
+        second = Parser(journal=True)
+        first.parse_file(self.path)
+        second.parse_file(self.path)
+        first.edit_var_value("a", "10")
+        second.edit_var_value("b", "20")
+        second.create_var("d", "str", "new")
+        first.remove_var("e")
+        self.assertEqual(self.read(), self.source)
+        self.assertEqual(sorted(second.reload()), ["a", "c", "e"])
+        self.assertEqual(second.get_var("c").get_value(), 30)
+        fresh = Parser(journal=True)
+        self.assertEqual(fresh.parse_file(self.path), {"a": 10, "b": 20, "c": 30, "d": "new"})
+
+        self.assertEqual(first.compact(), [os.path.abspath(self.path)])
+        self.assertEqual(self.read(), '# Настройки\na(int) = 10\nb(int) = 20\nc(int) = $a + $b\n\nd(str) = new\n')
+        self.assertEqual(os.path.getsize(self.path + "-journal"), 0)
+
+    def test_torn_record_and_limit(self):
+        parser = Parser(journal=EditJournal(limit=100))
+        parser.parse_file(self.path)
+        with open(self.path + "-journal", "ab") as journal:
+            journal.write(b'[["a", "a(int) = 5"]')
+        self.assertEqual(Parser(journal=True).parse_file(self.path)["a"], 1)
+        parser.edit_var_value("b", "3")
+        self.assertEqual(Parser(journal=True).parse_file(self.path), {"a": 1, "b": 3, "c": 4, "e": 5})
+        self.assertEqual(self.read(), self.source)
+        for value in range(4, 8):
+            parser.edit_var_value("b", str(value))
+        self.assertIn("b(int) = 7", self.read())
+        self.assertEqual(Parser().parse_file(self.path), {"a": 1, "b": 7, "c": 8, "e": 5})
+
+
+class TestIterFile(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(os.path.join(tempdir.name, "base.fl"), "w", encoding="utf-8") as file:
+            file.write("base(int) = 10\n")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) base\nconst K(int) = 2\nitems(list) = [1, 2]\n"
+                       "table(dict) = {\n    x(key): value(int) = 1,\n    y(key): value(int) = 2\n}\n"
+                       "total(int) = $base * K\n")
+
+    def test_stream(self):
+        parser = Parser()
+        names = []
+        for name, variable in parser.iter_file(self.path):
+            names.append(name)
+            if name == "table":
+                self.assertEqual(variable.get_value(), {"x": 1, "y": 2})
+            if name == "total":
+                self.assertEqual(variable.get_value(), 20)
+        self.assertEqual(names, ["items", "table", "total"])
+        self.assertEqual(list(parser.data), ["base"])
+
+    def test_keep(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("double(int) = $total * 2\n")
+        with self.assertRaises(ValueError):
+            list(Parser().iter_file(self.path))
+        parser = Parser()
+        streamed = {name: variable.get_value() for name, variable in parser.iter_file(self.path, keep=True)}
+        self.assertEqual(streamed["double"], 40)
+        self.assertEqual({name: variable.get_value() for name, variable in parser.data.items()},
+                         Parser().parse_file(self.path))
+
+
+class TestCheck(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.dir = tempdir.name
+        self.write("base.fl", "const K(int) = 2\nbase(int) = 10\n")
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_valid(self):
+        path = self.write("main.fl", "(import) base\nitems(list) = [1, $base]\n"
+                                     "table(dict) = {\n    x(key): value(int) = $K\n}\ntotal(int) = $base * K\n")
+        self.assertEqual(check_files([path], workers=1), [])
+        self.assertEqual(check_files(["test.fl"], workers=1), [])
+
+    def test_all_errors(self):
+        path = self.write("main.fl", "(import) base\n(import) missing\nbad line\n"
+                                     "a(int) = abc\nb(int) = $nope + K\nc(int) = 2 * M\n"
+                                     "d(dict) = {\n    x(key): value(int) = $ghost\n}\n"
+                                     "e(foo) = 1\nbase(str) = 'x'\nf(int) = (1 +\n")
+        errors = check_files([path], workers=1)
+        self.assertEqual([error.line for error in errors], [2, 3, 4, 5, 6, 7, 10, 11, 12])
+        self.assertTrue(all(error.path == path for error in errors))
+        self.assertIn("nope", errors[3].message)
+        self.assertIn("ghost", errors[5].message)
+        self.assertTrue(str(errors[0]).startswith(path + ":2: "))
+
+    def test_literals(self):
+        path = self.write("main.fl", "(import) base\na(list) = [1, $base, (2, \"x\"), {k(key): v(list) = [true]}]\n"
+                                     "b(list) = [1, x]\nc(dict) = {1 2}\nd(list) = [1, (2]\n"
+                                     "e(set) = {[1]}\nf(tuple) = ($ghost, 1)\nbad line\n"
+                                     "g(dict) = {\n    x(key): y(int) = 1\n"
+                                     "h(int) = 2\n")
+        errors = check_files([path], workers=1)
+        self.assertEqual([error.line for error in errors], [3, 4, 5, 6, 7, 8, 9])
+        self.assertIn("ghost", errors[4].message)
+        self.assertIn("на строке 9", errors[6].message)
+
+    def test_circular_import(self):
+        first = self.write("first.fl", "(import) second\n")
+        second = self.write("second.fl", "(import) first\n")
+        errors = check_files([first, second], workers=2)
+        self.assertEqual([(error.path, error.line) for error in errors], [(first, 1), (second, 1)])
+        self.assertTrue(all("Циклический импорт" in error.message for error in errors))
+
+
+class TestCodegen(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.dir = tempdir.name
+        self.path = os.path.join(self.dir, "my-app.fl")
+        with open(os.path.join(self.dir, "base.fl"), "w", encoding="utf-8") as file:
+            file.write("port(int) = 8080\n")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) base\nhosts(list) = [\"a\", \"b\"]\nclass(str) = \"web\"\nurl(int) = $port + 1\n")
+
+    def load_module(self):
+        output = os.path.join(self.dir, "app_config.py")
+        write_module(self.path, output)
+        namespace = {"__file__": output}
+        with open(output, encoding="utf-8") as file:
+            exec(compile(file.read(), output, "exec"), namespace)
+        return namespace["MyAppConfig"]
+
+    def test_generate(self):
+        source = generate(self.path)
+        self.assertIn("class MyAppConfig:", source)
+        self.assertIn("url: int", source)
+        self.assertIn("hosts: List[Any]", source)
+        self.assertIn("('class', 'class_', 'str')", source)
+        tree = ast.parse(source)
+        imported = {alias.asname or alias.name for node in ast.walk(tree)
+                    if isinstance(node, (ast.Import, ast.ImportFrom)) for alias in node.names}
+        used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+        self.assertEqual(imported - used, set())
+        self.assertNotIn("import os", source)
+        self.assertIn("import os", generate(self.path, output=os.path.join(self.dir, "app_config.py")))
+
+    def test_values_are_copied(self):
+        parser = Parser()
+        parser.parse_file(self.path)
+        config = self.load_module().load(parser)
+        config.hosts.append("c")
+        self.assertEqual(parser.get_var("hosts").get_value(), ["a", "b"])
+        values = Parser().parse_file(self.path)
+        self.load_module().load(values).hosts.append("c")
+        self.assertEqual(values["hosts"], ["a", "b"])
+
+    def test_load(self):
+        config_class = self.load_module()
+        config = config_class.load()
+        self.assertEqual((config.port, config.hosts, config.class_, config.url), (8080, ["a", "b"], '"web"', 8081))
+        with self.assertRaises(AttributeError):
+            config.other = 1
+        parser = Parser()
+        values = parser.parse_file(self.path)
+        self.assertEqual(config_class.load(values).url, 8081)
+        self.assertEqual(config_class.load(parser).hosts, ["a", "b"])
+
+    def test_reserved_names(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("load(int) = 1\nself(int) = 2\n__slots__(int) = 3\n__repr__(int) = 4\n")
+        config_class = self.load_module()
+        config = config_class.load()
+        self.assertEqual((config.load_, config.self_, config.__slots___, config.__repr___), (1, 2, 3, 4))
+        self.assertTrue(repr(config).startswith("MyAppConfig(port=8080"))
+
+    def test_type_mismatch(self):
+        config_class = self.load_module()
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("extra(int) = 1\n")
+        self.assertEqual(config_class.load(self.path).url, 8081)
+        with open(os.path.join(self.dir, "base.fl"), "w", encoding="utf-8") as file:
+            file.write("port(float) = 80.5\n")
+        parser = Parser()
+        parser.parse_file(self.path)
+        with self.assertRaises(TypeError):
+            config_class.load(parser)
+        with self.assertRaises(ValueError):
+            config_class.load({"port": 1})
+
+
+class TestLayers(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.dir = tempdir.name
+        self.write("base.fl", "const SCALE(int) = 2\nport(int) = 8080\nother(int) = 1\n"
+                              "double(int) = $port * SCALE\nquad(int) = $double * 2\nitems(list) = [1, $port]\n")
+        self.base = Parser()
+        self.base.parse_file(os.path.join(self.dir, "base.fl"))
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_file_overlay(self):
+        layer = overlay(self.base, self.write("prod.fl", "port(int) = 9000\nextra(int) = $quad + 1\n"))
+        self.assertEqual((layer["port"], layer["double"], layer["quad"], layer["items"], layer["extra"]),
+                         (9000, 18000, 36000, (1, 9000), 36001))
+        self.assertEqual(layer["other"], 1)
+        self.assertNotIn("other", layer.values)
+        self.assertEqual(self.base.get_var("quad").get_value(), 32320)
+        self.assertEqual(set(layer), {"port", "other", "double", "quad", "items", "extra"})
+
+    def test_chain(self):
+        env = overlay(self.base, {"port": 1})
+        tenant = env.overlay(self.write("tenant.fl", "const SCALE(int) = 10\n"))
+        self.assertEqual((env["double"], tenant["double"], tenant["quad"]), (2, 10, 20))
+        self.assertEqual(tenant.constants["SCALE"], 10)
+        self.assertEqual(overlay(self.base, {"SCALE": 3})["double"], 24240)
+
+    def test_cached_base(self):
+        path = os.path.join(self.dir, "base.fl")
+        Parser(cache=True).parse_file(path)
+        cache = FileCache()
+        base = Parser(cache=cache)
+        base.parse_file(path)
+        self.assertEqual(cache.hits, 1)
+        layer = overlay(base, {"port": 1})
+        self.assertEqual((layer["double"], layer["quad"], layer["items"]), (2, 4, (1, 1)))
+
+    def test_errors(self):
+        bare = Parser()
+        bare.data["port"] = Variable("int", 1)
+        with self.assertRaises(ValueError):
+            overlay(bare, {"port": 2})
+        with self.assertRaises(TypeError):
+            overlay(self.base, self.write("bad.fl", "port(str) = 'x'\n"))
+        with self.assertRaises(ValueError):
+            overlay(self.base, self.write("missing.fl", "port(int) = $nope\n"))
+        with self.assertRaises(TypeError):
+            overlay(self.base, {"port": "5"})
+        with self.assertRaises(TypeError):
+            overlay(self.base, {"SCALE": 2.5})
+
+    def test_values_read_only(self):
+        layer = overlay(self.base, {"port": 1})
+        with self.assertRaises(AttributeError):
+            layer["items"].append(9)
+        with self.assertRaises(AttributeError):
+            overlay(self.base, {"other": 2})["items"].append(9)
+        self.assertEqual(self.base.get_var("items").get_value(), [1, 8080])
+        self.assertEqual(overlay(self.base, {"items": [5]})["items"], (5,))
+
+
+class TestLazy(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "lazy.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(
+                "const FACTOR(int) = 3\n"
+                "base(int) = 2\n"
+                "derived(int) = $base * FACTOR\n"
+                "broken(int) = $missing + 1\n"
+            )
+
+    def test_evaluates_on_demand(self):
+        parser = Parser(lazy=True)
+        parser.parse_file(self.path)
+        self.assertEqual(parser.data, {})
+        self.assertEqual(parser.get_var("derived").get_value(), 6)
+        self.assertEqual(sorted(parser.data), ["base", "derived"])
+        self.assertIn("broken", parser.pending)
+        with self.assertRaises(ValueError):
+            parser.get_var("broken")
+
+    def test_lazy_values_mapping(self):
+        parser = Parser(lazy=True)
+        values = parser.parse_file(self.path)
+        self.assertEqual(values["derived"], 6)
+        self.assertEqual(len(values), 3)
+
+    def test_reference_cycle(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("a(int) = $b\nb(int) = $a\n")
+        parser = Parser(lazy=True)
+        parser.parse_file(self.path)
+        with self.assertRaises(ValueError):
+            parser.get_var("a")
+
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        self.module_path = os.path.join(tempdir.name, "module.fl")
+        with open(self.module_path, "w", encoding="utf-8") as file:
+            file.write("shared(int) = 1\n")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) module\n# comment\nfirst(int) = 1\nsecond(int) = 2\n")
+        self.parser = Parser()
+        self.parser.parse_file(self.path)
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    def test_batched_edits_write_once(self):
+        with mock.patch("flk.transaction.atomic_write_many", wraps=atomic_write_many) as write:
+            with self.parser.transaction():
+                self.parser.edit_var_value("first", 10)
+                self.parser.edit_var_value("second", 20)
+                self.parser.edit_var_value("shared", 30)
+                self.parser.create_var("third", "int", 3)
+                self.parser.remove_var("second")
+                self.assertEqual(self.read(self.path).count("first(int) = 1"), 1)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(self.read(self.path), "(import) module\n# comment\nfirst(int) = 10\n\nthird(int) = 3\n")
+        self.assertEqual(self.read(self.module_path), "shared(int) = 30\n")
+        self.assertEqual(self.parser.get_var("first").get_value(), 10)
+
+    def test_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with self.parser.transaction():
+                self.parser.edit_var_value("first", 10)
+                self.parser.create_var("third", "int", 3)
+                raise RuntimeError
+        self.assertEqual(self.read(self.path), "(import) module\n# comment\nfirst(int) = 1\nsecond(int) = 2\n")
+        self.assertEqual(self.parser.get_var("first").get_value(), 1)
+        with self.assertRaises(ValueError):
+            self.parser.get_var("third")
+
+    def test_rollback_remove(self):
+        original = self.read(self.path)
+        self.parser.dependency_graph()
+        with self.assertRaises(RuntimeError):
+            with self.parser.transaction():
+                self.parser.remove_var("second")
+                raise RuntimeError
+        self.assertIn("second", self.parser.declarations)
+        self.assertEqual(self.parser.owners["second"], self.path)
+        self.assertIn("second", self.parser.graph.dependencies)
+        self.parser.save()
+        self.assertEqual(self.read(self.path), original)
+
+
+class TestAsyncParser(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.dir = tempdir.name
+        self.write("left.fl", "left(int) = 1\n")
+        self.write("right.fl", "right(int) = 2\n")
+        self.path = self.write("main.fl", "(import) left\n(import) right\ntotal(int) = $left + $right\n")
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        return path
+
+    def test_parse_and_edit(self):
+        async def scenario():
+            parser = AsyncParser()
+            with mock.patch.object(Parser, "read_source", side_effect=AssertionError):
+                data = await parser.aparse_file(self.path)
+            self.assertEqual(data, {"left": 1, "right": 2, "total": 3})
+            await asyncio.gather(parser.aedit_var_value("left", 10), parser.aedit_var_value("right", 20))
+            self.assertEqual(parser.get_var("total").get_value(), 30)
+            with self.assertRaises(RuntimeError):
+                async with parser.atransaction():
+                    parser.edit_var_value("left", 5)
+                    raise RuntimeError
+            return parser
+
+        parser = asyncio.run(scenario())
+        self.assertEqual(parser.get_var("left").get_value(), 10)
+        self.assertEqual(Parser().parse_file(self.path), {"left": 10, "right": 20, "total": 30})
+
+    def test_reload(self):
+        parser = AsyncParser()
+        asyncio.run(parser.aparse_file(self.path))
+        self.write("right.fl", "right(int) = 5\n")
+        self.assertEqual(sorted(asyncio.run(parser.areload())), ["right", "total"])
+        self.assertEqual(parser.get_var("total").get_value(), 6)
+
+    def test_nested_transaction(self):
+        parser = AsyncParser()
+        parser.parse_file(self.path)
+        joined = []
+
+        def sync_edit():
+            with parser.transaction() as transaction:
+                joined.append(transaction is outer)
+                parser.edit_var_value("right", 7)
+
+        async def scenario():
+            nonlocal outer
+            async with parser.atransaction() as outer:
+                await parser.aedit_var_value("left", 10)
+                await parser.acreate_var("extra", "int", "1")
+                thread = threading.Thread(target=sync_edit)
+                thread.start()
+                await asyncio.sleep(0.05)
+                self.assertEqual(joined, [])
+            await asyncio.to_thread(thread.join)
+
+        outer = None
+        asyncio.run(asyncio.wait_for(scenario(), 5))
+        self.assertEqual(joined, [False])
+        self.assertEqual(Parser().parse_file(self.path), {"left": 10, "right": 7, "total": 17, "extra": 1})
+
+    def test_journal(self):
+        writer = Parser(journal=True)
+        writer.parse_file(self.path)
+        writer.edit_var_value("left", "10")
+        writer.create_var("extra", "int", "7")
+        parser = AsyncParser(journal=True)
+        data = asyncio.run(parser.aparse_file(self.path))
+        self.assertEqual(data, Parser(journal=True).parse_file(self.path))
+        self.assertEqual(data["total"], 12)
+        self.assertEqual(data["extra"], 7)
+        writer.edit_var_value("right", "5")
+        self.assertEqual(sorted(asyncio.run(parser.areload())), ["right", "total"])
+        self.assertEqual(parser.get_var("total").get_value(), 15)
+
+
+class TestSpans(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        self.module_path = os.path.join(tempdir.name, "module.fl")
+        with open(self.module_path, "w", encoding="utf-8") as file:
+            file.write("shared(int) = 1\n")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) module\n  first(int) = 1  // comment\n"
+                       "table(dict) = {\n    a(key): b(int) = 1\n}\nlast(str) = \"й\"\n")
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    def check_edits(self, parser):
+        parser.parse_file(self.path)
+        with mock.patch.object(Transaction, "lines", side_effect=AssertionError) as lines:
+            parser.edit_var_value("table", "{ c(key): d(int) = 2 }")
+            parser.edit_var_value("first", "100")
+            parser.edit_var_value("shared", "2")
+            parser.remove_var("last")
+        self.assertFalse(lines.called)
+        self.assertEqual(self.read(self.path), "(import) module\n  first(int) = 100  // comment\n"
+                                               "table(dict) = { c(key): d(int) = 2 }\n")
+        self.assertEqual(self.read(self.module_path), "shared(int) = 2\n")
+        content = self.read(self.path).encode("utf-8")
+        start, end = parser.spans[os.path.abspath(self.path)]["table"]
+        self.assertEqual(content[start:end], b"table(dict) = { c(key): d(int) = 2 }")
+        self.assertEqual(parser.reload(), [])
+        self.assertEqual(Parser().parse_file(self.path), {"shared": 2, "first": 100, "table": {"c": 2}})
+
+    def test_patch_owning_file(self):
+        self.check_edits(Parser())
+
+    def test_patch_in_place(self):
+        self.check_edits(Parser(in_place_edits=True))
+
+    def test_non_ascii_offsets(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("# заголовок\ntitle(str) = \"имя\"\nfirst(int) = 1  // первый\nsecond(int) = 2\n")
+        parser = Parser(in_place_edits=True)
+        parser.parse_file(self.path)
+        parser.edit_var_value("first", "100")
+        parser.edit_var_value("second", "3")
+        self.assertEqual(self.read(self.path),
+                         "# заголовок\ntitle(str) = \"имя\"\nfirst(int) = 100  // первый\nsecond(int) = 3\n")
+
+    def test_remove_and_append(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("(import) module\n" + "".join(f"v{i}(int) = {i}\n" for i in range(10)))
+        parser = Parser()
+        parser.parse_file(self.path)
+        for i in (1, 4, 5):
+            parser.remove_var(f"v{i}")
+        with parser.transaction():
+            for i in range(10, 90):
+                parser.create_var(f"v{i}", "int", str(i))
+        parser.remove_var("v50")
+        parser.edit_var_value("v8", "800")
+        parser.edit_var_value("v60", "600")
+        module = parser.modules[os.path.abspath(self.path)]
+        names = [statement.name for statement in module.statements[1:]]
+        self.assertEqual(names, [f"v{i}" for i in range(90) if i not in (1, 4, 5, 50)])
+        expected = {f"v{i}": i for i in range(90) if i not in (1, 4, 5, 50)}
+        expected.update(shared=1, v8=800, v60=600)
+        self.assertEqual(Parser().parse_file(self.path), expected)
+
+
+class TestReload(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.dir = tempdir.name
+        self.write("common.fl", "base(int) = 1\n")
+        self.write("other.fl", "other(int) = 5\n")
+        self.write("main.fl", "(import) common\n(import) other\nderived(int) = $base * 10\nplain(int) = $other\n")
+        self.parser = Parser()
+        self.parser.parse_file(os.path.join(self.dir, "main.fl"))
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_reload_changed_file_only(self):
+        self.assertEqual(self.parser.reload(), [])
+        self.write("common.fl", "base(int) = 2\n")
+        read = []
+        read_source = self.parser.read_source
+        self.parser.read_source = lambda filename: read.append(os.path.basename(filename)) or read_source(filename)
+        self.assertEqual(sorted(self.parser.reload()), ["base", "derived"])
+        self.assertEqual(read, ["common.fl"])
+        self.assertEqual(self.parser.get_var("derived").get_value(), 20)
+        self.assertEqual(self.parser.get_var("plain").get_value(), 5)
+
+    def test_watcher_poll(self):
+        changes = []
+        watcher = Watcher(self.parser, callback=changes.append)
+        self.write("other.fl", "other(int) = 6\nadded(str) = new\n")
+        watcher.poll()
+        self.assertEqual(sorted(changes[0]), ["added", "other", "plain"])
+        self.assertEqual(self.parser.get_var("plain").get_value(), 6)
+
+    def test_watcher_skips_transaction(self):
+        watcher = Watcher(self.parser)
+        self.write("common.fl", "base(int) = 2\n")
+        with self.parser.transaction():
+            self.assertEqual(watcher.poll(), [])
+            polled = []
+            thread = threading.Thread(target=lambda: polled.append(watcher.poll()))
+            thread.start()
+            thread.join()
+            self.assertEqual(polled, [[]])
+        self.assertEqual(sorted(watcher.poll()), ["base", "derived"])
+
+    def test_watch_on_error(self):
+        errors = []
+        failed = threading.Event()
+        watcher = self.parser.watch(interval=0.01, on_error=lambda error: (errors.append(error), failed.set()))
+        try:
+            self.write("common.fl", "base(int) = oops\n")
+            self.assertTrue(failed.wait(5))
+        finally:
+            watcher.stop()
+        self.assertIsInstance(errors[0], ValueError)
+
+    def test_failed_reload_keeps_state(self):
+        self.write("common.fl", "base(int) = 2\n")
+        self.write("other.fl", "other(int) = 7\nbroken(int) = $missing\n")
+        with self.assertRaises(ValueError):
+            self.parser.reload()
+        self.assertEqual([self.parser.get_var(name).get_value() for name in ("base", "derived", "plain")],
+                         [1, 10, 5])
+        self.assertNotIn("broken", self.parser.data)
+        with self.assertRaises(ValueError):
+            self.parser.reload()
+        self.write("other.fl", "other(int) = 7\n")
+        self.assertEqual(sorted(self.parser.reload()), ["base", "derived", "other", "plain"])
+        self.assertEqual(self.parser.get_var("derived").get_value(), 20)
+
+    def test_watch_logs_errors(self):
+        watcher = self.parser.watch(interval=0.01)
+        try:
+            with self.assertLogs("flk.watcher", "ERROR"):
+                self.write("common.fl", "base(int) = oops\n")
+                time.sleep(0.2)
+            self.assertTrue(watcher.thread.is_alive())
+            self.write("common.fl", "base(int) = 3\n")
+            deadline = time.monotonic() + 5
+            while self.parser.get_var("derived").get_value() != 30 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+        self.assertEqual(self.parser.get_var("derived").get_value(), 30)
+
+
+class TestReactive(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, "main.fl")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("other(int) = 5\na(int) = 3\nb(float) = 0.5\nsum(float) = $a + $b\n"
+                       "double(float) = $sum * 2\nalias(int) = $a\n")
+        self.parser = Parser()
+        self.parser.parse_file(self.path)
+
+    def values(self):
+        return {name: self.parser.get_var(name).get_value() for name in ("sum", "double", "alias", "other")}
+
+    def test_dependents_recomputed(self):
+        self.parser.edit_var_value("a", 10)
+        self.assertEqual(self.values(), {"sum": 10.5, "double": 21, "alias": 10, "other": 5})
+        self.parser.edit_var_value("alias", "$other")
+        self.parser.edit_var_value("other", 7)
+        self.assertEqual(self.parser.get_var("alias").get_value(), 7)
+        self.assertEqual(Parser().parse_file(self.path)["alias"], 7)
+
+    def test_rollback_restores_dependents(self):
+        before = self.values()
+        with self.assertRaises(RuntimeError):
+            with self.parser.transaction():
+                self.parser.edit_var_value("a", 10)
+                raise RuntimeError
+        self.assertEqual(self.values(), before)
+
+    def test_remove_referenced(self):
+        with self.assertRaises(ValueError):
+            self.parser.remove_var("a")
+        self.assertEqual(self.parser.get_var("alias").get_value(), 3)
+        self.parser.remove_var("alias")
+        self.parser.remove_var("double")
+        self.parser.remove_var("sum")
+        self.parser.remove_var("a")
+        self.assertEqual(Parser().parse_file(self.path), {"other": 5, "b": 0.5})
+
+    def test_remove_shadowed_by_constant(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("const LIMIT(int) = 4\nLIMIT(int) = 9\nwide(int) = $LIMIT * 2\n")
+        parser = Parser()
+        parser.parse_file(self.path)
+        self.assertEqual(parser.get_var("wide").get_value(), 18)
+        parser.remove_var("LIMIT")
+        self.assertEqual(parser.get_var("wide").get_value(), 8)
+        self.assertEqual(Parser().parse_file(self.path)["wide"], 8)
+
+
 if __name__ == '__main__':
     unittest.main()
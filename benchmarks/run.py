@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flk import Parser  # noqa: E402
+from workload import Workload, generate  # noqa: E402
+
+# Базовые результаты, хранящиеся в репозитории.
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def measure(function: Callable[[], None], repeat: int, operations: int = 1) -> float:
+    """
+    Возвращает лучшее время одной операции из нескольких повторов.
+
+    Параметры:
+        function (Callable[[], None]): Функция, выполняющая operations операций.
+        repeat (int): Число повторов.
+        operations (int): Число операций за один вызов function.
+
+    Возврат:
+        float: Время одной операции в секундах.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best / operations
+
+
+def run(root: str, repeat: int, operations: int) -> Dict[str, float]:
+    """
+    Выполняет все замеры на сгенерированном дереве файлов.
+
+    Параметры:
+        root (str): Путь к корневому файлу.
+        repeat (int): Число повторов каждого замера.
+        operations (int): Число операций в замерах чтения и изменения.
+
+    Возврат:
+        Dict[str, float]: Время одной операции в секундах по названиям замеров.
+    """
+    results = {"parse_file": measure(lambda: Parser().parse_file(root), repeat)}
+    results["parse_file_lazy"] = measure(lambda: Parser(lazy=True).parse_file(root), repeat)
+
+    parser = Parser()
+    parser.parse_file(root)
+    names = list(parser.data)
+    names = [names[index * len(names) // operations] for index in range(operations)]
+
+    def get_var():
+        for name in names:
+            parser.get_var(name)
+
+    def get_value():
+        for name in names:
+            parser.get_var(name).get_value()
+
+    def get_view():
+        for name in names:
+            parser.get_view(name)
+
+    results["get_var"] = measure(get_var, repeat, operations)
+    results["get_value"] = measure(get_value, repeat, operations)
+    results["get_view"] = measure(get_view, repeat, operations)
+
+    counter = iter(range(sys.maxsize))
+
+    def edit_var_value():
+        for _ in range(operations):
+            parser.edit_var_value("v0", next(counter))
+
+    def create_remove_var():
+        for index in range(operations):
+            parser.create_var(f"bench_{index}", "int", str(index))
+        for index in range(operations):
+            parser.remove_var(f"bench_{index}")
+
+    results["edit_var_value"] = measure(edit_var_value, repeat, operations)
+    results["create_remove_var"] = measure(create_remove_var, repeat, operations)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> bool:
+    """
+    Печатает сравнение с базовыми результатами.
+
+    Параметры:
+        results (Dict[str, float]): Текущие результаты.
+        baseline (Dict[str, float]): Базовые результаты.
+        tolerance (float): Допустимое относительное замедление.
+
+    Возврат:
+        bool: True, если ни один замер не замедлился больше допустимого.
+    """
+    ok = True
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:20} {seconds * 1000:12.4f} ms  (нет в базовых результатах)")
+            continue
+        ratio = seconds / base
+        slower = ratio > 1 + tolerance
+        ok = ok and not slower
+        print(f"{name:20} {seconds * 1000:12.4f} ms  {ratio:6.2f}x{'  ЗАМЕДЛЕНИЕ' if slower else ''}")
+    return ok
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарки FLK на синтетических файлах FL")
+    parser.add_argument("--scale", type=float, default=1.0, help="Множитель размера нагрузки")
+    parser.add_argument("--repeat", type=int, default=5, help="Число повторов каждого замера")
+    parser.add_argument("--operations", type=int, default=200,
+                        help="Число операций в замерах чтения и изменения")
+    parser.add_argument("--output", help="Сохранить результаты в JSON-файл")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="Сравнить с результатами из JSON-файла (по умолчанию benchmarks/baseline.json)")
+    parser.add_argument("--no-baseline", dest="baseline", action="store_const", const=None,
+                        help="Не сравнивать с базовыми результатами")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Допустимое относительное замедление (по умолчанию 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Генерирует нагрузку, выполняет замеры, сохраняет и сравнивает результаты.
+
+    Возврат:
+        int: Код завершения: 1, если найдено замедление относительно базовых результатов.
+    """
+    args = parse_args(argv)
+    workload = Workload().scaled(args.scale)
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(generate(directory, workload), args.repeat, args.operations)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workload": workload._asdict(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+    if not args.baseline or (args.baseline == BASELINE and not os.path.exists(BASELINE)):
+        for name, seconds in results.items():
+            print(f"{name:20} {seconds * 1000:12.4f} ms")
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("workload") != report["workload"]:
+        print("Предупреждение: базовые результаты получены на другой нагрузке")
+    return 0 if compare(results, baseline["results"], args.tolerance) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
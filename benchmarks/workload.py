@@ -0,0 +1,99 @@
+import os
+from typing import NamedTuple
+
+
+class Workload(NamedTuple):
+    """
+    Параметры синтетического дерева файлов FL.
+
+    Атрибуты:
+        variables (int): Число обычных переменных в корневом файле.
+        dict_entries (int): Число ключей в большом многострочном словаре.
+        list_length (int): Длина длинного списка.
+        depth (int): Длина цепочки импортов (d0 -> d1 -> ...).
+        width (int): Число файлов, импортируемых корневым файлом напрямую.
+        module_variables (int): Число переменных в каждом импортируемом файле.
+        chain (int): Длина цепочки выражений, каждое из которых ссылается на предыдущее.
+    """
+    variables: int = 5000
+    dict_entries: int = 500
+    list_length: int = 2000
+    depth: int = 20
+    width: int = 50
+    module_variables: int = 20
+    chain: int = 500
+
+    def scaled(self, factor: float) -> 'Workload':
+        """
+        Возвращает параметры, умноженные на factor (не меньше 1).
+
+        Параметры:
+            factor (float): Множитель.
+
+        Возврат:
+            Workload: Новые параметры.
+        """
+        return Workload(*(max(1, int(value * factor)) for value in self))
+
+
+def _variable(index: int) -> str:
+    """
+    Возвращает объявление обычной переменной; тип зависит от номера.
+    """
+    kind = index % 6
+    if kind == 0:
+        return f"v{index}(int) = {index}\n"
+    if kind == 1:
+        return f'v{index}(str) = "value {index}"\n'
+    if kind == 2:
+        return f"v{index}(float) = {index}.5\n"
+    if kind == 3:
+        return f"v{index}(list) = [{index}, {index + 1}, {index + 2}]\n"
+    if kind == 4:
+        return f"# comment {index}\nv{index}(bool) = True\n"
+    return f"v{index}(float) = $v{index - 5} * 2 + PI\n"
+
+
+def _write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+def generate(directory: str, workload: Workload = Workload()) -> str:
+    """
+    Создает синтетическое дерево файлов FL.
+
+    Корневой файл main.fl импортирует широкий набор модулей wide/w*.fl
+    и начало глубокой цепочки deep/d*.fl, затем объявляет константу,
+    обычные переменные всех типов, большой многострочный словарь,
+    длинный список и цепочку выражений.
+
+    Параметры:
+        directory (str): Каталог, в котором создаются файлы.
+        workload (Workload): Параметры дерева.
+
+    Возврат:
+        str: Путь к корневому файлу.
+    """
+    for index in range(workload.width):
+        _write(os.path.join(directory, "wide", f"w{index}.fl"), "".join(
+            f"w{index}_v{item}(int) = {item}\n" for item in range(workload.module_variables)))
+    for index in range(workload.depth):
+        lines = [f"(import) d{index + 1}\n"] if index + 1 < workload.depth else []
+        lines += [f"d{index}_v{item}(str) = \"deep {item}\"\n" for item in range(workload.module_variables)]
+        _write(os.path.join(directory, "deep", f"d{index}.fl"), "".join(lines))
+
+    parts = ["# Синтетическая нагрузка для бенчмарков\n"]
+    parts += [f"(import) wide.w{index}\n" for index in range(workload.width)]
+    parts.append("(import) deep.d0\n")
+    parts.append("const PI(float) = 3.14159\n\n")
+    parts += [_variable(index) for index in range(workload.variables)]
+    entries = ",\n".join(f"    key{index}(key): value{index}(int) = {index}" for index in range(workload.dict_entries))
+    parts.append(f"big_dict(dict) = {{\n{entries}\n}}\n")
+    parts.append(f"big_list(list) = [{', '.join(map(str, range(workload.list_length)))}]\n")
+    parts.append("e0(int) = 1\n")
+    parts += [f"e{index}(int) = $e{index - 1} + 1\n" for index in range(1, workload.chain)]
+    root = os.path.join(directory, "main.fl")
+    _write(root, "".join(parts))
+    return root
@@ -1 +1,8 @@
-from flk.__main__ import Parser
\ No newline at end of file
+from flk.__main__ import Parser
+from flk.parser import CircularImportError
+from flk.parallel import parse_many
+from flk.async_parser import AsyncParser
+from flk.serializer import dump, load_binary
+from flk.shared import attach, publish_shared
+from flk.check import check_files
+from flk.layers import Layer, overlay
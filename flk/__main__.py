@@ -1,31 +1,163 @@
+from flk.check import check_files
+from flk.codegen import write_module
 from flk.parser import Parser
+from flk.parallel import parse_many
+from flk.serializer import json_default
+from flk.server import Server, collect_files
 import argparse
+import json
+import sys
 
 
 def parse_args():
     """
     Разбирает аргументы командной строки.
 
-    Возвращает объект с аргументами, где 'filename' - имя файла, который нужно спарсить.
+    Возвращает объект с аргументами, где 'paths' - файлы и каталоги, которые нужно спарсить.
     """
     parser = argparse.ArgumentParser(description="Парсер файлов")
-    parser.add_argument('filename', type=str, help='Имя файла для парсинга')
+    parser.add_argument('paths', nargs='*', metavar='path',
+                        help='Файлы для парсинга или каталоги, в которых ищутся файлы .fl')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--json', dest='format', action='store_const', const='json', default='python',
+                        help='Вывести значения в формате JSON')
+    output.add_argument('--jsonl', dest='format', action='store_const', const='jsonl',
+                        help='Вывести по одной строке JSON на файл')
+    parser.add_argument('-k', '--key', action='append',
+                        help='Вывести только эту переменную (можно указать несколько раз)')
+    parser.add_argument('--workers', type=int,
+                        help='Число процессов для разбора нескольких файлов '
+                             '(по умолчанию 1, для --check - число ядер)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Вывести время этапов разбора и самые медленные файлы и переменные')
+    parser.add_argument('--check', action='store_true',
+                        help='Только проверить файлы, не вычисляя значений, и вывести все ошибки')
+    parser.add_argument('--codegen', metavar='MODULE',
+                        help='Сгенерировать модуль Python с классом доступа к переменным файла')
+    parser.add_argument('--serve', action='store_true',
+                        help='Хранить файлы в памяти и отвечать на запросы JSON Lines из stdin')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='Отвечать на запросы через UNIX-сокет по указанному пути')
     return parser.parse_args()
 
+
+def print_stats(stats, top=10, file=None):
+    """
+    Выводит статистику профилирования парсера.
+
+    Параметры:
+        stats: Статистика, возвращенная Parser.stats.
+        top: Сколько самых медленных файлов и переменных вывести.
+        file: Поток вывода; по умолчанию sys.stdout.
+    """
+    total = stats['total'] or 1
+    print(f"Всего: {stats['total'] * 1000:.2f} мс", file=file)
+    print("Этапы:", file=file)
+    for phase, info in sorted(stats['phases'].items(), key=lambda item: item[1]['time'], reverse=True):
+        print(f"  {phase:12} {info['time'] * 1000:10.2f} мс {info['time'] / total:7.1%} {info['calls']:8} вызовов",
+              file=file)
+    print("Счетчики:", file=file)
+    for name, value in stats['counters'].items():
+        print(f"  {name:22} {value}", file=file)
+    print("Самые медленные файлы (собственное время / с импортами):", file=file)
+    for path, info in list(stats['files'].items())[:top]:
+        print(f"  {info['self_time'] * 1000:10.2f} мс {info['time'] * 1000:10.2f} мс  {path}", file=file)
+    print("Самые медленные переменные:", file=file)
+    for name, seconds in list(stats['variables'].items())[:top]:
+        print(f"  {seconds * 1000:10.3f} мс  {name}", file=file)
+
+def select(data, keys):
+    """
+    Оставляет в данных только указанные ключи.
+
+    Параметры:
+        data: Значения переменных файла.
+        keys: Имена переменных или None, чтобы оставить все.
+
+    Исключения:
+        ValueError: Если переменной с указанным именем нет.
+    """
+    if not keys:
+        return data
+    missing = [key for key in keys if key not in data]
+    if missing:
+        raise ValueError("Переменные не найдены: " + ", ".join(missing))
+    return {key: data[key] for key in keys}
+
+
 def main():
     """
     Основная функция для запуска парсера из командной строки.
 
-    Использует аргументы командной строки для определения файла для парсинга и выводит результаты.
+    Разбирает файлы (каталоги обходятся рекурсивно) и выводит их значения
+    в виде Python, JSON или JSON Lines, проверяет файлы без вычисления
+    значений (--check), генерирует класс доступа к переменным (--codegen)
+    либо запускает сервер запросов.
     Обрабатывает исключения, возникающие в процессе парсинга.
+
+    Возврат:
+        int: Код завершения: 1, если произошла ошибка или проверка нашла ошибки.
     """
     args = parse_args()
-    parser = Parser()
     try:
-        data = parser.parse_file(args.filename)
-        print(data)
+        files = collect_files(args.paths)
+        if args.serve or args.socket:
+            server = Server(files)
+            if args.socket:
+                server.serve_unix(args.socket)
+            else:
+                server.serve_stream(sys.stdin, sys.stdout)
+            return 0
+        if not files:
+            raise ValueError("Не найдено ни одного файла FL")
+        if args.codegen:
+            if len(files) != 1:
+                raise ValueError("Для --codegen нужен ровно один файл FL")
+            write_module(files[0], args.codegen)
+            return 0
+        if args.check:
+            errors = check_files(files, workers=args.workers)
+            if args.format == 'python':
+                for error in errors:
+                    print(error)
+            else:
+                records = [error._asdict() for error in errors]
+                if args.format == 'json':
+                    print(json.dumps(records, ensure_ascii=False))
+                else:
+                    for record in records:
+                        print(json.dumps(record, ensure_ascii=False))
+            return 1 if errors else 0
+
+        stats = {}
+        if args.profile:
+            results = {}
+            for path in files:
+                parser = Parser(profile=True)
+                results[path] = parser.parse_file(path)
+                stats[path] = parser.stats()
+        else:
+            results = parse_many(files, workers=args.workers or 1)
+
+        results = {path: select(data, args.key) for path, data in results.items()}
+        if args.format == 'json':
+            print(json.dumps(results[files[0]] if len(files) == 1 else results,
+                             ensure_ascii=False, default=json_default))
+        elif args.format == 'jsonl':
+            for path, data in results.items():
+                print(json.dumps({'file': path, 'data': data}, ensure_ascii=False, default=json_default))
+        else:
+            for path, data in results.items():
+                print(data if len(files) == 1 else f"{path}: {data}")
+        for path, file_stats in stats.items():
+            # Статистика не должна смешиваться с машиночитаемым выводом.
+            print_stats(file_stats, file=sys.stdout if args.format == 'python' else sys.stderr)
+    except KeyboardInterrupt:
+        return 0
     except Exception as e:
-        print(f"Ошибка: {e}")
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from flk.journal import EditJournal
+from flk.parser import DataType, Parser
+from flk.syntax import Import, Module, parse_module
+from flk.transaction import Transaction
+
+# Прочитанные файлы: путь, состояние и содержимое для Parser.record_source.
+Records = List[Tuple[str, os.stat_result, bytes]]
+
+# Пауза между попытками захватить transaction_lock, занятый другим потоком.
+LOCK_POLL_INTERVAL = 0.001
+
+
+def _load(filename: str, journal: Optional[EditJournal] = None) -> Tuple[Records, Module]:
+    """
+    Читает файл и строит его синтаксическое дерево; выполняется в рабочем потоке.
+
+    Параметры:
+        filename (str): Имя файла.
+        journal (Optional[EditJournal]): Журналы изменений парсера; если заданы,
+            файл читается вместе с журналом, как в Parser.read_source.
+
+    Возврат:
+        Tuple[Records, Module]: Прочитанные файлы (файл FL и его журнал) и дерево.
+    """
+    records: Records = []
+    if journal is not None:
+        content = journal.read(filename, lambda *record: records.append(record))
+    else:
+        with open(filename, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            content = file.read()
+        records.append((filename, stat, content))
+    return records, parse_module(content.decode('utf-8'), filename)
+
+
+class AsyncParser(Parser):
+    """
+    Парсер с асинхронными методами загрузки и изменения файлов для asyncio.
+
+    Файлы читаются в рабочих потоках, не блокируя цикл событий; файлы,
+    импортируемые из одного файла, читаются одновременно. Изменения
+    файлов выполняются по одному под асинхронной блокировкой, а запись
+    на диск происходит в рабочем потоке. Синхронные методы Parser
+    (get_var, get_view и другие) доступны как обычно.
+
+    Атрибуты:
+        prefetched (Dict[str, Tuple[Records, Module]]): Заранее прочитанные
+            файлы по абсолютному пути, еще не переданные парсеру.
+    """
+    def __init__(self, *args, **kwargs):
+        """
+        Инициализация парсера; параметры те же, что у Parser.
+        """
+        super().__init__(*args, **kwargs)
+        self.prefetched: Dict[str, Tuple[Records, Module]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._transaction_task: Optional[asyncio.Task] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """
+        Блокировка, под которой выполняются асинхронные операции.
+
+        Создается при первом обращении, чтобы принадлежать работающему циклу событий.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def parse_source(self, filename: str) -> Module:
+        """
+        Возвращает синтаксическое дерево заранее прочитанного файла
+        или читает файл синхронно, если он не был прочитан заранее.
+
+        Параметры:
+            filename (str): Имя файла.
+
+        Возврат:
+            Module: Синтаксическое дерево файла.
+        """
+        prefetched = self.prefetched.pop(os.path.abspath(filename), None)
+        if prefetched is None:
+            return super().parse_source(filename)
+        records, module = prefetched
+        for record in records:
+            self.record_source(*record)
+        return module
+
+    async def prefetch(self, filenames: Iterable[str]) -> None:
+        """
+        Читает файлы и их новые импорты в рабочих потоках.
+
+        Обход идет по уровням: все файлы, импортируемые с одного уровня,
+        читаются одновременно. Уже разобранные импорты не читаются.
+        Файлы, которые не удалось прочитать или разобрать, пропускаются:
+        ошибка возникнет при синхронном разборе.
+
+        Параметры:
+            filenames (Iterable[str]): Имена файлов, которые нужно прочитать.
+        """
+        level = list(filenames)
+        seen = set()
+        while level:
+            keys = [os.path.abspath(filename) for filename in level]
+            results = await asyncio.gather(*(asyncio.to_thread(_load, filename, self.journal) for filename in level),
+                                           return_exceptions=True)
+            seen.update(keys)
+            imports = []
+            for filename, key, result in zip(level, keys, results):
+                if isinstance(result, Exception):
+                    continue
+                self.prefetched[key] = result
+                for statement in result[1].statements:
+                    if type(statement) is Import:
+                        imports.append(self.resolve_import(statement.module, filename))
+            level = []
+            for filename in imports:
+                key = os.path.abspath(filename)
+                if key not in seen and key not in self.modules:
+                    seen.add(key)
+                    level.append(filename)
+
+    async def aparse_file(self, filename: str) -> Dict[str, DataType]:
+        """
+        Асинхронный вариант parse_file.
+
+        Файлы дерева импортов читаются заранее и одновременно, затем
+        объявления выполняются в рабочем потоке. До завершения корутины
+        значения этого парсера не следует читать из других задач.
+
+        Параметры:
+            filename (str): Имя файла для парсинга.
+
+        Возврат:
+            Dict[str, DataType]: Значения всех переменных.
+        """
+        async with self.lock:
+            await self.prefetch([filename])
+            try:
+                return await asyncio.to_thread(self.parse_file, filename)
+            finally:
+                self.prefetched.clear()
+
+    async def areload(self) -> List[str]:
+        """
+        Асинхронный вариант reload.
+
+        Изменившиеся файлы и их новые импорты читаются в рабочих потоках;
+        пересчет значений выполняется в цикле событий, поэтому другие задачи
+        никогда не видят наполовину обновленные значения.
+
+        Возврат:
+            List[str]: Имена переменных и констант, значения которых изменились.
+        """
+        async with self.lock:
+            changed = await asyncio.to_thread(self.changed_files)
+            if not changed:
+                return []
+            await self.prefetch([self.modules[path].path if path in self.modules else path
+                                 for path in changed if os.path.exists(path)])
+            try:
+                return self.reload()
+            finally:
+                self.prefetched.clear()
+
+    @asynccontextmanager
+    async def atransaction(self) -> AsyncIterator[Transaction]:
+        """
+        Асинхронный вариант transaction.
+
+        Транзакции выполняются по одной. Значения в памяти меняются сразу,
+        а затронутые файлы записываются в рабочем потоке при выходе из блока.
+        При исключении файлы не изменяются, а значения восстанавливаются.
+        Вложенные транзакции той же задачи (в том числе aedit_var_value,
+        acreate_var и aremove_var внутри блока) входят во внешнюю. На время
+        транзакции захватывается и transaction_lock, поэтому transaction()
+        из другого потока ждет ее завершения, а не входит в нее.
+
+        Возврат:
+            AsyncIterator[Transaction]: Текущая транзакция.
+        """
+        task = asyncio.current_task()
+        if self.active_transaction is not None and self._transaction_task is task:
+            yield self.active_transaction
+            return
+        async with self.lock:
+            # Блокировка потоков захватывается без ожидания, чтобы не
+            # останавливать цикл событий, пока транзакция идет в другом потоке.
+            while not self.transaction_lock.acquire(blocking=False):
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                transaction = Transaction(self)
+                self.active_transaction = transaction
+                self._transaction_task = task
+                try:
+                    yield transaction
+                    await asyncio.to_thread(transaction.commit)
+                except BaseException:
+                    transaction.rollback()
+                    raise
+                finally:
+                    self.active_transaction = None
+                    self._transaction_task = None
+            finally:
+                self.transaction_lock.release()
+
+    async def aedit_var_value(self, var_name: str, new_var_value: str) -> None:
+        """
+        Асинхронный вариант edit_var_value.
+
+        Параметры:
+            var_name (str): Имя переменной.
+            new_var_value (str): Новое значение переменной.
+        """
+        async with self.atransaction():
+            self.edit_var_value(var_name, new_var_value)
+
+    async def acreate_var(self, name: str, var_type: str, value: str) -> None:
+        """
+        Асинхронный вариант create_var.
+
+        Параметры:
+            name (str): Имя переменной.
+            var_type (str): Тип переменной.
+            value (str): Значение переменной.
+        """
+        async with self.atransaction():
+            self.create_var(name, var_type, value)
+
+    async def aremove_var(self, name: str) -> None:
+        """
+        Асинхронный вариант remove_var.
+
+        Параметры:
+            name (str): Имя переменной.
+        """
+        async with self.atransaction():
+            self.remove_var(name)
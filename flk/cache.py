@@ -0,0 +1,210 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from flk.variable import Variable
+
+CACHE_DIR = '__flcache__'
+CACHE_SUFFIX = '.flc'
+# Версия формата записей кэша. Записи хранят объекты flk (Variable, узлы
+# синтаксического дерева) через pickle, поэтому версию нужно увеличивать
+# при любом изменении этих классов (полей, __slots__, имен) или самой записи.
+CACHE_FORMAT = 4
+CACHE_MAGIC = b'FLKC' + bytes((CACHE_FORMAT,))
+
+# Файлы, изменённые менее чем за столько секунд до записи кэша,
+# проверяются по содержимому даже при совпадении времени изменения.
+RACY_INTERVAL = 2.0
+
+
+class SourceInfo(NamedTuple):
+    """
+    Сведения об исходном файле, от которого зависит запись кэша.
+
+    Атрибуты:
+        path (str): Абсолютный путь к файлу.
+        mtime_ns (int): Время последнего изменения в наносекундах.
+        size (int): Размер файла в байтах.
+        digest (str): Хеш содержимого файла.
+    """
+    path: str
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+def source_digest(content: bytes) -> str:
+    """
+    Вычисляет хеш содержимого исходного файла.
+
+    Параметры:
+        content (bytes): Содержимое файла.
+
+    Возврат:
+        str: Хеш в шестнадцатеричном виде.
+    """
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def source_info(path: str, stat: os.stat_result, content: bytes) -> SourceInfo:
+    """
+    Собирает сведения об исходном файле для записи в кэш.
+
+    Параметры:
+        path (str): Путь к файлу.
+        stat (os.stat_result): Состояние файла, полученное до чтения.
+        content (bytes): Прочитанное содержимое файла.
+
+    Возврат:
+        SourceInfo: Сведения о файле.
+    """
+    return SourceInfo(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, source_digest(content))
+
+
+class FileCache:
+    """
+    Кэш разобранных файлов FL на диске, аналогичный файлам .pyc.
+
+    Для каждого файла в каталоге __flcache__ рядом с ним хранится результат
+    разбора вместе со сведениями обо всех файлах, прочитанных при разборе
+    (сам файл и его импорты). Запись используется, только если ни один
+    из этих файлов не изменился.
+
+    Атрибуты:
+        directory (str): Имя каталога кэша рядом с исходными файлами.
+        hits (int): Количество попаданий в кэш.
+        misses (int): Количество промахов кэша.
+    """
+    def __init__(self, directory: str = CACHE_DIR):
+        """
+        Инициализация кэша.
+
+        Параметры:
+            directory (str): Имя каталога кэша рядом с исходными файлами.
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, path: str) -> str:
+        """
+        Возвращает путь к файлу кэша для исходного файла.
+
+        Параметры:
+            path (str): Путь к исходному файлу.
+
+        Возврат:
+            str: Путь к файлу кэша.
+        """
+        folder, name = os.path.split(os.path.abspath(path))
+        return os.path.join(folder, self.directory, name + CACHE_SUFFIX)
+
+    def load(self, path: str,
+             variant: Optional[str] = None) -> Optional[Tuple[Dict[str, Variable], Dict[str, Any],
+                                                              List[SourceInfo], Dict[str, Any]]]:
+        """
+        Загружает результат разбора файла из кэша.
+
+        Параметры:
+            path (str): Путь к исходному файлу.
+            variant (Optional[str]): Настройки разбора, влияющие на значения;
+                запись, сохраненная с другими настройками, не используется.
+
+        Возврат:
+            Optional[Tuple[Dict[str, Variable], Dict[str, Any], List[SourceInfo], Dict[str, Any]]]:
+                Переменные, константы, сведения о прочитанных файлах и синтаксические
+                деревья с объявлениями (см. Parser.syntax_state) или None, если записи
+                нет или она устарела.
+        """
+        try:
+            with open(self.cache_path(path), 'rb') as file:
+                if file.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                    raise ValueError
+                record = pickle.load(file)
+            fresh = (record['path'] == os.path.abspath(path) and record.get('variant') == variant
+                     and self.is_fresh(record['sources'], record['stored_at']))
+        except Exception:
+            # Запись другой версии flk (переименованный или удаленный класс,
+            # другой набор полей) или поврежденный файл - это промах, а не ошибка.
+            fresh = False
+        if not fresh:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return record['data'], record['constants'], record['sources'], record['syntax']
+
+    def store(self, path: str, sources: List[SourceInfo],
+              data: Dict[str, Variable], constants: Dict[str, Any], variant: Optional[str] = None,
+              syntax: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Сохраняет результат разбора файла в кэш.
+
+        Запись выполняется атомарно; ошибки записи (например, каталог только
+        для чтения) игнорируются, как и при записи файлов .pyc.
+
+        Параметры:
+            path (str): Путь к исходному файлу.
+            sources (List[SourceInfo]): Сведения о всех прочитанных файлах.
+            data (Dict[str, Variable]): Переменные.
+            constants (Dict[str, Any]): Константы.
+            variant (Optional[str]): Настройки разбора, влияющие на значения.
+            syntax (Optional[Dict[str, Any]]): Синтаксические деревья файлов
+                и объявления, нужные для пересчета зависимых значений.
+        """
+        cache_path = self.cache_path(path)
+        record = {
+            'path': os.path.abspath(path),
+            'sources': sources,
+            'stored_at': time.time(),
+            'data': data,
+            'constants': constants,
+            'variant': variant,
+            'syntax': syntax or {},
+        }
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    file.write(CACHE_MAGIC)
+                    pickle.dump(record, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, cache_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except (OSError, pickle.PicklingError):
+            pass
+
+    def is_fresh(self, sources: List[SourceInfo], stored_at: float) -> bool:
+        """
+        Проверяет, что исходные файлы не изменились с момента записи кэша.
+
+        Совпадение размера и времени изменения считается достаточным, если файл
+        был изменён заметно раньше записи кэша; иначе сравнивается хеш содержимого.
+
+        Параметры:
+            sources (List[SourceInfo]): Сведения о файлах из записи кэша.
+            stored_at (float): Время записи кэша.
+
+        Возврат:
+            bool: True, если запись кэша актуальна.
+        """
+        for source in sources:
+            try:
+                stat = os.stat(source.path)
+            except OSError:
+                return False
+            if stat.st_size != source.size:
+                return False
+            if stat.st_mtime_ns == source.mtime_ns and source.mtime_ns / 1e9 < stored_at - RACY_INTERVAL:
+                continue
+            try:
+                with open(source.path, 'rb') as file:
+                    if source_digest(file.read()) != source.digest:
+                        return False
+            except OSError:
+                return False
+        return True
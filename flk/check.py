@@ -0,0 +1,249 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from flk.expression import CompiledExpression, Template
+from flk.lexer import ASSIGN, IMPORT, LexerError, tokenize_lines
+from flk.literal import recognize_value
+from flk.parser import Parser
+from flk.syntax import (
+    LOGICAL_EXPRESSION, PLAIN_VALUE, Expression, Literal, LogicalExpression, Reference, ValueNode,
+    constant_node, value_node,
+)
+
+# Типы, которые понимает Parser.parse_value.
+TYPES = frozenset(('str', 'int', 'float', 'bool', 'list', 'dict', 'set', 'tuple'))
+
+# События структуры файла, по которым проверяются связи между файлами:
+# ('import', абсолютный путь, строка), ('use', ссылка, строка, только константа),
+# ('const', имя, строка), ('var', имя, тип, строка).
+Event = Tuple[Any, ...]
+
+
+class CheckError(NamedTuple):
+    """
+    Ошибка, найденная при проверке файла.
+
+    Атрибуты:
+        path (str): Путь к файлу.
+        line (int): Номер строки; 0, если ошибка относится ко всему файлу.
+        message (str): Описание ошибки.
+    """
+    path: str
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}: {self.message}"
+
+
+def _fields(kind: str, name: Optional[str], var_type: Optional[str], value: str,
+            line: int, start: int, end: int) -> Tuple[str, Optional[str], Optional[str], str, int]:
+    """
+    Токен в виде простого кортежа: проверке не нужны ни смещения,
+    ни узлы синтаксического дерева объявлений.
+    """
+    return kind, name, var_type, value, line
+
+
+def _tokens(file: Iterable[str], path: str, errors: List[CheckError]) -> Iterator[Tuple[Any, ...]]:
+    """
+    Выдает токены файла, продолжая разбор после ошибок формата.
+
+    Объявление с ошибкой пропускается, а лексер запускается заново
+    со строки, следующей за ним; номера строк остаются номерами строк файла.
+    """
+    lines = iter(file)
+    first_line = 1
+    while True:
+        try:
+            yield from tokenize_lines(lines, _fields, first_line)
+            return
+        except LexerError as error:
+            errors.append(CheckError(path, error.line, str(error)))
+            first_line = error.end_line + 1
+
+
+def _uses(node: ValueNode, templates: Dict[str, Template]) -> List[Tuple[str, bool]]:
+    """
+    Проверяет значение объявления и возвращает его зависимости.
+
+    Литералы проверяются распознавателем (см. recognize_value) без
+    построения значений, выражения компилируются, но не вычисляются.
+
+    Возврат:
+        List[Tuple[str, bool]]: Ссылки и признак того, что имя может быть
+            только константой (имя без '$' в выражении).
+
+    Исключения:
+        ValueError: Если значение не разбирается по объявленному типу.
+    """
+    node_type = type(node)
+    if node_type is Literal:
+        references: List[str] = []
+        recognize_value(node.var_type, node.text, references)
+        return [(ref, False) for ref in references]
+    if node_type is Expression:
+        try:
+            compiled = CompiledExpression(node.text, None, templates)
+        except (ArithmeticError, TypeError) as error:
+            raise ValueError(f"Ошибка вычисления выражения {node.text}: {error}") from None
+        return [(ref, False) for ref in compiled.arguments] + [(name, True) for name in compiled.names]
+    if node_type is LogicalExpression:
+        match = LOGICAL_EXPRESSION.match(node.text.strip())
+        if match is None:
+            raise ValueError(f"Неправильный формат логического выражения: {node.text}")
+        return [(match.group(1), False), (match.group(3), False)]
+    if node_type is Reference:
+        return [(node.ref, False)]
+    return []
+
+
+def scan_file(path: str) -> Tuple[List[CheckError], List[Event]]:
+    """
+    Проверяет синтаксис, типы и значения одного файла без вычисления
+    выражений, построения значений и подстановки ссылок.
+
+    Параметры:
+        path (str): Путь к файлу.
+
+    Возврат:
+        Tuple[List[CheckError], List[Event]]: Ошибки файла и события его
+            структуры для проверки ссылок и импортов (см. check_files).
+    """
+    errors: List[CheckError] = []
+    events: List[Event] = []
+    add = events.append
+    resolver = Parser()
+    templates: Dict[str, Template] = {}
+    try:
+        file = open(path, 'r', encoding='utf-8', newline='')
+    except OSError as error:
+        return [CheckError(path, 0, f"Не удалось прочитать файл: {error.strerror}")], events
+    with file:
+        try:
+            for kind, name, var_type, value, line in _tokens(file, path, errors):
+                if kind == IMPORT:
+                    target = resolver.resolve_import(value, path)
+                    if os.path.isfile(target):
+                        add(('import', os.path.abspath(target), line))
+                    else:
+                        errors.append(CheckError(path, line, f"Модуль {value} не найден: {target}"))
+                    continue
+                if var_type not in TYPES:
+                    errors.append(CheckError(path, line, f"Неизвестный тип данных: {var_type}"))
+                elif kind == ASSIGN and PLAIN_VALUE.match(value) is not None:
+                    # Строка или скалярный литерал без ссылок: узел значения не нужен.
+                    if var_type != 'str':
+                        try:
+                            recognize_value(var_type, value, [])
+                        except ValueError as error:
+                            errors.append(CheckError(path, line, str(error)))
+                else:
+                    node = value_node(var_type, value) if kind == ASSIGN else constant_node(var_type, value)
+                    try:
+                        uses = _uses(node, templates)
+                    except ValueError as error:
+                        errors.append(CheckError(path, line, str(error)))
+                    else:
+                        for ref, constant in uses:
+                            add(('use', ref, line, constant))
+                if kind == ASSIGN:
+                    add(('var', name, var_type, line))
+                else:
+                    add(('const', name, line))
+        except UnicodeDecodeError as error:
+            errors.append(CheckError(path, 0, f"Файл не в кодировке UTF-8: {error.reason}"))
+    return errors, events
+
+
+class _Scope:
+    """
+    Имена, объявленные при обходе одного корневого файла и его импортов.
+    """
+    def __init__(self):
+        self.variables: Dict[str, str] = {}
+        self.constants: Set[str] = set()
+        self.visited: Set[str] = set()
+        self.stack: List[str] = []
+
+
+def _walk(key: str, scope: _Scope, outlines: Dict[str, Tuple[List[CheckError], List[Event]]],
+          errors: Set[CheckError]) -> None:
+    """
+    Проверяет ссылки и импорты файла в том порядке, в котором их
+    выполнил бы Parser.parse_file.
+    """
+    if key not in outlines:
+        outlines[key] = scan_file(key)
+    file_errors, events = outlines[key]
+    errors.update(file_errors)
+    scope.visited.add(key)
+    scope.stack.append(key)
+    variables = scope.variables
+    constants = scope.constants
+    for event in events:
+        kind = event[0]
+        if kind == 'use':
+            _, ref, line, constant = event
+            name, dot, _ = ref.partition('.')
+            if constant:
+                if name not in constants:
+                    errors.add(CheckError(key, line, f"Константа {name} не определена"))
+            elif name not in variables and name not in constants:
+                message = f"Объект {name} не определен" if dot else f"Константа или переменная {ref} не определена"
+                errors.add(CheckError(key, line, message))
+        elif kind == 'var':
+            _, name, var_type, line = event
+            declared = variables.setdefault(name, var_type)
+            if declared != var_type:
+                errors.add(CheckError(key, line, f"Переменная '{name}' уже определена с типом '{declared}'."))
+        elif kind == 'const':
+            constants.add(event[1])
+        else:
+            _, target, line = event
+            if target in scope.stack:
+                cycle = scope.stack[scope.stack.index(target):] + [target]
+                errors.add(CheckError(key, line, "Циклический импорт: " + " -> ".join(cycle)))
+            elif target not in scope.visited:
+                _walk(target, scope, outlines, errors)
+    scope.stack.pop()
+
+
+def check_files(paths: Iterable[str], workers: Optional[int] = None) -> List[CheckError]:
+    """
+    Проверяет файлы FL без вычисления значений.
+
+    Каждый файл разбирается лексером и проверяется по объявленным типам
+    (синтаксис литералов проверяется без построения значений, выражения
+    компилируются, но не вычисляются)
+    в пуле процессов. Затем в текущем процессе по собранной структуре
+    файлов проверяются цели импортов, циклы, ссылки на необъявленные
+    переменные и константы и переопределение переменных с другим типом -
+    в том же порядке, в котором файлы загрузил бы Parser.parse_file.
+    Проверка не останавливается на первой ошибке.
+
+    Параметры:
+        paths (Iterable[str]): Пути к файлам; каждый проверяется как
+            отдельный корневой файл вместе со своими импортами.
+        workers (Optional[int]): Число рабочих процессов; по умолчанию -
+            число ядер. При workers=1 файлы проверяются в текущем процессе.
+
+    Возврат:
+        List[CheckError]: Ошибки, упорядоченные по файлу и строке.
+    """
+    keys = list(dict.fromkeys(os.path.abspath(path) for path in paths))
+    workers = min(workers or os.cpu_count() or 1, len(keys) or 1)
+    if workers == 1:
+        scanned = [scan_file(key) for key in keys]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(keys) // (workers * 4))
+            scanned = list(pool.map(scan_file, keys, chunksize=chunksize))
+    outlines = dict(zip(keys, scanned))
+
+    errors: Set[CheckError] = set(chain.from_iterable(file_errors for file_errors, _ in scanned))
+    for key in keys:
+        _walk(key, _Scope(), outlines, errors)
+    return sorted(errors, key=lambda error: (error.path, error.line, error.message))
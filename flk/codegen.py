@@ -0,0 +1,250 @@
+import keyword
+import os
+import re
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from flk.fileio import atomic_write
+from flk.parser import Parser
+from flk.variable import Variable
+
+# Аннотации атрибутов по типам FL.
+ANNOTATIONS = {
+    'str': 'str',
+    'int': 'int',
+    'float': 'float',
+    'bool': 'bool',
+    'list': 'List[Any]',
+    'dict': 'Dict[str, Any]',
+    'set': 'Set[Any]',
+    'tuple': 'Tuple[Any, ...]',
+}
+
+# Поля класса: имя переменной в файле, имя атрибута и тип FL.
+Fields = Sequence[Tuple[str, str, str]]
+
+_WORDS = re.compile(r'[A-Za-z0-9]+')
+_TYPING_NAME = re.compile(r'[A-Z]\w*')
+
+# Имена, занятые членами сгенерированного класса и параметром self.
+RESERVED = frozenset(('load', 'self'))
+
+_MODULE = '''"""
+Типизированный доступ к переменным файла {source}.
+
+Модуль сгенерирован flk.codegen; при изменении объявлений файла
+его нужно сгенерировать заново.
+"""
+{imports}from typing import {typing_names}
+
+from flk.codegen import Fields, load_values
+from flk.parser import Parser
+
+SOURCE = {source_expr}
+FIELDS: Fields = (
+{fields})
+
+
+class {class_name}:
+    """
+    Переменные файла {source}.
+
+    Значение читается как обычный атрибут, без поиска по имени
+    и копирования.
+    """
+    __slots__ = ({slots})
+
+    def __init__(self{parameters}) -> None:
+{assignments}
+
+    @classmethod
+    def load(cls, source: Union[str, Parser, Mapping[str, Any]] = SOURCE) -> '{class_name}':
+        """
+        Загружает значения переменных (см. flk.codegen.load_values).
+
+        Параметры:
+            source (Union[str, Parser, Mapping[str, Any]]): Путь к файлу,
+                парсер или словарь значений; по умолчанию - исходный файл.
+
+        Возврат:
+            {class_name}: Значения переменных.
+        """
+        return cls(*load_values(source, FIELDS))
+
+    def __repr__(self) -> str:
+        return f"{class_name}({{', '.join(f'{{name}}={{getattr(self, name)!r}}' for name in self.__slots__)}})"
+'''
+
+
+def class_name_for(path: str) -> str:
+    """
+    Возвращает имя класса по имени файла: my-app.fl - MyAppConfig.
+
+    Параметры:
+        path (str): Путь к файлу FL.
+
+    Возврат:
+        str: Имя класса.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = ''.join(word[:1].upper() + word[1:] for word in _WORDS.findall(stem)) + 'Config'
+    return name if name[0].isalpha() else 'Fl' + name
+
+
+def attribute_name(name: str) -> str:
+    """
+    Возвращает имя атрибута Python для имени переменной: к ключевым словам,
+    именам членов сгенерированного класса (load, self) и именам вида
+    __имя__ добавляется '_' в конце, к именам, начинающимся с цифры, - в начале.
+
+    Параметры:
+        name (str): Имя переменной.
+
+    Возврат:
+        str: Имя атрибута.
+    """
+    if keyword.iskeyword(name) or name in RESERVED or (name.startswith('__') and name.endswith('__')):
+        return name + '_'
+    if not name.isidentifier():
+        return '_' + name
+    return name
+
+
+def declared_fields(path: str) -> List[Tuple[str, str, str]]:
+    """
+    Возвращает объявленные переменные файла вместе с импортированными.
+
+    Файл разбирается в ленивом режиме, поэтому значения не вычисляются.
+
+    Параметры:
+        path (str): Путь к файлу FL.
+
+    Возврат:
+        List[Tuple[str, str, str]]: Имя переменной, имя атрибута и тип
+            в порядке объявления.
+
+    Исключения:
+        ValueError: Если тип переменной неизвестен или два имени
+            переменных дают одно имя атрибута.
+    """
+    parser = Parser(lazy=True)
+    parser.parse_file(path)
+    fields = []
+    attributes: Dict[str, str] = {}
+    for name, statement in parser.declarations.items():
+        if statement.var_type not in ANNOTATIONS:
+            raise ValueError(f"Неизвестный тип данных: {statement.var_type}")
+        attribute = attribute_name(name)
+        if attribute in attributes:
+            raise ValueError(f"Переменные {attributes[attribute]} и {name} дают один атрибут {attribute}")
+        attributes[attribute] = name
+        fields.append((name, attribute, statement.var_type))
+    return fields
+
+
+def generate(path: str, class_name: Optional[str] = None, output: Optional[str] = None) -> str:
+    """
+    Генерирует модуль Python с классом доступа к переменным файла FL.
+
+    Класс хранит значения в __slots__ с аннотациями по объявленным
+    типам, а его метод load заполняет их из файла, парсера или словаря
+    значений. Модуль - обычный файл Python и кэшируется в .pyc.
+
+    Параметры:
+        path (str): Путь к файлу FL.
+        class_name (Optional[str]): Имя класса; по умолчанию строится
+            по имени файла (см. class_name_for).
+        output (Optional[str]): Путь, по которому будет лежать модуль;
+            если задан, путь к файлу FL хранится относительно модуля.
+
+    Возврат:
+        str: Текст модуля.
+
+    Исключения:
+        ValueError: Если тип переменной неизвестен или имена атрибутов совпадают.
+    """
+    fields = declared_fields(path)
+    class_name = class_name or class_name_for(path)
+    attributes = [attribute for _, attribute, _ in fields]
+    # Импортируются только имена, которые использует модуль.
+    typing_names = {'Any', 'Mapping', 'Union'}
+    for _, _, var_type in fields:
+        typing_names.update(_TYPING_NAME.findall(ANNOTATIONS[var_type]))
+    if output is None:
+        imports = ''
+        source_expr = repr(path)
+    else:
+        imports = 'import os\n'
+        relative = os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(output)))
+        source_expr = f"os.path.join(os.path.dirname(__file__), {relative!r})"
+    return _MODULE.format(
+        imports=imports,
+        typing_names=', '.join(sorted(typing_names)),
+        source=os.path.basename(path),
+        source_expr=source_expr,
+        class_name=class_name,
+        fields=''.join(f"    {field!r},\n" for field in fields),
+        slots=''.join(f"\n        {attribute!r}," for attribute in attributes) + ('\n    ' if fields else ''),
+        parameters=''.join(f",\n                 {attribute}: {ANNOTATIONS[var_type]}"
+                           for _, attribute, var_type in fields),
+        assignments='\n'.join(f"        self.{attribute} = {attribute}" for attribute in attributes) or "        pass",
+    )
+
+
+def write_module(path: str, output: str, class_name: Optional[str] = None) -> None:
+    """
+    Генерирует модуль (см. generate) и атомарно записывает его в файл.
+
+    Параметры:
+        path (str): Путь к файлу FL.
+        output (str): Путь к модулю Python.
+        class_name (Optional[str]): Имя класса.
+    """
+    atomic_write(output, generate(path, class_name, output))
+
+
+def load_values(source: Union[str, Parser, Mapping], fields: Fields) -> List[Any]:
+    """
+    Возвращает значения полей сгенерированного класса в порядке fields.
+
+    Путь к файлу разбирается парсером с кэшем разобранных файлов.
+    У парсера и у подключенного общего файла (flk.shared.attach)
+    проверяются типы переменных; у снимка (Parser.snapshot) и словаря
+    значений parse_file - нет. Значения копируются один раз, как
+    Variable.get_value, поэтому изменение коллекции в атрибуте не меняет
+    значения парсера или словаря, а чтение атрибута остается простым.
+
+    Параметры:
+        source (Union[str, Parser, Mapping]): Путь к файлу, парсер или словарь значений.
+        fields (Fields): Поля класса.
+
+    Возврат:
+        List[Any]: Значения полей.
+
+    Исключения:
+        ValueError: Если переменной нет.
+        TypeError: Если переменная объявлена с другим типом, чем при генерации.
+    """
+    if isinstance(source, str):
+        parser = Parser(cache=True)
+        parser.parse_file(source)
+        source = parser
+    values = []
+    if isinstance(source, Parser):
+        for name, _, var_type in fields:
+            if name not in source.data and name not in source.pending:
+                raise ValueError(f"Переменная {name} не найдена")
+            variable = source.get_var(name)
+            if variable.get_type() != var_type:
+                raise TypeError(f"Переменная '{name}' объявлена с типом '{variable.get_type()}', "
+                                f"а не '{var_type}'.")
+            values.append(variable.get_value())
+        return values
+    get_type = getattr(source, 'get_type', None)
+    for name, _, var_type in fields:
+        if name not in source:
+            raise ValueError(f"Переменная {name} не найдена")
+        if get_type is not None and get_type(name) != var_type:
+            raise TypeError(f"Переменная '{name}' объявлена с типом '{get_type(name)}', а не '{var_type}'.")
+        values.append(Variable(var_type, source[name]).get_value())
+    return values
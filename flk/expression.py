@@ -0,0 +1,268 @@
+import operator
+import re
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
+_TOKEN = re.compile(r'''\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?|"[^"]*"|'[^']*'|\$\w*(?:\.\w+)*|\w+|\*\*|//|\S''')
+_REFERENCE = re.compile(r'\$(\w+(?:\.\w+)*)')
+
+_BINARY = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '%': operator.mod,
+    '**': operator.pow,
+}
+_UNARY = {'-': operator.neg, '+': operator.pos}
+# Приоритеты операторов; унарные операторы хранятся в стеке с префиксом 'u'.
+_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '//': 2, '%': 2, 'u-': 3, 'u+': 3, '**': 4}
+_KEYWORDS = {'True': True, 'False': False, 'None': None}
+_DIGITS = frozenset('0123456789.')
+_IMMUTABLE = (int, float, complex, str, bool, bytes, type(None))
+
+# Функция получения значения по имени: (имя, это ссылка через '$') -> значение.
+Lookup = Callable[[str, bool], Any]
+# Операнд при компиляции: (значение известно заранее, значение или функция
+# от Lookup и имен ссылок).
+Operand = Tuple[bool, Any]
+
+
+class Template(NamedTuple):
+    """
+    Скомпилированная форма выражения без конкретных имен ссылок.
+
+    Выражения, отличающиеся только именами ссылок ($a * 2 и $b * 2),
+    используют один шаблон.
+
+    Атрибуты:
+        constant (bool): True, если значение вычислено при компиляции.
+        value (Any): Значение или функция (lookup, имена ссылок) -> значение.
+        names (FrozenSet[str]): Имена констант, используемые без '$'.
+        arguments (Tuple[str, ...]): Имена ссылок, если они известны при компиляции.
+    """
+    constant: bool
+    value: Any
+    names: FrozenSet[str]
+    arguments: Tuple[str, ...]
+
+
+class CompiledExpression:
+    """
+    Скомпилированное арифметическое выражение.
+
+    Текст выражения за один проход превращается в цепочку замыканий;
+    операции над литералами и подставленными константами выполняются
+    сразу при компиляции. Вычисление не использует eval.
+
+    Поддерживаются числа, строки в кавычках, ссылки $имя и $объект.ключ,
+    имена констант, True/False/None, скобки, унарные + и -, бинарные
+    +, -, *, /, //, % и **.
+
+    Атрибуты:
+        text (str): Текст выражения.
+        template (Template): Скомпилированная форма выражения.
+        arguments (Tuple[str, ...]): Имена ссылок в порядке следования.
+        references (FrozenSet[str]): Имена переменных, на которые ссылается выражение.
+        names (FrozenSet[str]): Имена констант, используемые в выражении без '$'.
+    """
+    def __init__(self, text: str, constants: Optional[Mapping[str, Any]] = None,
+                 templates: Optional[Dict[str, Template]] = None):
+        """
+        Компилирует выражение.
+
+        Параметры:
+            text (str): Текст выражения.
+            constants (Optional[Mapping[str, Any]]): Значения констант,
+                подставляемые в выражение при компиляции.
+            templates (Optional[Dict[str, Template]]): Кэш шаблонов, общий для
+                выражений, скомпилированных с теми же константами.
+
+        Исключения:
+            ValueError: Если выражение имеет неправильный формат.
+        """
+        self.text = text
+        if templates is None or '"' in text or "'" in text:
+            # В строках в кавычках символ '$' не заменяется на место для ссылки.
+            template = _compile(text, constants or {})
+            self.arguments = template.arguments
+        else:
+            self.arguments = tuple(_REFERENCE.findall(text))
+            key = _REFERENCE.sub('$', text) if self.arguments else text
+            template = templates.get(key)
+            if template is None:
+                try:
+                    template = templates[key] = _compile(key, constants or {})
+                except ValueError:
+                    raise ValueError(f"Неправильный формат выражения: {text}") from None
+            if len(template.arguments) != len(self.arguments):
+                raise ValueError(f"Неправильный формат выражения: {text}")
+        self.template = template
+        self.references = frozenset(argument.split('.', 1)[0] for argument in self.arguments)
+        self.names = template.names
+
+    def evaluate(self, lookup: Lookup) -> Any:
+        """
+        Вычисляет значение выражения.
+
+        Числовой результат округляется до 5 знаков после запятой.
+
+        Параметры:
+            lookup (Lookup): Функция, возвращающая значение ссылки или константы.
+
+        Возврат:
+            Any: Значение выражения.
+        """
+        template = self.template
+        result = template.value if template.constant else template.value(lookup, self.arguments)
+        if type(result) is int or type(result) is float:
+            return round(result, 5)
+        return result
+
+
+def _compile(text: str, constants: Mapping[str, Any]) -> Template:
+    """
+    Компилирует выражение алгоритмом сортировочной станции.
+
+    Ссылки компилируются как места для имен: ссылка с номером i при
+    вычислении получает i-е имя из переданного списка. В тексте шаблона
+    вместо ссылки может стоять один символ '$'.
+
+    Параметры:
+        text (str): Текст выражения или шаблона.
+        constants (Mapping[str, Any]): Подставляемые значения констант.
+
+    Возврат:
+        Template: Скомпилированная форма выражения.
+
+    Исключения:
+        ValueError: Если выражение имеет неправильный формат.
+    """
+    operands: List[Operand] = []
+    operators: List[str] = []
+    names: List[str] = []
+    arguments: List[str] = []
+    expect_operand = True
+    for token in _TOKEN.findall(text):
+        first = token[0]
+        if expect_operand:
+            expect_operand = False
+            if first == '$':
+                operands.append(_reference(len(arguments)))
+                arguments.append(token[1:])
+            elif first in _DIGITS:
+                is_float = '.' in token or 'e' in token or 'E' in token
+                operands.append((True, float(token) if is_float else int(token)))
+            elif first == '(':
+                operators.append('(')
+                expect_operand = True
+            elif token == '-' or token == '+':
+                operators.append('u' + token)
+                expect_operand = True
+            elif first == '"' or first == "'":
+                operands.append((True, token[1:-1]))
+            elif first.isalpha() or first == '_':
+                if token in _KEYWORDS:
+                    operands.append((True, _KEYWORDS[token]))
+                else:
+                    names.append(token)
+                    operands.append((True, constants[token]) if token in constants else _name(token))
+            else:
+                raise ValueError(f"Неправильный формат выражения: {text}")
+        elif first == ')':
+            while operators and operators[-1] != '(':
+                _apply(operators.pop(), operands)
+            if not operators:
+                raise ValueError(f"Неправильный формат выражения: {text}")
+            operators.pop()
+        elif token in _BINARY:
+            precedence = _PRECEDENCE[token]
+            while operators and operators[-1] != '(':
+                top = _PRECEDENCE[operators[-1]]
+                if top < precedence or (top == precedence and token == '**'):
+                    break
+                _apply(operators.pop(), operands)
+            operators.append(token)
+            expect_operand = True
+        else:
+            raise ValueError(f"Неправильный формат выражения: {text}")
+    if expect_operand:
+        raise ValueError(f"Неправильный формат выражения: {text}")
+    while operators:
+        op = operators.pop()
+        if op == '(':
+            raise ValueError(f"Незакрытая скобка в выражении: {text}")
+        _apply(op, operands)
+    constant, value = operands[0]
+    return Template(constant, value, frozenset(names), tuple(arguments))
+
+
+def _reference(index: int) -> Operand:
+    """
+    Компилирует ссылку с номером index.
+    """
+    return False, lambda lookup, arguments: lookup(arguments[index], True)
+
+
+def _name(name: str) -> Operand:
+    """
+    Компилирует имя константы, значение которой неизвестно при компиляции.
+    """
+    return False, lambda lookup, arguments: lookup(name, False)
+
+
+def _apply(op: str, operands: List[Operand]) -> None:
+    """
+    Заменяет операнды на вершине стека результатом оператора.
+
+    Если все операнды известны заранее и результат неизменяем,
+    операция выполняется сразу; иначе строится замыкание.
+    """
+    if op[0] == 'u':
+        function = _UNARY[op[1]]
+        constant, value = operands.pop()
+        if constant:
+            folded = _fold(function, value)
+            if folded is not _NOT_FOLDED:
+                operands.append((True, folded))
+                return
+            operands.append((False, lambda lookup, arguments: function(value)))
+        else:
+            operands.append((False, lambda lookup, arguments: function(value(lookup, arguments))))
+        return
+
+    function = _BINARY[op]
+    right_constant, right = operands.pop()
+    left_constant, left = operands.pop()
+    if left_constant and right_constant:
+        folded = _fold(function, left, right)
+        if folded is not _NOT_FOLDED:
+            operands.append((True, folded))
+            return
+        operands.append((False, lambda lookup, arguments: function(left, right)))
+    elif right_constant:
+        operands.append((False, lambda lookup, arguments: function(left(lookup, arguments), right)))
+    elif left_constant:
+        operands.append((False, lambda lookup, arguments: function(left, right(lookup, arguments))))
+    else:
+        operands.append((False, lambda lookup, arguments: function(left(lookup, arguments),
+                                                                   right(lookup, arguments))))
+
+
+_NOT_FOLDED = object()
+
+
+def _fold(function: Callable[..., Any], *values: Any) -> Any:
+    """
+    Выполняет операцию над известными заранее значениями при компиляции.
+
+    Возврат:
+        Any: Результат или _NOT_FOLDED, если операция завершилась ошибкой
+            (она повторится при вычислении) или дала изменяемый объект,
+            который нельзя разделять между вычислениями.
+    """
+    try:
+        result = function(*values)
+    except Exception:
+        return _NOT_FOLDED
+    return result if isinstance(result, _IMMUTABLE) else _NOT_FOLDED
@@ -0,0 +1,124 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, List, Tuple, Union
+
+
+def _write_temp(path: str, content: bytes) -> str:
+    """
+    Записывает содержимое во временный файл рядом с целевым.
+
+    Параметры:
+        path (str): Путь к целевому файлу.
+        content (bytes): Содержимое.
+
+    Возврат:
+        str: Путь к временному файлу.
+    """
+    fd, temp_path = _create_temp(path)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        _copy_mode(path, temp_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def _create_temp(path: str) -> Tuple[int, str]:
+    """
+    Создает временный файл в каталоге целевого файла.
+
+    Параметры:
+        path (str): Путь к целевому файлу.
+
+    Возврат:
+        Tuple[int, str]: Дескриптор и путь временного файла.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    return tempfile.mkstemp(dir=folder, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+
+
+def _copy_mode(path: str, temp_path: str) -> None:
+    """
+    Переносит права доступа целевого файла, если он существует, на временный файл.
+    """
+    try:
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+    except OSError:
+        pass
+
+
+@contextmanager
+def atomic_open(path: str, binary: bool = False, encoding: str = 'utf-8') -> Iterator[IO]:
+    """
+    Открывает временный файл для потоковой записи и атомарно заменяет
+    им целевой файл при выходе из блока with.
+
+    Если в блоке возникло исключение, целевой файл не изменяется.
+
+    Параметры:
+        path (str): Путь к целевому файлу.
+        binary (bool): Открыть файл в двоичном режиме.
+        encoding (str): Кодировка текстового режима.
+
+    Возврат:
+        Iterator[IO]: Открытый временный файл.
+    """
+    fd, temp_path = _create_temp(path)
+    try:
+        if binary:
+            file = os.fdopen(fd, 'wb')
+        else:
+            file = os.fdopen(fd, 'w', encoding=encoding, newline='')
+        with file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        _copy_mode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def atomic_write(path: str, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
+    """
+    Атомарно перезаписывает файл через временный файл и переименование.
+
+    Параметры:
+        path (str): Путь к файлу.
+        content (Union[str, bytes]): Новое содержимое файла.
+        encoding (str): Кодировка.
+    """
+    atomic_write_many({path: content}, encoding)
+
+
+def atomic_write_many(files: Dict[str, Union[str, bytes]], encoding: str = 'utf-8') -> None:
+    """
+    Атомарно перезаписывает несколько файлов.
+
+    Сначала все новые версии записываются во временные файлы, и только затем
+    они переименовываются поверх исходных, так что сбой во время записи
+    не оставляет ни одного наполовину записанного файла.
+
+    Параметры:
+        files (Dict[str, Union[str, bytes]]): Новое содержимое по путям файлов.
+        encoding (str): Кодировка.
+    """
+    written: List[Tuple[str, str]] = []
+    try:
+        for path, content in files.items():
+            if isinstance(content, str):
+                content = content.encode(encoding)
+            written.append((_write_temp(path, content), path))
+    except BaseException:
+        for temp_path, _ in written:
+            os.unlink(temp_path)
+        raise
+    for temp_path, path in written:
+        os.replace(temp_path, path)
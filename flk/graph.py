@@ -0,0 +1,103 @@
+from typing import Dict, Iterable, List, Set
+
+
+class DependencyGraph:
+    """
+    Граф зависимостей между переменными и константами.
+
+    Ребро name -> dependency означает, что значение name вычисляется
+    по значению dependency (через ссылку $dependency или имя константы).
+
+    Атрибуты:
+        dependencies (Dict[str, Set[str]]): Зависимости каждого имени.
+        dependents (Dict[str, Set[str]]): Имена, зависящие от каждого имени.
+    """
+    def __init__(self):
+        """
+        Инициализация пустого графа.
+        """
+        self.dependencies: Dict[str, Set[str]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+
+    def set_dependencies(self, name: str, dependencies: Iterable[str]) -> None:
+        """
+        Задает зависимости имени, заменяя прежние.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+            dependencies (Iterable[str]): Имена, от которых зависит значение.
+        """
+        self.remove(name)
+        dependencies = set(dependencies)
+        dependencies.discard(name)
+        self.dependencies[name] = dependencies
+        for dependency in dependencies:
+            self.dependents.setdefault(dependency, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        """
+        Удаляет зависимости имени из графа.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+        """
+        for dependency in self.dependencies.pop(name, ()):
+            dependents = self.dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(name)
+                if not dependents:
+                    del self.dependents[dependency]
+
+    def affected(self, names: Iterable[str]) -> Set[str]:
+        """
+        Возвращает имена и все имена, транзитивно зависящие от них.
+
+        Параметры:
+            names (Iterable[str]): Измененные имена.
+
+        Возврат:
+            Set[str]: Затронутые имена.
+        """
+        result = set(names)
+        stack = list(result)
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent not in result:
+                    result.add(dependent)
+                    stack.append(dependent)
+        return result
+
+    def order(self, names: Iterable[str]) -> List[str]:
+        """
+        Возвращает затронутые изменением имена в порядке пересчета.
+
+        Каждое имя идет после всех имен, от которых оно зависит.
+
+        Параметры:
+            names (Iterable[str]): Измененные имена.
+
+        Возврат:
+            List[str]: Затронутые имена в топологическом порядке.
+
+        Исключения:
+            ValueError: Если зависимости образуют цикл.
+        """
+        affected = self.affected(names)
+        remaining = {
+            name: len(self.dependencies.get(name, set()) & affected)
+            for name in affected
+        }
+        ready = sorted(name for name, count in remaining.items() if count == 0)
+        result = []
+        while ready:
+            name = ready.pop()
+            result.append(name)
+            for dependent in self.dependents.get(name, ()):
+                if dependent in remaining:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        ready.append(dependent)
+        if len(result) != len(affected):
+            cycle = sorted(name for name, count in remaining.items() if count > 0)
+            raise ValueError("Циклическая зависимость: " + ", ".join(cycle))
+        return result
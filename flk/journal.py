@@ -0,0 +1,286 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from flk.fileio import atomic_write
+from flk.spans import SpanIndex
+from flk.syntax import parse_module
+from flk.transaction import patch_content
+
+try:
+    import fcntl
+except ImportError:  # Windows: журнал работает без межпроцессной блокировки.
+    fcntl = None
+
+JOURNAL_SUFFIX = '-journal'
+# Размер журнала в байтах, после которого он переносится в исходный файл.
+COMPACT_LIMIT = 1 << 16
+
+# Изменения объявлений по именам; None означает удаление объявления.
+Entries = Dict[str, Optional[str]]
+
+
+def _lock(file, exclusive: bool) -> None:
+    """
+    Блокирует файл журнала для всех процессов до закрытия файла.
+    """
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def read_entries(content: bytes) -> Tuple[Entries, int]:
+    """
+    Разбирает записи журнала.
+
+    Каждая запись - одна строка JSON со списком пар [имя, объявление]
+    одной транзакции. Оборванная или поврежденная запись в конце журнала
+    (после сбоя во время записи) и все, что идет за ней, отбрасываются.
+
+    Параметры:
+        content (bytes): Содержимое журнала.
+
+    Возврат:
+        Tuple[Entries, int]: Итоговые изменения по именам (последнее изменение
+            имени побеждает) и длина неповрежденной части журнала в байтах.
+    """
+    entries: Entries = {}
+    valid = 0
+    while True:
+        end = content.find(b'\n', valid)
+        if end == -1:
+            break
+        try:
+            record = json.loads(content[valid:end])
+        except ValueError:
+            break
+        for name, declaration in record:
+            entries[name] = declaration
+        valid = end + 1
+    return entries, valid
+
+
+def apply_entries(content: bytes, entries: Entries, filename: Optional[str] = None) -> bytes:
+    """
+    Применяет изменения журнала к исходному тексту файла.
+
+    Объявления существующих переменных заменяются или удаляются на месте,
+    новые добавляются в конец файла. Повторное применение тех же изменений
+    не меняет результат, поэтому сбой между переносом журнала в файл
+    и очисткой журнала безопасен.
+
+    Параметры:
+        content (bytes): Исходный текст файла.
+        entries (Entries): Изменения объявлений по именам.
+        filename (Optional[str]): Имя файла для сообщений об ошибках.
+
+    Возврат:
+        bytes: Текст файла с примененными изменениями.
+    """
+    if not entries:
+        return content
+    spans = SpanIndex(parse_module(content.decode('utf-8'), filename), content)
+    patches = {name: declaration for name, declaration in entries.items() if name in spans}
+    appends = {name: declaration for name, declaration in entries.items()
+               if name not in spans and declaration is not None}
+    return patch_content(spans, patches, appends, content, 0)[0]
+
+
+class EditJournal:
+    """
+    Журналы изменений файлов FL.
+
+    Изменение переменной дописывается в журнал рядом с файлом
+    (example.fl-journal) под блокировкой, за время, не зависящее от размера
+    файла, и не перезаписывает изменения других процессов. При чтении
+    файла журнал применяется поверх его текста. Когда журнал становится
+    больше limit, он переносится в файл и очищается.
+
+    Атрибуты:
+        limit (int): Размер журнала в байтах, после которого он переносится в файл.
+        background (bool): Переносить журналы в фоновом потоке.
+        compacting (Set[str]): Файлы, журналы которых сейчас переносятся в фоне.
+        threads (List[threading.Thread]): Запущенные фоновые переносы.
+    """
+    def __init__(self, limit: int = COMPACT_LIMIT, background: bool = False):
+        """
+        Инициализация журналов.
+
+        Параметры:
+            limit (int): Размер журнала в байтах, после которого он переносится в файл.
+            background (bool): Переносить журналы в фоновом потоке, не задерживая изменение.
+        """
+        self.limit = limit
+        self.background = background
+        self.compacting: Set[str] = set()
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+
+    def path_for(self, path: str) -> str:
+        """
+        Возвращает путь к журналу файла.
+
+        Параметры:
+            path (str): Путь к файлу FL.
+
+        Возврат:
+            str: Путь к журналу.
+        """
+        return path + JOURNAL_SUFFIX
+
+    def source_for(self, path: str) -> Optional[str]:
+        """
+        Возвращает путь к файлу FL по пути к его журналу.
+
+        Параметры:
+            path (str): Путь к файлу.
+
+        Возврат:
+            Optional[str]: Путь к файлу FL или None, если путь не является журналом.
+        """
+        if path.endswith(JOURNAL_SUFFIX):
+            return path[:-len(JOURNAL_SUFFIX)]
+        return None
+
+    def read(self, path: str, record: Callable[[str, os.stat_result, bytes], None]) -> bytes:
+        """
+        Читает файл вместе с его журналом.
+
+        Файл и журнал читаются под общей блокировкой журнала, поэтому
+        одновременный перенос журнала в файл не приводит к потере
+        или двойному применению изменений. Пустой журнал создается,
+        чтобы изменения других процессов можно было заметить при перезагрузке.
+
+        Параметры:
+            path (str): Путь к файлу FL.
+            record (Callable[[str, os.stat_result, bytes], None]): Вызывается
+                с путем, состоянием и содержимым для файла и для журнала.
+
+        Возврат:
+            bytes: Текст файла с примененным журналом.
+        """
+        journal_path = self.path_for(path)
+        journal = None
+        if os.path.exists(path):
+            try:
+                journal = open(journal_path, 'a+b')
+            except OSError:
+                pass
+        try:
+            if journal is not None:
+                _lock(journal, exclusive=False)
+            with open(path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                content = file.read()
+            record(path, stat, content)
+            if journal is None:
+                return content
+            journal.seek(0)
+            journal_stat = os.fstat(journal.fileno())
+            journal_content = journal.read()
+            record(journal_path, journal_stat, journal_content)
+        finally:
+            if journal is not None:
+                journal.close()
+        return apply_entries(content, read_entries(journal_content)[0], path)
+
+    def append(self, path: str, entries: Entries) -> Tuple[int, os.stat_result]:
+        """
+        Дописывает изменения одной транзакции в журнал файла одной записью
+        и сбрасывает ее на диск.
+
+        Параметры:
+            path (str): Путь к файлу FL.
+            entries (Entries): Изменения объявлений по именам.
+
+        Возврат:
+            Tuple[int, os.stat_result]: Размер журнала до записи и состояние после нее.
+        """
+        record = json.dumps(list(entries.items()), ensure_ascii=False).encode('utf-8') + b'\n'
+        with open(self.path_for(path), 'a+b') as journal:
+            _lock(journal, exclusive=True)
+            size = journal.seek(0, os.SEEK_END)
+            if size:
+                # Оборванная запись после сбоя отрезается, чтобы не испортить новую.
+                journal.seek(size - 1)
+                if journal.read(1) != b'\n':
+                    journal.seek(0)
+                    size = read_entries(journal.read())[1]
+                    journal.truncate(size)
+            journal.write(record)
+            journal.flush()
+            os.fsync(journal.fileno())
+            stat = os.fstat(journal.fileno())
+        if stat.st_size > self.limit:
+            self.schedule(path)
+        return size, stat
+
+    def schedule(self, path: str) -> None:
+        """
+        Переносит журнал в файл сразу или, если включен фоновый режим,
+        в фоновом потоке (не более одного потока на файл).
+
+        Параметры:
+            path (str): Путь к файлу FL.
+        """
+        if not self.background:
+            self.compact(path)
+            return
+        with self.lock:
+            if path in self.compacting:
+                return
+            self.compacting.add(path)
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+            thread = threading.Thread(target=self.compact_background, args=(path,), daemon=True)
+            self.threads.append(thread)
+        thread.start()
+
+    def compact_background(self, path: str) -> None:
+        """
+        Переносит журнал в файл в фоновом потоке.
+        """
+        try:
+            self.compact(path)
+        finally:
+            with self.lock:
+                self.compacting.discard(path)
+
+    def compact(self, path: str) -> bool:
+        """
+        Переносит журнал в файл и очищает журнал.
+
+        Файл заменяется атомарно под исключительной блокировкой журнала,
+        так что читатели и другие процессы видят либо прежний файл с журналом,
+        либо новый файл с пустым журналом.
+
+        Параметры:
+            path (str): Путь к файлу FL.
+
+        Возврат:
+            bool: True, если в журнале были изменения.
+        """
+        try:
+            journal = open(self.path_for(path), 'r+b')
+        except FileNotFoundError:
+            return False
+        with journal:
+            _lock(journal, exclusive=True)
+            entries, valid = read_entries(journal.read())
+            if entries:
+                with open(path, 'rb') as file:
+                    content = file.read()
+                atomic_write(path, apply_entries(content, entries, path))
+            if entries or valid != journal.tell():
+                journal.truncate(0)
+                journal.flush()
+                os.fsync(journal.fileno())
+        return bool(entries)
+
+    def wait(self) -> None:
+        """
+        Дожидается завершения фоновых переносов.
+        """
+        with self.lock:
+            threads = list(self.threads)
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,411 @@
+import os
+from collections import ChainMap
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+
+from flk.graph import DependencyGraph
+from flk.parser import CircularImportError, Parser
+from flk.query import step
+from flk.serializer import value_type
+from flk.syntax import Assignment, Constant, Import, Statement, references
+from flk.variable import Variable
+
+_MISSING = object()
+
+
+class _LayerEvaluator(Parser):
+    """
+    Парсер, вычисляющий объявления слоя: ссылки и константы ищутся
+    по цепочке слоев, начиная с вычисляемого.
+    """
+    def __init__(self, layer: 'Layer'):
+        super().__init__()
+        self.layer = layer
+        self.constants = layer.constants
+
+    def parse_reference(self, ref: str) -> Any:
+        name, dot, path = ref.partition('.')
+        value = self.layer.lookup(name)
+        if value is _MISSING:
+            if dot:
+                raise ValueError(f"Объект {name} не определен")
+            raise ValueError(f"Константа или переменная {ref} не определена")
+        if dot:
+            for key in path.split('.'):
+                try:
+                    value = step(value, key)
+                except KeyError:
+                    raise ValueError(f"Значение {ref} не определено") from None
+        return value
+
+
+class Layer(Mapping):
+    """
+    Слой переопределений поверх разобранной конфигурации.
+
+    Базовая конфигурация разбирается одним парсером один раз, а слои
+    (окружения, арендаторы) хранят только свои значения: переопределенные
+    и пересчитанные по ним. Значение ищется от верхнего слоя к базе.
+    Объявления нижних слоев, ссылающиеся на переопределенные имена
+    (через $ссылку или имя константы), вычисляются заново в слое,
+    поэтому память и время создания слоя зависят от размера
+    переопределений и их зависимых, а не от размера базы. Слои можно
+    накладывать друг на друга (layer.overlay).
+
+    Слой отражает нижние слои на момент создания: после изменения
+    базового парсера слои нужно создать заново. Значения возвращаются
+    без копирования, но только для чтения (как Parser.get_view): список -
+    кортежем, словарь - MappingProxyType, множество - frozenset, поэтому
+    изменить через слой значения базы или других слоев нельзя.
+
+    Атрибуты:
+        parent (Union[Parser, Layer]): Нижний слой или базовый парсер.
+        base (Parser): Базовый парсер.
+        values (Dict[str, Any]): Значения переменных этого слоя.
+        types (Dict[str, str]): Типы переменных этого слоя.
+        constants (ChainMap): Значения констант с учетом всех слоев.
+        declarations (Dict[str, Optional[Statement]]): Объявления этого слоя;
+            None - значение задано словарем и ни от чего не зависит.
+        views (Dict[str, Any]): Представления значений этого слоя только
+            для чтения, построенные при первом обращении.
+    """
+    def __init__(self, parent: Union[Parser, 'Layer'], source: Union[str, Mapping[str, Any]]):
+        """
+        Создает слой и вычисляет его значения.
+
+        Параметры:
+            parent (Union[Parser, Layer]): Базовый парсер с разобранными
+                файлами или нижний слой.
+            source (Union[str, Mapping[str, Any]]): Файл FL с объявлениями
+                слоя (импорты разрешаются относительно него) или словарь
+                значений переменных и констант.
+
+        Исключения:
+            TypeError: Если переменная переопределяется с другим типом
+                или значение словаря не соответствует объявленному типу.
+            ValueError: Если объявление имеет неправильный формат, ссылка
+                не определена, зависимости образуют цикл или у базового
+                парсера нет объявлений переменных.
+        """
+        self.parent = parent
+        if isinstance(parent, Layer):
+            self.base = parent.base
+            self.chain: List[Layer] = [self] + parent.chain
+            parent_constants = parent.constants
+        else:
+            if parent.data and not parent.declarations:
+                # Без объявлений зависимые значения базы нельзя пересчитать.
+                raise ValueError("У базового парсера нет объявлений переменных: разберите файлы через parse_file")
+            self.base = parent
+            self.chain = [self]
+            for name in list(parent.pending_constants):
+                parent.resolve(name)
+            parent_constants = ChainMap(parent.constants)
+        self.values: Dict[str, Any] = {}
+        self.types: Dict[str, str] = {}
+        self.own_constants: Dict[str, Any] = {}
+        self.constants = parent_constants.new_child(self.own_constants)
+        self.declarations: Dict[str, Optional[Statement]] = {}
+        self.constant_declarations: Dict[str, Optional[Statement]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.views: Dict[str, Any] = {}
+        self.evaluator = _LayerEvaluator(self)
+
+        if isinstance(source, str):
+            for statement in self.read_statements(source):
+                self.declare(statement)
+        else:
+            for name, value in source.items():
+                self.assign(name, value)
+        for name in self.order():
+            self.recompute(name)
+
+    def read_statements(self, filename: str) -> List[Statement]:
+        """
+        Читает объявления файла слоя вместе с импортированными файлами.
+
+        Параметры:
+            filename (str): Имя файла.
+
+        Возврат:
+            List[Statement]: Объявления в порядке выполнения.
+
+        Исключения:
+            CircularImportError: Если импорт образует цикл.
+        """
+        statements: List[Statement] = []
+        seen: Set[str] = set()
+        stack: List[str] = []
+
+        def read(path: str) -> None:
+            key = os.path.abspath(path)
+            if key in stack:
+                raise CircularImportError(stack[stack.index(key):] + [key])
+            if key in seen:
+                return
+            seen.add(key)
+            stack.append(key)
+            for statement in self.evaluator.parse_source(path).statements:
+                if type(statement) is Import:
+                    read(self.evaluator.resolve_import(statement.module, path))
+                else:
+                    statements.append(statement)
+            stack.pop()
+
+        read(filename)
+        return statements
+
+    def declare(self, statement: Statement) -> None:
+        """
+        Добавляет объявление переменной или константы в слой.
+        """
+        name = statement.name
+        if type(statement) is Constant:
+            self.constant_declarations[name] = statement
+        else:
+            declared = self.declared_type(name)
+            if declared is not None and declared != statement.var_type:
+                raise TypeError(f"Переменная '{name}' уже определена с типом '{declared}'.")
+            self.declarations[name] = statement
+            self.types[name] = statement.var_type
+        for dependency in references(statement.value):
+            if dependency != name:
+                self.dependents.setdefault(dependency, set()).add(name)
+
+    def assign(self, name: str, value: Any) -> None:
+        """
+        Задает значение переменной или, если имя объявлено константой, константы.
+
+        Исключения:
+            TypeError: Если тип значения не соответствует объявленному.
+        """
+        statement = self.lookup_constant_declaration(name)
+        if statement is not _MISSING:
+            if isinstance(statement, Constant):
+                check_type(name, statement.var_type, value)
+            self.constant_declarations[name] = None
+            self.own_constants[name] = value
+            return
+        declared = self.declared_type(name)
+        if declared is not None:
+            check_type(name, declared, value)
+        self.declarations[name] = None
+        self.values[name] = value
+        self.types[name] = declared if declared is not None else value_type(value)
+
+    def declared_type(self, name: str) -> Optional[str]:
+        """
+        Возвращает тип переменной в нижних слоях или None, если ее там нет.
+        """
+        for layer in self.chain[1:]:
+            if name in layer.types:
+                return layer.types[name]
+        base = self.base
+        statement = base.declarations.get(name)
+        if statement is not None:
+            return statement.var_type
+        variable = base.data.get(name)
+        return variable.get_type() if variable is not None else None
+
+    def lookup_declaration(self, name: str) -> Any:
+        """
+        Возвращает действующее объявление переменной: ближайшее по цепочке слоев.
+        """
+        for layer in self.chain:
+            if name in layer.declarations:
+                return layer.declarations[name]
+        return self.base.declarations.get(name, _MISSING)
+
+    def lookup_constant_declaration(self, name: str) -> Any:
+        """
+        Возвращает действующее объявление константы: ближайшее по цепочке слоев.
+        """
+        for layer in self.chain:
+            if name in layer.constant_declarations:
+                return layer.constant_declarations[name]
+        if name in self.base.constant_declarations:
+            return self.base.constant_declarations[name]
+        return None if name in self.base.constants else _MISSING
+
+    def dependencies(self, name: str) -> Set[str]:
+        """
+        Возвращает имена, на которые ссылаются действующие объявления имени.
+        """
+        names: Set[str] = set()
+        for statement in (self.lookup_declaration(name), self.lookup_constant_declaration(name)):
+            if isinstance(statement, (Assignment, Constant)):
+                names.update(references(statement.value))
+        names.discard(name)
+        return names
+
+    def order(self) -> List[str]:
+        """
+        Возвращает имена, объявленные в слое или зависящие от них,
+        в порядке вычисления.
+
+        Исключения:
+            ValueError: Если зависимости образуют цикл.
+        """
+        graph = self.base.dependency_graph()
+        affected = set(self.declarations) | set(self.constant_declarations)
+        stack = list(affected)
+        while stack:
+            name = stack.pop()
+            candidates = set(graph.dependents.get(name, ()))
+            for layer in self.chain:
+                candidates.update(layer.dependents.get(name, ()))
+            for dependent in candidates:
+                # Ребро действует, только если ближайшее объявление по-прежнему ссылается на имя.
+                if dependent not in affected and name in self.dependencies(dependent):
+                    affected.add(dependent)
+                    stack.append(dependent)
+
+        local = DependencyGraph()
+        for name in affected:
+            local.set_dependencies(name, self.dependencies(name) & affected)
+        return local.order(affected)
+
+    def recompute(self, name: str) -> None:
+        """
+        Вычисляет значение имени в этом слое по его действующему объявлению.
+        """
+        evaluator = self.evaluator
+        statement = self.lookup_constant_declaration(name)
+        if isinstance(statement, Constant):
+            self.own_constants[name] = evaluator.evaluate(statement.value)
+            evaluator.forget_expressions()
+        statement = self.lookup_declaration(name)
+        if isinstance(statement, Assignment):
+            self.values[name] = evaluator.evaluate(statement.value)
+            self.types[name] = statement.var_type
+
+    def lookup(self, name: str) -> Any:
+        """
+        Возвращает значение переменной или константы с учетом слоев.
+
+        Параметры:
+            name (str): Имя.
+
+        Возврат:
+            Any: Значение или _MISSING, если имени нет.
+        """
+        for layer in self.chain:
+            if name in layer.values:
+                return layer.values[name]
+        base = self.base
+        if name in base.data or name in base.pending:
+            return base.get_var(name).value
+        return self.constants.get(name, _MISSING)
+
+    def overlay(self, source: Union[str, Mapping[str, Any]]) -> 'Layer':
+        """
+        Накладывает на этот слой новый слой.
+
+        Параметры:
+            source (Union[str, Mapping[str, Any]]): Файл FL или словарь значений.
+
+        Возврат:
+            Layer: Новый слой.
+        """
+        return Layer(self, source)
+
+    def get_type(self, name: str) -> str:
+        """
+        Возвращает тип переменной с учетом слоев.
+
+        Параметры:
+            name (str): Имя переменной.
+
+        Возврат:
+            str: Тип переменной.
+
+        Исключения:
+            KeyError: Если переменной нет.
+        """
+        for layer in self.chain:
+            if name in layer.types:
+                return layer.types[name]
+        if name not in self:
+            raise KeyError(name)
+        return self.base.get_var(name).get_type()
+
+    def view(self, name: str) -> Any:
+        """
+        Возвращает значение переменной этого слоя только для чтения.
+
+        Параметры:
+            name (str): Имя переменной из values.
+
+        Возврат:
+            Any: Значение или его представление только для чтения.
+        """
+        view = self.views.get(name, _MISSING)
+        if view is _MISSING:
+            view = self.views[name] = Variable(self.types[name], self.values[name]).get_view()
+        return view
+
+    def __getitem__(self, name: str) -> Any:
+        for layer in self.chain:
+            if name in layer.values:
+                return layer.view(name)
+        base = self.base
+        if name in base.data or name in base.pending:
+            return base.get_view(name)
+        raise KeyError(name)
+
+    def __contains__(self, name: object) -> bool:
+        base = self.base
+        return (name in base.data or name in base.pending
+                or any(name in layer.values for layer in self.chain))
+
+    def __iter__(self) -> Iterator[str]:
+        base = self.base
+        names = dict.fromkeys(base.data)
+        names.update(dict.fromkeys(base.pending))
+        for layer in reversed(self.chain):
+            names.update(dict.fromkeys(layer.values))
+        return iter(names)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"Layer(depth={len(self.chain)}, values={len(self.values)})"
+
+
+def check_type(name: str, declared: str, value: Any) -> None:
+    """
+    Проверяет, что значение из словаря подходит к объявленному типу;
+    целое число подходит и к типу float.
+
+    Параметры:
+        name (str): Имя переменной или константы.
+        declared (str): Объявленный тип.
+        value (Any): Значение.
+
+    Исключения:
+        TypeError: Если тип значения другой.
+    """
+    actual = value_type(value)
+    if actual != declared and not (declared == 'float' and actual == 'int'):
+        raise TypeError(f"Значение '{name}' имеет тип '{actual}', а объявлен тип '{declared}'.")
+
+
+def overlay(base: Union[Parser, Layer], source: Union[str, Mapping[str, Any]]) -> Layer:
+    """
+    Накладывает слой переопределений на разобранную конфигурацию.
+
+    Параметры:
+        base (Union[Parser, Layer]): Базовый парсер после parse_file или слой.
+        source (Union[str, Mapping[str, Any]]): Файл FL или словарь значений.
+
+    Возврат:
+        Layer: Новый слой.
+
+    Исключения:
+        TypeError: Если переменная переопределяется с другим типом
+            или значение словаря не соответствует объявленному типу.
+        ValueError: Если объявление имеет неправильный формат, ссылка
+            не определена или зависимости образуют цикл.
+    """
+    return Layer(base, source)
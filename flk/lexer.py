@@ -0,0 +1,223 @@
+import re
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, TypeVar
+
+# Виды токенов.
+IMPORT = 'IMPORT'
+CONST = 'CONST'
+ASSIGN = 'ASSIGN'
+
+_STATEMENT = re.compile(r'(const )?(\w+)\((\w+)\) = ')
+# Однострочное объявление без скобок, комментария и пробелов вокруг значения:
+# такие строки, которых в файлах большинство, разбираются одним сопоставлением.
+_SIMPLE = re.compile(r'(const )?(\w+)\((\w+)\) = ([^\s{}/][^{}/]*)\Z')
+# Закрывающие скобки коллекций, внутри которых допустимы фигурные скобки.
+_CLOSING = {'{': '}', '[': ']', '(': ')'}
+
+T = TypeVar('T')
+
+
+class LexerError(ValueError):
+    """
+    Ошибка формата объявления, обнаруженная лексером.
+
+    Атрибуты:
+        line (int): Номер строки, на которой начинается объявление.
+        end_line (int): Номер последней строки объявления; разбор
+            можно продолжить со следующей строки.
+    """
+    def __init__(self, message: str, line: int, end_line: int):
+        self.line = line
+        self.end_line = end_line
+        super().__init__(message)
+
+    def __reduce__(self):
+        return type(self), (self.args[0], self.line, self.end_line)
+
+
+class Token(NamedTuple):
+    """
+    Токен файла FL - одно объявление или директива импорта.
+
+    Атрибуты:
+        kind (str): Вид токена (IMPORT, CONST или ASSIGN).
+        name (Optional[str]): Имя переменной или константы.
+        var_type (Optional[str]): Объявленный тип.
+        value (str): Текст значения или путь импортируемого модуля.
+        line (int): Номер строки, на которой начинается объявление.
+        start (int): Смещение начала объявления в символах текста файла.
+        end (int): Смещение конца значения объявления в символах
+            (без комментария в конце строки и перевода строки).
+            В байты смещения переводятся только при построении
+            индекса диапазонов (см. SpanIndex).
+    """
+    kind: str
+    name: Optional[str]
+    var_type: Optional[str]
+    value: str
+    line: int
+    start: int
+    end: int
+
+
+def tokenize(text: str, make: Callable[..., T] = Token) -> List[T]:
+    """
+    Разбивает весь текст файла FL на токены за один проход.
+
+    Параметры:
+        text (str): Содержимое файла.
+        make (Callable[..., T]): Функция, получающая поля токена (как Token)
+            и возвращающая его представление. Синтаксический разбор передает
+            сюда построение узла объявления, чтобы не создавать промежуточных токенов.
+
+    Возврат:
+        List[T]: Список токенов.
+    """
+    return list(_scan(text.split('\n'), 1, make))
+
+
+def tokenize_lines(lines: Iterable[str], make: Callable[..., T] = Token, first_line: int = 1) -> Iterator[T]:
+    """
+    Разбивает последовательность строк файла FL на токены по мере чтения.
+
+    Параметры:
+        lines (Iterable[str]): Строки файла вместе с символами перевода строки.
+        make (Callable[..., T]): Функция, создающая токен из его полей (см. tokenize).
+        first_line (int): Номер первой строки в файле - при продолжении
+            разбора с середины файла номера строк в токенах и ошибках
+            остаются номерами строк файла. Смещения считаются от первой строки.
+
+    Возврат:
+        Iterator[T]: Токены в порядке следования в файле.
+    """
+    return _scan(lines, 0, make, first_line - 1)
+
+
+def _scan(lines: Iterable[str], separator: int, make: Callable[..., T], line_no: int = 0) -> Iterator[T]:
+    """
+    Разбивает строки на токены.
+
+    Комментарии пропускаются, многострочные значения в фигурных скобках
+    собираются в один токен. Однострочные объявления без скобок
+    и комментариев разбираются одним регулярным выражением.
+
+    Параметры:
+        lines (Iterable[str]): Строки файла.
+        separator (int): Длина разделителя строк, не входящего в сами строки.
+        make (Callable[..., T]): Функция, создающая токен из его полей.
+        line_no (int): Число строк файла перед первой из lines.
+
+    Возврат:
+        Iterator[T]: Токены в порядке следования в файле.
+
+    Исключения:
+        LexerError: Если объявление имеет неправильный формат
+            или фигурные скобки не сбалансированы.
+    """
+    offset = 0
+    in_multiline_comment = False
+    open_braces = 0
+    parts: List[str] = []
+    start = start_line = 0
+    simple = _SIMPLE.match
+
+    for raw in lines:
+        line_no += 1
+        line_start = offset
+        offset += len(raw) + separator
+        line = raw.strip()
+
+        if in_multiline_comment:
+            if '*/' in line:
+                in_multiline_comment = False
+            continue
+        if not parts:
+            match = simple(line)
+            if match is not None:
+                if raw[0] != line[0]:
+                    line_start += raw.index(line[0])
+                const, name, var_type, value = match.groups()
+                yield make(ASSIGN if const is None else CONST, name, var_type, value, line_no,
+                           line_start, line_start + len(line))
+                continue
+        if not line:
+            continue
+        first = line[0]
+        if first == '#':
+            continue
+        if first == '/' and line.startswith('/*'):
+            in_multiline_comment = '*/' not in line
+            continue
+        if first == '(' and line.startswith('(import)'):
+            module = line.split(' ')
+            if len(module) < 2:
+                raise LexerError("Неправильный формат директивы импорта: " + line, line_no, line_no)
+            yield make(IMPORT, None, None, module[1].strip('()'), line_no, line_start,
+                       line_start + len(raw.rstrip()))
+            continue
+
+        if not parts:
+            if raw[0] != first:
+                line_start += raw.index(first)
+            if '{' not in line and '}' not in line:
+                try:
+                    token = _statement(line, line_no, line_start, line_start + len(line), make)
+                except ValueError as error:
+                    raise LexerError(str(error), line_no, line_no) from None
+                yield token
+                continue
+            start = line_start
+            start_line = line_no
+        open_braces += line.count('{') - line.count('}')
+        parts.append(line)
+        if open_braces == 0:
+            try:
+                token = _statement(' '.join(parts), start_line, start, line_start + len(raw.rstrip()), make)
+            except ValueError as error:
+                raise LexerError(str(error), start_line, line_no) from None
+            yield token
+            parts = []
+
+    if parts:
+        raise LexerError(f"Незакрытая фигурная скобка в объявлении на строке {start_line}: {parts[0]}",
+                         start_line, line_no)
+
+
+def _statement(text: str, line: int, start: int, end: int, make: Callable[..., T]) -> T:
+    """
+    Превращает собранное объявление в токен.
+
+    Параметры:
+        text (str): Текст объявления.
+        line (int): Номер строки начала объявления.
+        start (int): Смещение начала объявления.
+        end (int): Смещение конца объявления.
+        make (Callable[..., T]): Функция, создающая токен из его полей.
+
+    Возврат:
+        T: Токен объявления.
+
+    Исключения:
+        ValueError: Если объявление имеет неправильный формат.
+    """
+    match = _STATEMENT.match(text)
+    if match is None:
+        raise ValueError(f"Неправильный формат строки: {text}")
+
+    const, name, var_type = match.groups()
+    value = text[match.end():]
+    if const is None and '//' in value:
+        value = value.split('//', 1)[0]
+    value_start = match.end() + len(value) - len(value.lstrip())
+    value = value.strip()
+    if '{' in value:
+        # Словарь или множество может стоять внутри списка или кортежа.
+        last = value.rfind(_CLOSING.get(value[0], '}'))
+        if last == -1 or (const is None and value[0] not in _CLOSING):
+            raise ValueError(f"Неправильный формат строки: {text}")
+        value = value[:last + 1]
+    if not value:
+        raise ValueError(f"Неправильный формат строки: {text}")
+
+    # Диапазон объявления заканчивается на значении: комментарий после него не входит.
+    end -= len(text) - value_start - len(value)
+    return make(ASSIGN if const is None else CONST, name, var_type, value, line, start, end)
@@ -0,0 +1,483 @@
+import re
+from array import array
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from flk.parser import Parser
+
+# Строки в кавычках, скобки и запятые: остальные символы при разборе пропускаются.
+_SPECIAL = re.compile(r'"[^"]*"|\'[^\']*\'|[\[\](){},]')
+# То же без запятых: для проверки скобок запятые не нужны.
+_NESTING = re.compile(r'"[^"]*"|\'[^\']*\'|[\[\](){}]')
+# Числа в той же записи, что понимает Parser.parse_item: -12, 3.5
+# (без 1_000, +1, 1e3, .5 и 1.).
+_NUMBERS = re.compile(r'[0-9 \t\r\n,.-]*\Z')
+_LOOSE_DOTS = tuple(pair for char in ' \t\r\n,.-' for pair in ('.' + char, char + '.'))
+_PAIRS = {'[': ']', '(': ')', '{': '}'}
+_OPENING = frozenset('[({')
+_CLOSING = frozenset('])}')
+_ENTRY = re.compile(r'\s*(\w+)\((\w+)\)\s*:\s*(\w+)\((\w+)\)\s*=\s*(.+?)\s*\Z', re.S)
+_DICT_ENTRY = re.compile(r'\{\s*\w+\(\w+\)\s*:')
+# Список из одних чисел, каждое из которых Parser.parse_item разобрал бы как число.
+_NUMBER_ITEMS = re.compile(r'\s*-?\d+(?:\.\d+)?\s*(?:,\s*-?\d+(?:\.\d+)?\s*)*\Z')
+
+NUMERIC_ARRAYS = (None, 'array', 'numpy')
+
+
+def _plain(text: str) -> bool:
+    """
+    Проверяет, что в тексте нет скобок и кавычек, то есть запятые в нем
+    можно искать обычным split.
+    """
+    return not any(char in text for char in '[](){}"\'')
+
+
+def split_items(text: str) -> List[str]:
+    """
+    Разбивает содержимое коллекции по запятым верхнего уровня.
+
+    Запятые внутри вложенных скобок и строк в кавычках не разделяют элементы.
+
+    Параметры:
+        text (str): Содержимое коллекции без внешних скобок.
+
+    Возврат:
+        List[str]: Тексты элементов.
+
+    Исключения:
+        ValueError: Если скобки не сбалансированы.
+    """
+    if _plain(text):
+        return text.split(',')
+    items = []
+    depth = 0
+    start = 0
+    for match in _SPECIAL.finditer(text):
+        token = match.group()
+        if token == ',':
+            if depth == 0:
+                items.append(text[start:match.start()])
+                start = match.end()
+        elif token in _OPENING:
+            depth += 1
+        elif token in _CLOSING:
+            depth -= 1
+            if depth < 0:
+                raise ValueError(f"Лишняя закрывающая скобка: {text}")
+    if depth:
+        raise ValueError(f"Незакрытая скобка: {text}")
+    items.append(text[start:])
+    return items
+
+
+def enclosed(text: str) -> bool:
+    """
+    Проверяет, что текст целиком заключен в одну пару скобок: [1, 2] -
+    да, [1] + [2] - нет.
+
+    Параметры:
+        text (str): Текст, начинающийся с открывающей скобки.
+
+    Возврат:
+        bool: True, если скобка, закрывающая первую, стоит в конце текста.
+    """
+    if _plain(text[1:-1]):
+        return text[-1:] == _PAIRS.get(text[:1])
+    depth = 0
+    for match in _NESTING.finditer(text):
+        token = match.group()
+        if token in _OPENING:
+            depth += 1
+        elif token in _CLOSING:
+            depth -= 1
+            if depth == 0:
+                return match.end() == len(text)
+    return False
+
+
+def _balance(text: str) -> None:
+    """
+    Проверяет скобки содержимого коллекции так же, как split_items, не разбивая его.
+
+    Исключения:
+        ValueError: Если скобки не сбалансированы.
+    """
+    depth = 0
+    for match in _NESTING.finditer(text):
+        token = match.group()
+        if token in _OPENING:
+            depth += 1
+        elif token in _CLOSING:
+            depth -= 1
+            if depth < 0:
+                raise ValueError(f"Лишняя закрывающая скобка: {text}")
+    if depth:
+        raise ValueError(f"Незакрытая скобка: {text}")
+
+
+def recognize_value(var_type: str, text: str, references: List[str]) -> None:
+    """
+    Проверяет литерал по объявленному типу, не строя значения.
+
+    Принимает и отвергает те же литералы, что и Parser.parse_value
+    с LiteralParser, и с теми же сообщениями, но элементы коллекций
+    проверяются по месту в тексте: списки, словари и множества не создаются.
+    Ссылки не подставляются, а только добавляются в references.
+
+    Параметры:
+        var_type (str): Объявленный тип.
+        text (str): Текст литерала.
+        references (List[str]): Сюда добавляются ссылки без символа '$'.
+
+    Исключения:
+        ValueError: Если литерал не разбирается по объявленному типу.
+    """
+    if text.startswith('$'):
+        references.append(text[1:])
+    elif var_type == 'str':
+        stripped = text.strip()
+        if not (stripped.startswith('"') and stripped.endswith('"')
+                or stripped.startswith("'") and stripped.endswith("'")):
+            raise ValueError(f"Строковая переменная должна быть обрамлена кавычками: {stripped}")
+    elif var_type == 'int':
+        int(text)
+    elif var_type == 'float':
+        float(text)
+    elif var_type == 'bool':
+        pass
+    elif var_type == 'list':
+        _recognize_items(_inner(text, '[', ']'), references, False)
+    elif var_type == 'dict':
+        _recognize_dict(text, references)
+    elif var_type == 'set':
+        _recognize_items(_inner(text, '{', '}'), references, True)
+    elif var_type == 'tuple':
+        _recognize_items(_inner(text, '(', ')'), references, False)
+    else:
+        raise ValueError(f"Неизвестный тип данных: {var_type}")
+
+
+def _recognize_items(inner: str, references: List[str], hashable: bool) -> None:
+    """
+    Проверяет элементы коллекции (см. LiteralParser.items).
+
+    Параметры:
+        inner (str): Содержимое коллекции без внешних скобок.
+        references (List[str]): Сюда добавляются ссылки.
+        hashable (bool): Элементы должны быть неизменяемыми (элементы множества
+            и кортежей внутри него).
+
+    Исключения:
+        ValueError: Если элемент не разбирается или скобки не сбалансированы.
+    """
+    if not inner.strip() or _NUMBER_ITEMS.match(inner):
+        return
+    for item in _top_level(inner):
+        _recognize_item(item, references, hashable)
+
+
+def _recognize_item(text: str, references: List[str], hashable: bool) -> None:
+    """
+    Проверяет один элемент коллекции (см. LiteralParser.item и Parser.parse_item).
+
+    Исключения:
+        ValueError: Если элемент не разбирается или изменяемый элемент
+            стоит там, где требуется неизменяемый.
+    """
+    text = text.strip()
+    first = text[:1]
+    if first == '(':
+        _recognize_items(_inner(text, '(', ')'), references, hashable)
+    elif first == '[' or first == '{':
+        if hashable:
+            raise ValueError(f"Элемент множества должен быть неизменяемым: {text}")
+        if first == '[':
+            _recognize_items(_inner(text, '[', ']'), references, False)
+        elif _DICT_ENTRY.match(text):
+            _recognize_dict(text, references)
+        else:
+            _recognize_items(_inner(text, '{', '}'), references, True)
+    elif first == '$':
+        references.append(text[1:])
+    else:
+        digits = text[1:] if first == '-' else text
+        if digits.isdecimal():
+            return
+        whole, dot, fraction = digits.partition('.')
+        if dot and whole.isdecimal() and fraction.isdecimal():
+            return
+        lowered = text.lower()
+        if lowered != 'true' and lowered != 'false':
+            recognize_value('str', text, references)
+
+
+def _recognize_dict(text: str, references: List[str]) -> None:
+    """
+    Проверяет словарь из элементов 'ключ(key): имя(тип) = значение'
+    (см. LiteralParser.parse_dict).
+
+    Исключения:
+        ValueError: Если элемент словаря имеет неправильный формат.
+    """
+    for entry in _top_level(_inner(text, '{', '}')):
+        if not entry.strip():
+            continue
+        match = _ENTRY.match(entry)
+        if match is None:
+            raise ValueError(f"Неправильный формат элемента словаря: {entry.strip()}")
+        recognize_value(match.group(4), match.group(5), references)
+
+
+def _top_level(inner: str) -> Iterator[str]:
+    """
+    Выдает элементы содержимого коллекции по одному - те же, что возвращает split_items.
+
+    Исключения:
+        ValueError: Если скобки не сбалансированы (до выдачи первого элемента).
+    """
+    start = 0
+    if _plain(inner):
+        comma = inner.find(',')
+        while comma >= 0:
+            yield inner[start:comma]
+            start = comma + 1
+            comma = inner.find(',', start)
+    else:
+        _balance(inner)
+        depth = 0
+        for match in _SPECIAL.finditer(inner):
+            token = match.group()
+            if token == ',':
+                if depth == 0:
+                    yield inner[start:match.start()]
+                    start = match.end()
+            elif token in _OPENING:
+                depth += 1
+            elif token in _CLOSING:
+                depth -= 1
+    yield inner[start:]
+
+
+def _inner(text: str, opening: str, closing: str) -> str:
+    """
+    Возвращает содержимое коллекции без одной пары внешних скобок.
+    """
+    text = text.strip()
+    if text[:1] == opening and text[-1:] == closing:
+        return text[1:-1]
+    return text
+
+
+class LiteralParser:
+    """
+    Разбор литералов коллекций рекурсивным спуском.
+
+    Элементы разделяются за один проход с учетом вложенных скобок и строк
+    в кавычках; вложенные списки, кортежи, множества и словари разбираются
+    рекурсивно. Списки, состоящие только из чисел, преобразуются целиком,
+    без разбора каждого элемента по отдельности, и по желанию сохраняются
+    в array.array или массив NumPy.
+
+    Атрибуты:
+        parser (Parser): Парсер, разбирающий скалярные элементы и ссылки.
+        numeric_arrays (Optional[str]): None, 'array' или 'numpy' - во что
+            превращать однородные числовые списки.
+    """
+    def __init__(self, parser: 'Parser', numeric_arrays: Optional[str] = None):
+        """
+        Инициализация разборщика.
+
+        Параметры:
+            parser (Parser): Парсер, разбирающий скалярные элементы и ссылки.
+            numeric_arrays (Optional[str]): None - обычные списки, 'array' -
+                array.array ('q' для целых, 'd' для дробных), 'numpy' - numpy.ndarray.
+
+        Исключения:
+            ValueError: Если значение numeric_arrays неизвестно или NumPy не установлен.
+        """
+        if numeric_arrays not in NUMERIC_ARRAYS:
+            raise ValueError(f"Неизвестный вид числовых массивов: {numeric_arrays}")
+        self.parser = parser
+        self.numeric_arrays = numeric_arrays
+        self.numpy = None
+        if numeric_arrays == 'numpy':
+            try:
+                import numpy
+            except ImportError:
+                raise ValueError("Для numeric_arrays='numpy' требуется пакет numpy") from None
+            self.numpy = numpy
+
+    def numbers(self, inner: str) -> Optional[List[Any]]:
+        """
+        Преобразует содержимое коллекции из одних чисел целиком.
+
+        Параметры:
+            inner (str): Содержимое коллекции без внешних скобок.
+
+        Возврат:
+            Optional[List[Any]]: Числа или None, если содержимое не является
+                списком чисел (тогда элементы разбираются по одному).
+        """
+        if not _NUMBERS.match(inner):
+            return None
+        if '.' in inner:
+            stripped = inner.strip()
+            if stripped[0] == '.' or stripped[-1] == '.' or any(pair in inner for pair in _LOOSE_DOTS):
+                return None
+        parts = inner.split(',')
+        try:
+            dots = inner.count('.')
+            if dots == len(parts):
+                return list(map(float, parts))
+            if dots:
+                return [float(part) if '.' in part else int(part) for part in parts]
+            return list(map(int, parts))
+        except ValueError:
+            return None
+
+    def items(self, inner: str) -> List[Any]:
+        """
+        Разбирает элементы коллекции.
+
+        Параметры:
+            inner (str): Содержимое коллекции без внешних скобок.
+
+        Возврат:
+            List[Any]: Значения элементов.
+        """
+        if not inner.strip():
+            return []
+        values = self.numbers(inner)
+        if values is not None:
+            return values
+        return self.elements(inner)
+
+    def elements(self, inner: str) -> List[Any]:
+        """
+        Разбирает элементы коллекции по одному.
+
+        Параметры:
+            inner (str): Непустое содержимое коллекции без внешних скобок.
+
+        Возврат:
+            List[Any]: Значения элементов.
+        """
+        item = self.item
+        return [item(text) for text in split_items(inner)]
+
+    def item(self, text: str) -> Any:
+        """
+        Разбирает один элемент коллекции; вложенные коллекции разбираются рекурсивно.
+
+        Элемент в фигурных скобках считается словарем, если начинается
+        с объявления ключа 'имя(тип):' (как элемент словаря верхнего уровня),
+        иначе множеством.
+
+        Параметры:
+            text (str): Текст элемента.
+
+        Возврат:
+            Any: Значение элемента.
+        """
+        text = text.strip()
+        first = text[:1]
+        if first == '[':
+            return self.parse_list(text)
+        if first == '(':
+            return self.parse_tuple(text)
+        if first == '{':
+            return self.parse_dict(text) if _DICT_ENTRY.match(text) else self.parse_set(text)
+        return self.parser.parse_item(text)
+
+    def parse_list(self, text: str) -> Any:
+        """
+        Разбирает список.
+
+        Параметры:
+            text (str): Текст списка.
+
+        Возврат:
+            Any: Список; однородный числовой список - массив, если включен numeric_arrays.
+        """
+        inner = _inner(text, '[', ']')
+        if self.numeric_arrays is None:
+            return self.items(inner)
+        if not inner.strip():
+            return []
+        values = self.numbers(inner)
+        if values is None:
+            return self.elements(inner)
+        # Каждое дробное число содержит ровно одну точку.
+        dots = inner.count('.')
+        if dots and dots != len(values):
+            return values
+        return self.to_array(values, dots > 0)
+
+    def to_array(self, values: List[Any], floats: bool) -> Any:
+        """
+        Превращает однородный числовой список в массив.
+
+        Параметры:
+            values (List[Any]): Числа одного вида.
+            floats (bool): True, если все числа дробные.
+
+        Возврат:
+            Any: Массив или исходный список, если целые числа не помещаются в 64 бита.
+        """
+        try:
+            if self.numpy is not None:
+                return self.numpy.array(values, dtype=self.numpy.float64 if floats else self.numpy.int64)
+            return array('d' if floats else 'q', values)
+        except OverflowError:
+            return values
+
+    def parse_tuple(self, text: str) -> tuple:
+        """
+        Разбирает кортеж.
+
+        Параметры:
+            text (str): Текст кортежа.
+
+        Возврат:
+            tuple: Кортеж значений.
+        """
+        return tuple(self.items(_inner(text, '(', ')')))
+
+    def parse_set(self, text: str) -> set:
+        """
+        Разбирает множество.
+
+        Параметры:
+            text (str): Текст множества.
+
+        Возврат:
+            set: Множество значений.
+        """
+        return set(self.items(_inner(text, '{', '}')))
+
+    def parse_dict(self, text: str) -> dict:
+        """
+        Разбирает словарь из элементов вида 'ключ(key): имя(тип) = значение'.
+
+        Значения разбираются по объявленному типу и могут быть вложенными коллекциями.
+
+        Параметры:
+            text (str): Текст словаря.
+
+        Возврат:
+            dict: Словарь значений.
+
+        Исключения:
+            ValueError: Если элемент словаря имеет неправильный формат.
+        """
+        result = {}
+        parse_value = self.parser.parse_value
+        for entry in split_items(_inner(text, '{', '}')):
+            if not entry.strip():
+                continue
+            match = _ENTRY.match(entry)
+            if match is None:
+                raise ValueError(f"Неправильный формат элемента словаря: {entry.strip()}")
+            key, _, _, val_type, val = match.groups()
+            result[key] = parse_value(val_type, val)
+        return result
@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Union
+
+from flk.parser import DataType, Parser
+
+CONFLICT_RULES = ('last', 'first', 'error')
+
+
+def _parse_one(path: str, cache: bool) -> Dict[str, DataType]:
+    """
+    Разбирает один файл в отдельном парсере; выполняется в рабочем процессе.
+
+    Параметры:
+        path (str): Путь к файлу.
+        cache (bool): Использовать кэш разобранных файлов.
+
+    Возврат:
+        Dict[str, DataType]: Значения переменных файла.
+    """
+    return Parser(cache=cache).parse_file(path)
+
+
+def parse_many(paths: Iterable[str], workers: Optional[int] = None, merge: bool = False,
+               conflicts: str = 'last', threads: bool = False,
+               cache: bool = False) -> Union[Dict[str, Dict[str, DataType]], Dict[str, DataType]]:
+    """
+    Разбирает независимые файлы FL параллельно.
+
+    Каждый файл (вместе со своими импортами) разбирается отдельным парсером
+    в пуле процессов, поэтому время загрузки набора файлов определяется
+    числом ядер, а не числом файлов. Результат не зависит от порядка
+    завершения задач: файлы обрабатываются в порядке paths.
+
+    Параметры:
+        paths (Iterable[str]): Пути к файлам.
+        workers (Optional[int]): Число рабочих процессов или потоков;
+            по умолчанию - число ядер. При workers=1 файлы разбираются
+            в текущем процессе.
+        merge (bool): Вернуть одно общее пространство имен вместо словаря по файлам.
+        conflicts (str): Правило для имени, объявленного в нескольких файлах
+            при merge=True: 'last' - берется значение из файла, идущего позже
+            в paths; 'first' - из файла, идущего раньше; 'error' - ValueError.
+        threads (bool): Использовать пул потоков вместо пула процессов
+            (имеет смысл, если время уходит на чтение файлов, а не на разбор).
+        cache (bool): Использовать кэш разобранных файлов.
+
+    Возврат:
+        Union[Dict[str, Dict[str, DataType]], Dict[str, DataType]]: Значения
+            переменных по путям файлов или, при merge=True, общее пространство имен.
+
+    Исключения:
+        ValueError: Если правило conflicts неизвестно, если при conflicts='error'
+            имя объявлено в нескольких файлах или если файл не удалось разобрать.
+    """
+    if conflicts not in CONFLICT_RULES:
+        raise ValueError(f"Неизвестное правило конфликтов: {conflicts}")
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths) or 1)
+
+    if workers == 1:
+        results = [_parse_one(path, cache) for path in paths]
+    else:
+        pool: Executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=workers)
+        with pool:
+            # Крупные порции уменьшают число обращений к пулу для множества мелких файлов.
+            chunksize = max(1, len(paths) // (workers * 4))
+            results = list(pool.map(_parse_one, paths, [cache] * len(paths), chunksize=chunksize))
+
+    if not merge:
+        return dict(zip(paths, results))
+
+    merged: Dict[str, DataType] = {}
+    sources: Dict[str, str] = {}
+    for path, data in zip(paths, results):
+        for name, value in data.items():
+            if name in merged:
+                if conflicts == 'first':
+                    continue
+                if conflicts == 'error':
+                    raise ValueError(f"Переменная {name} объявлена в файлах {sources[name]} и {path}")
+            merged[name] = value
+            sources[name] = path
+    return merged
@@ -1,10 +1,94 @@
+import io
 import os
-import re
-from typing import Any, Dict, Union, Tuple
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from copy import copy
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union, Tuple
 from flk.variable import Variable
+from flk.cache import FileCache, SourceInfo, source_info
+from flk.transaction import Transaction
+from flk.graph import DependencyGraph
+from flk.watcher import Watcher
+from flk.expression import CompiledExpression, Template
+from flk.spans import SpanIndex
+from flk.literal import LiteralParser
+from flk.serializer import dump, format_value
+from flk.snapshot import Snapshot, freeze
+from flk.shared import publish_shared
+from flk.query import QueryIndex, split_path, step
+from flk.journal import EditJournal
+from flk.profiler import Profiler
+from flk.syntax import (
+    Module, Import, Constant, Assignment, ValueNode,
+    Literal, RawString, Expression, LogicalExpression, Reference,
+    LOGICAL_EXPRESSION, parse_lines, parse_module, references, value_node,
+)
 
 DataType = Union[str, int, float, bool, list, dict, Tuple]
 
+_MISSING = object()
+
+# Атрибуты парсера, которые меняет перезагрузка и восстанавливает неудачная перезагрузка.
+_RELOAD_STATE = ('data', 'constants', 'modules', 'file_states', 'root_files', 'sources',
+                 'declarations', 'constant_declarations', 'pending', 'pending_constants', 'owners', 'spans')
+
+
+def _same_value(first: Any, second: Any) -> bool:
+    """
+    Сравнивает значения с учетом типа; числовые массивы сравниваются поэлементно.
+    """
+    if type(first) is not type(second):
+        return False
+    if hasattr(first, 'tolist'):
+        return first.tolist() == second.tolist()
+    return first == second
+
+
+class CircularImportError(ValueError):
+    """
+    Исключение, возникающее при циклическом импорте файлов.
+
+    Атрибуты:
+        cycle (List[str]): Пути файлов, образующих цикл; первый и последний совпадают.
+    """
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__("Циклический импорт: " + " -> ".join(cycle))
+
+    def __reduce__(self):
+        # Исключение передается из рабочих процессов parse_many.
+        return type(self), (self.cycle,)
+
+
+class LazyValues(Mapping):
+    """
+    Словарь значений переменных, вычисляемых при первом обращении.
+
+    Возвращается методом Parser.parse_file в ленивом режиме.
+    """
+    def __init__(self, parser: 'Parser'):
+        """
+        Инициализация словаря.
+
+        Параметры:
+            parser (Parser): Парсер в ленивом режиме.
+        """
+        self.parser = parser
+
+    def __getitem__(self, name: str) -> DataType:
+        if name not in self.parser.data and name not in self.parser.pending:
+            raise KeyError(name)
+        return self.parser.get_var(name).value
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self.parser.data)
+        yield from [name for name in self.parser.pending if name not in self.parser.data]
+
+    def __len__(self) -> int:
+        return len(self.parser.data.keys() | self.parser.pending.keys())
+
+
 class Parser:
     """
     Класс для парсинга и обработки данных из файла.
@@ -12,13 +96,206 @@ class Parser:
     Атрибуты:
         data (Dict[str, Variable]): Словарь для хранения переменных.
         constants (Dict[str, Any]): Словарь для хранения констант.
+        cache (Optional[FileCache]): Кэш разобранных файлов на диске.
+        modules (Dict[str, Module]): Разобранные файлы по абсолютному пути.
+        lazy (bool): Ленивый режим, в котором значения вычисляются при первом обращении.
+        pending (Dict[str, Assignment]): Еще не вычисленные объявления переменных.
+        pending_constants (Dict[str, Constant]): Еще не вычисленные объявления констант.
+        active_transaction (Optional[Transaction]): Текущая транзакция изменений файлов.
+        transaction_lock (threading.RLock): Блокировка, которую транзакция держит до своего
+            завершения; под ней же выполняется фоновая перезагрузка.
+        declarations (Dict[str, Assignment]): Действующие объявления переменных.
+        constant_declarations (Dict[str, Constant]): Действующие объявления констант.
+        file_states (Dict[str, Tuple[int, int]]): Время изменения и размер прочитанных файлов.
+        root_files (List[str]): Файлы, переданные в parse_file.
+        owners (Dict[str, Optional[str]]): Абсолютный путь файла с действующим
+            объявлением каждой переменной.
+        spans (Dict[str, SpanIndex]): Диапазоны байт объявлений переменных
+            по файлам; строятся при первом изменении файла.
+        in_place_edits (bool): Записывать изменения прямо в файл, а не через временный файл.
+        journal (Optional[EditJournal]): Журналы изменений, если они включены.
+        expressions (Dict[str, CompiledExpression]): Скомпилированные выражения по тексту.
+        expression_templates (Dict[str, Template]): Шаблоны выражений с подставленными
+            значениями констант, общие для выражений, различающихся только ссылками.
+        literals (LiteralParser): Разбор литералов коллекций.
+        published (Optional[Snapshot]): Последний опубликованный снимок, если снимки включены.
+        publish_held (int): Пока больше нуля, снимки не публикуются.
+        key_index (Optional[QueryIndex]): Индекс имен переменных и ключей вложенных
+            словарей; строится при первом запросе (см. find).
+        shared_path (Optional[str]): Файл, в который публикуются значения для других
+            процессов (см. share).
+        profiler (Optional[Profiler]): Счетчики и таймеры этапов, если профилирование включено.
     """
-    def __init__(self):
+    def __init__(self, cache: Union[bool, FileCache] = False, lazy: bool = False,
+                 in_place_edits: bool = False, profile: bool = False,
+                 numeric_arrays: Optional[str] = None, snapshots: bool = False,
+                 journal: Union[bool, EditJournal] = False):
         """
         Инициализация парсера.
+
+        Параметры:
+            cache (Union[bool, FileCache]): Включает кэш разобранных файлов в каталогах
+                __flcache__; можно передать собственный экземпляр FileCache.
+            lazy (bool): Включает ленивый режим: parse_file только индексирует объявления,
+                а значение переменной и всего, на что она ссылается, вычисляется
+                при первом обращении через get_var или parse_reference.
+            in_place_edits (bool): Записывать изменения переменных прямо в файл:
+                перезаписывается только часть файла начиная с измененного объявления.
+                По умолчанию файл целиком заменяется атомарно через временный файл.
+            profile (bool): Включает счетчики и таймеры этапов (см. stats).
+                Без профилирования парсер не выполняет дополнительного кода.
+            numeric_arrays (Optional[str]): Во что превращать однородные числовые
+                списки: None - обычные списки, 'array' - array.array, 'numpy' - numpy.ndarray.
+            snapshots (bool): Публиковать неизменяемые снимки значений после
+                parse_file, reload и каждой зафиксированной транзакции (см. snapshot).
+            journal (Union[bool, EditJournal]): Включает журналы изменений: изменения
+                не перезаписывают файлы, а дописываются под блокировкой в журнал рядом
+                с файлом (example.fl-journal), который применяется при чтении файла
+                и переносится в файл, когда становится больше EditJournal.limit.
+                Несколько процессов могут менять одни файлы, не теряя изменений
+                друг друга; можно передать собственный экземпляр EditJournal.
+
+        Исключения:
+            ValueError: Если значение numeric_arrays неизвестно или NumPy не установлен.
         """
         self.data: Dict[str, Variable] = {}
         self.constants: Dict[str, Any] = {}
+        self.cache: Optional[FileCache] = FileCache() if cache is True else (cache or None)
+        self.sources: Optional[List[SourceInfo]] = None
+        self.modules: Dict[str, Module] = {}
+        self.import_stack: List[str] = []
+        self.lazy = lazy
+        self.pending: Dict[str, Assignment] = {}
+        self.pending_constants: Dict[str, Constant] = {}
+        self.resolving: List[str] = []
+        self.active_transaction: Optional[Transaction] = None
+        self.transaction_lock = threading.RLock()
+        self.declarations: Dict[str, Assignment] = {}
+        self.constant_declarations: Dict[str, Constant] = {}
+        self.file_states: Dict[str, Tuple[int, int]] = {}
+        self.root_files: List[str] = []
+        self.graph: Optional[DependencyGraph] = None
+        self.key_index: Optional[QueryIndex] = None
+        self.owners: Dict[str, Optional[str]] = {}
+        self.spans: Dict[str, SpanIndex] = {}
+        self.in_place_edits = in_place_edits
+        self.journal: Optional[EditJournal] = EditJournal() if journal is True else (journal or None)
+        self.expressions: Dict[str, CompiledExpression] = {}
+        self.expression_templates: Dict[str, Template] = {}
+        self.literals = LiteralParser(self, numeric_arrays)
+        self.published: Optional[Snapshot] = Snapshot(0, {}, {}) if snapshots else None
+        self.publish_held = 0
+        self.shared_path: Optional[str] = None
+        self.profiler: Optional[Profiler] = None
+        if profile:
+            self.profiler = Profiler()
+            self.profiler.attach(self)
+
+    def stats(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Возвращает статистику профилирования.
+
+        Параметры:
+            top (Optional[int]): Сколько самых медленных файлов, импортов
+                и переменных включить; по умолчанию все.
+
+        Возврат:
+            Dict[str, Any]: Время и число вызовов по этапам, счетчики, время
+                по файлам, импортам и переменным (см. Profiler.stats).
+
+        Исключения:
+            ValueError: Если парсер создан без profile=True.
+        """
+        if self.profiler is None:
+            raise ValueError("Профилирование не включено: создайте парсер с profile=True")
+        return self.profiler.stats(top)
+
+    def snapshot(self) -> Snapshot:
+        """
+        Возвращает последний опубликованный снимок значений.
+
+        Снимок не меняется: после parse_file, reload и каждой зафиксированной
+        транзакции (edit_var_value, create_var, remove_var, save) публикуется
+        новый, в котором заново построены только изменившиеся значения.
+        Получение снимка не берет блокировок, поэтому читатели из многих
+        потоков не мешают друг другу и никогда не видят наполовину
+        примененные изменения. Сами изменения из нескольких потоков
+        по-прежнему нужно выполнять по одному.
+
+        Возврат:
+            Snapshot: Текущий снимок.
+
+        Исключения:
+            ValueError: Если парсер создан без snapshots=True.
+        """
+        snapshot = self.published
+        if snapshot is None:
+            raise ValueError("Снимки не включены: создайте парсер с snapshots=True")
+        return snapshot
+
+    def publish(self, names: Optional[Iterable[str]] = None) -> None:
+        """
+        Публикует новый снимок значений, если снимки включены, и файл
+        для других процессов, если он задан через share.
+
+        В ленивом режиме перед публикацией вычисляются все отложенные значения.
+
+        Параметры:
+            names (Optional[Iterable[str]]): Имена изменившихся переменных;
+                остальные значения берутся из прежнего снимка без копирования.
+                None - снимок строится заново, включая константы.
+        """
+        snapshot = self.published
+        if (snapshot is None and self.shared_path is None) or self.publish_held:
+            return
+        if names is not None:
+            names = list(names)
+            if not names:
+                return
+        for name in list(self.pending_constants) + list(self.pending):
+            self.resolve(name)
+        data = self.data
+        if snapshot is not None and names is None:
+            self.published = Snapshot(snapshot.version + 1,
+                                      {name: variable.get_view() for name, variable in data.items()},
+                                      {name: freeze(value) for name, value in self.constants.items()})
+        elif snapshot is not None:
+            changed = {}
+            removed = []
+            for name in names:
+                variable = data.get(name)
+                if variable is None:
+                    removed.append(name)
+                else:
+                    changed[name] = variable.get_view()
+            self.published = snapshot.evolve(changed, removed)
+        if self.shared_path is not None:
+            publish_shared(self, self.shared_path)
+
+    def share(self, path: Optional[str]) -> int:
+        """
+        Публикует значения в файл, который другие процессы читают через
+        flk.attach без разбора файлов FL, и затем обновляет его после
+        каждого reload и зафиксированной транзакции.
+
+        Файл отображается в память процессов только для чтения, поэтому
+        память под значения расходуется один раз на машину, а не в каждом
+        рабочем процессе. Каждая публикация записывает файл целиком.
+
+        Параметры:
+            path (Optional[str]): Путь к файлу, например в /dev/shm;
+                None - прекратить публикацию.
+
+        Возврат:
+            int: Номер опубликованной версии; 0, если публикация прекращена.
+
+        Исключения:
+            ValueError: Если значение нельзя сохранить в двоичном формате.
+        """
+        self.shared_path = path
+        if path is None:
+            return 0
+        return publish_shared(self, path)
 
     def parse_value(self, var_type: str, value: str) -> DataType:
         """
@@ -66,79 +343,92 @@ class Parser:
         """
         Парсит строку в словарь значений.
 
+        Значения элементов могут быть вложенными коллекциями.
+
         Параметры:
             value (str): Строка, представляющая словарь.
 
         Возврат:
             dict: Словарь спарсенных значений.
         """
-        result = {}
-        
-        lines = re.sub(r'\s+', ' ', value.strip('{}')).split(',')
-        for line in lines:
-            line = line.strip()
-            if line:
-                match = re.match(r'(\w+)\((\w+)\) *: *(\w+)\((\w+)\) *= *(.+)', line)
-                if match:
-                    key, key_type, var_type, val_type, val = match.groups()
-                    result[key] = self.parse_value(val_type, val.strip())
-                else:
-                    raise ValueError(f"Неправильный формат элемента словаря: {line}")
-        return result
-    
+        return self.literals.parse_dict(value)
+
     def parse_reference(self, ref: str) -> Any:
         """
         Парсит ссылку на переменную или константу.
 
+        Ссылка может указывать на вложенное значение любой глубины через
+        точку: ключи словарей и номера элементов списков (см. query.step).
+
         Параметры:
-            ref (str): Ссылка на переменную или константу.
+            ref (str): Ссылка на переменную или константу, например 'db.primary.port'.
 
         Возврат:
             Any: Значение переменной или константы.
 
         Исключения:
-            ValueError: Если переменная или константа не определена.
+            ValueError: Если переменная, константа или вложенное значение не определены.
         """
-        if '.' in ref:
-            obj, attr = ref.split('.')
-            if obj in self.data:
-                return self.data[obj].value[attr]
-            else:
-                raise ValueError(f"Объект {obj} не определен")
-        elif ref in self.data:
-            return self.data[ref].value
-        elif ref in self.constants:
-            return self.constants[ref]
+        name, dot, path = ref.partition('.')
+        if self.pending or self.pending_constants:
+            self.resolve(name)
+        if name in self.data:
+            value = self.data[name].value
+        elif name in self.constants:
+            value = self.constants[name]
+        elif dot:
+            raise ValueError(f"Объект {name} не определен")
         else:
             raise ValueError(f"Константа или переменная {ref} не определена")
+        if dot:
+            for key in path.split('.'):
+                try:
+                    value = step(value, key)
+                except KeyError:
+                    raise ValueError(f"Значение {ref} не определено") from None
+        return value
+
+    def parse_item(self, item: str) -> DataType:
+        """
+        Парсит элемент списка, множества или кортежа.
+
+        Числа, логические значения, ссылки и строки в кавычках
+        распознаются без регулярных выражений.
+
+        Параметры:
+            item (str): Строковое представление элемента.
+
+        Возврат:
+            DataType: Спарсенное значение элемента.
+        """
+        item = item.strip()
+        if item.startswith("$"):
+            return self.parse_reference(item[1:])
+        digits = item[1:] if item.startswith('-') else item
+        if digits.isdecimal():
+            return int(item)
+        whole, dot, fraction = digits.partition('.')
+        if dot and whole.isdecimal() and fraction.isdecimal():
+            return float(item)
+        lowered = item.lower()
+        if lowered == 'true' or lowered == 'false':
+            return lowered == 'true'
+        return self.parse_value("str", item)
 
     def parse_list(self, value: str) -> list:
         """
         Парсит строку в список значений.
 
+        Вложенные коллекции разбираются рекурсивно. Если включен numeric_arrays,
+        однородный числовой список возвращается массивом.
+
         Параметры:
             value (str): Строка, представляющая список.
 
         Возврат:
             list: Список спарсенных значений.
         """
-        value = value.strip('[]')
-        items = value.split(',')
-        parsed_items = []
-        for item in items:
-            item = item.strip()
-            if item.startswith("$"):
-                parsed_items.append(self.parse_reference(item[1:]))
-            elif re.match(r'^-?\d+(\.\d+)?$', item):  
-                if '.' in item:
-                    parsed_items.append(float(item))
-                else:
-                    parsed_items.append(int(item))
-            elif item.lower() in ('true', 'false'): 
-                parsed_items.append(item.lower() == 'true')
-            else:
-                parsed_items.append(self.parse_value("str", item))
-        return parsed_items
+        return self.literals.parse_list(value)
 
     def parse_set(self, value: str) -> set:
         """
@@ -150,23 +440,7 @@ class Parser:
         Возврат:
             set: Множество спарсенных значений.
         """
-        value = value.strip('{}')
-        items = value.split(',')
-        parsed_items = set()
-        for item in items:
-            item = item.strip()
-            if item.startswith("$"):
-                parsed_items.add(self.parse_reference(item[1:]))
-            elif re.match(r'^-?\d+(\.\d+)?$', item):  
-                if '.' in item:
-                    parsed_items.add(float(item))
-                else:
-                    parsed_items.add(int(item))
-            elif item.lower() in ('true', 'false'): 
-                parsed_items.add(item.lower() == 'true')
-            else:
-                parsed_items.add(self.parse_value("str", item))
-        return parsed_items
+        return self.literals.parse_set(value)
 
     def parse_tuple(self, value: str) -> tuple:
         """
@@ -178,23 +452,7 @@ class Parser:
         Возврат:
             tuple: Кортеж спарсенных значений.
         """
-        value = value.strip('()')
-        items = value.split(',')
-        parsed_items = []
-        for item in items:
-            item = item.strip()
-            if item.startswith("$"):
-                parsed_items.append(self.parse_reference(item[1:]))
-            elif re.match(r'^-?\d+(\.\d+)?$', item):  
-                if '.' in item:
-                    parsed_items.append(float(item))
-                else:
-                    parsed_items.append(int(item))
-            elif item.lower() in ('true', 'false'): 
-                parsed_items.append(item.lower() == 'true')
-            else:
-                parsed_items.append(self.parse_value("str", item))
-        return tuple(parsed_items)
+        return self.literals.parse_tuple(value)
 
     def parse_constant_line(self, line: str) -> None:
         """
@@ -206,13 +464,9 @@ class Parser:
         Исключения:
             ValueError: Если строка имеет неправильный формат.
         """
-        match = re.match(r'const (\w+)\((\w+)\) = (.+)', line)
-        if not match:
+        if not line.strip().startswith("const "):
             raise ValueError(f"Неправильный формат строки: {line}")
-
-        name, var_type, value = match.groups()
-        value = value.strip()
-        self.constants[name] = self.parse_value(var_type, value)
+        self.execute(parse_module(line))
 
     def create_var(self, name: str, var_type: str, value: str) -> None:
         """
@@ -226,119 +480,324 @@ class Parser:
         Исключения:
             ValueError: Если переменная с таким именем уже существует.
         """
-        if name in self.data:
+        if name in self.data or name in self.pending:
             raise ValueError(f"Переменная {name} уже существует.")
         if var_type == 'str':
             parsed_value = self.parse_value(var_type, f'"{value}"')
         else:
             parsed_value = self.parse_value(var_type, value)
 
-        self.data[name] = Variable(var_type, parsed_value)
-
-        with open(self.current_file, 'a', encoding='utf-8') as file:
-            file.write(f"\n{name}({var_type}) = {value}\n")
+        with self.transaction() as transaction:
+            transaction.remember(name)
+            self.data[name] = Variable(var_type, parsed_value)
+            if self.key_index is not None:
+                self.key_index.add(name)
+            transaction.append_var(self.current_file, name, var_type, value)
 
     def remove_var(self, name: str) -> None:
         """
         Удаляет переменную из файла.
 
+        Переменную, на которую ссылаются другие объявления, удалить нельзя:
+        иначе их значения устарели бы, а файл перестал бы загружаться.
+        Если имя объявлено и константой, зависимые пересчитываются по ней.
+
         Параметры:
             name (str): Имя переменной.
 
         Исключения:
-            ValueError: Если переменная с указанным именем не найдена.
+            ValueError: Если переменная с указанным именем не найдена
+                или на нее ссылаются другие объявления.
         """
-        if name not in self.data:
+        if name not in self.data and name not in self.pending:
             raise ValueError(f"Переменная {name} не найдена.")
-
-        del self.data[name]
-
-        with open(self.current_file, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        new_lines = []
-        var_assignment_pattern = re.compile(rf'(\b{name}\b)\((\w+)\) = (.+)')
-
-        for line in lines:
-            match = var_assignment_pattern.match(line.strip())
-            if match:
-                continue
-            new_lines.append(line)
-
-        with open(self.current_file, 'w', encoding='utf-8') as file:
-            file.writelines(new_lines)
+        graph = self.dependency_graph()
+        constant = name in self.constants or name in self.constant_declarations
+        dependents = sorted(graph.dependents.get(name, ()))
+        if dependents and not constant:
+            raise ValueError(f"Переменную {name} нельзя удалить: на нее ссылаются {', '.join(dependents)}")
+
+        with self.transaction() as transaction:
+            transaction.remember(name)
+            self.data.pop(name, None)
+            self.pending.pop(name, None)
+            self.declarations.pop(name, None)
+            graph.remove(name)
+            if constant:
+                graph.set_dependencies(name, self.declaration_references(name))
+                self.propagate([name])
+            if self.key_index is not None:
+                self.key_index.discard(name)
+            transaction.remove_var(self.owners.pop(name, None) or self.current_file, name)
 
     def evaluate_expression(self, expression: str) -> Any:
         """
         Оценивает арифметическое выражение.
 
+        Выражение компилируется один раз: значения уже известных констант
+        подставляются, а части выражения без ссылок вычисляются заранее.
+        Выражения, различающиеся только именами ссылок, используют одну
+        скомпилированную форму.
+        Поддерживаются числа, строки и коллекции (например, сложение строк
+        или списков).
+
         Параметры:
             expression (str): Строка с арифметическим выражением.
 
         Возврат:
             Any: Результат вычисления выражения.
+
+        Исключения:
+            ValueError: Если выражение имеет неправильный формат или ссылается
+                на неизвестное имя.
         """
-        tokens = re.findall(r'[\d.]+|[\w]+|\$[\w]+|[\+\-\*/%()]', expression)
-        result = []
-        for token in tokens:
-            if token.startswith('$'):
-                result.append(str(self.parse_reference(token[1:])))
-            elif token in self.constants:
-                result.append(str(self.constants[token]))
-            else:
-                result.append(token)
+        compiled = self.expressions.get(expression)
+        if compiled is None:
+            compiled = CompiledExpression(expression, self.constants, self.expression_templates)
+            self.expressions[expression] = compiled
+        return compiled.evaluate(self.expression_operand)
 
-        return round(eval(''.join(result)), 5)
+    def forget_expressions(self) -> None:
+        """
+        Сбрасывает скомпилированные выражения после изменения значения константы.
+        """
+        self.expressions.clear()
+        self.expression_templates.clear()
+
+    def expression_operand(self, name: str, reference: bool) -> Any:
+        """
+        Возвращает значение ссылки или константы, используемой в выражении.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+            reference (bool): True для ссылки через '$', False для имени константы.
+
+        Возврат:
+            Any: Значение.
+
+        Исключения:
+            ValueError: Если имя не определено.
+        """
+        if not reference and name in self.constants:
+            return self.constants[name]
+        if reference or name in self.pending_constants:
+            return self.parse_reference(name)
+        raise ValueError(f"Константа {name} не определена")
 
     def parse_line(self, line: str) -> None:
-        line = line.split("//")[0].strip()
-        if '{' in line:
-            match = re.match(r'(\w+)\((\w+)\) = ({.*})', line, re.DOTALL)
-            if match:
-                name, var_type, value = match.groups()
-                parsed_value = self.parse_value(var_type, value)
-            else:
-                raise ValueError(f"Неправильный формат строки: {line}")
+        """
+        Парсит строку с объявлением переменной.
+
+        Параметры:
+            line (str): Строка, содержащая объявление переменной.
+
+        Исключения:
+            ValueError: Если строка имеет неправильный формат.
+        """
+        if line.strip().startswith("const "):
+            raise ValueError(f"Неправильный формат строки: {line}")
+        self.execute(parse_module(line))
+
+    def evaluate(self, node: ValueNode) -> DataType:
+        """
+        Вычисляет значение узла синтаксического дерева.
+
+        Параметры:
+            node (ValueNode): Узел значения.
+
+        Возврат:
+            DataType: Вычисленное значение.
+        """
+        node_type = type(node)
+        if node_type is Literal:
+            return self.parse_value(node.var_type, node.text)
+        elif node_type is RawString:
+            return node.text
+        elif node_type is Expression:
+            return self.evaluate_expression(node.text)
+        elif node_type is LogicalExpression:
+            return self.parse_logical_expression(node.text)
+        elif node_type is Reference:
+            return self.parse_reference(node.ref)
         else:
-            match = re.match(r'(\w+)\((\w+)\) = (.+)', line)
-            if match:
-                name, var_type, value = match.groups()
-                if name in self.data and self.data[name].get_type() != var_type:
-                    raise TypeError(f"Переменная '{name}' уже определена с типом '{self.data[name].get_type()}'.")
-                if any(op in value for op in "+-*/%"):
-                    parsed_value = self.evaluate_expression(value)
-                elif value.strip().startswith("$"):
-                    parsed_value = self.parse_logical_expression(value)
+            raise ValueError(f"Неизвестный узел значения: {node!r}")
+
+    def execute(self, module: Module) -> None:
+        """
+        Выполняет объявления разобранного файла.
+
+        Параметры:
+            module (Module): Синтаксическое дерево файла.
+
+        Исключения:
+            TypeError: Если переменная переопределяется с другим типом.
+        """
+        if self.lazy:
+            self.index(module)
+            return
+        data = self.data
+        declarations = self.declarations
+        owners = self.owners
+        graph = self.graph
+        key_index = self.key_index
+        owner = self.import_stack[-1] if self.import_stack else None
+        evaluate = self.evaluate
+        for statement in module.statements:
+            statement_type = type(statement)
+            if statement_type is Assignment:
+                name = statement.name
+                variable = data.get(name)
+                if variable is not None and variable.get_type() != statement.var_type:
+                    raise TypeError(f"Переменная '{name}' уже определена с типом '{variable.get_type()}'.")
+                parsed_value = evaluate(statement.value)
+                if variable is not None:
+                    variable.set_value(parsed_value)
                 else:
-                    if var_type == 'str':
-                        parsed_value = self.parse_value(var_type, f'"{value.strip()}"')
-                    else:
-                        parsed_value = self.parse_value(var_type, value.strip())
-            else:
-                raise ValueError(f"Неправильный формат строки: {line}")
+                    data[name] = Variable(statement.var_type, parsed_value)
+                    if key_index is not None:
+                        key_index.add(name)
+                declarations[name] = statement
+                owners[name] = owner
+                if graph is not None:
+                    graph.set_dependencies(name, references(statement.value))
+            elif statement_type is Constant:
+                if statement.name in self.constants:
+                    self.forget_expressions()
+                self.constants[statement.name] = self.evaluate(statement.value)
+                self.constant_declarations[statement.name] = statement
+                if graph is not None:
+                    graph.set_dependencies(statement.name, references(statement.value))
+            elif statement_type is Import:
+                self.import_module(statement.module)
+
+    def index(self, module: Module) -> None:
+        """
+        Запоминает объявления разобранного файла без вычисления значений.
 
-        if name in self.data:
-            self.data[name].set_value(parsed_value)
+        Импорты обрабатываются сразу, чтобы их объявления также попали в индекс.
+
+        Параметры:
+            module (Module): Синтаксическое дерево файла.
+
+        Исключения:
+            TypeError: Если переменная переопределяется с другим типом.
+        """
+        owner = self.import_stack[-1] if self.import_stack else None
+        for statement in module.statements:
+            statement_type = type(statement)
+            if statement_type is Assignment:
+                name = statement.name
+                declared = self.pending.get(name)
+                var_type = declared.var_type if declared is not None else (
+                    self.data[name].get_type() if name in self.data else statement.var_type)
+                if var_type != statement.var_type:
+                    raise TypeError(f"Переменная '{name}' уже определена с типом '{var_type}'.")
+                self.pending[name] = statement
+                self.declarations[name] = statement
+                self.owners[name] = owner
+                if self.key_index is not None:
+                    self.key_index.add(name)
+                if self.graph is not None:
+                    self.graph.set_dependencies(name, references(statement.value))
+            elif statement_type is Constant:
+                self.pending_constants[statement.name] = statement
+                self.constant_declarations[statement.name] = statement
+                if self.graph is not None:
+                    self.graph.set_dependencies(statement.name, references(statement.value))
+            elif statement_type is Import:
+                self.import_module(statement.module)
+
+    def resolve(self, name: str) -> None:
+        """
+        Вычисляет отложенное объявление переменной или константы, если оно есть.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+
+        Исключения:
+            ValueError: Если объявления ссылаются друг на друга по кругу.
+        """
+        if name in self.pending:
+            statement = self.pending[name]
+        elif name in self.pending_constants and name not in self.data:
+            statement = self.pending_constants[name]
         else:
-            self.data[name] = Variable(var_type, parsed_value)
+            return
+        if name in self.resolving:
+            cycle = self.resolving[self.resolving.index(name):] + [name]
+            raise ValueError("Циклическая ссылка: " + " -> ".join(cycle))
+
+        self.resolving.append(name)
+        try:
+            value = self.evaluate(statement.value)
+        finally:
+            self.resolving.pop()
+
+        if type(statement) is Constant:
+            del self.pending_constants[name]
+            self.constants[name] = value
+        else:
+            del self.pending[name]
+            if name in self.data:
+                self.data[name].set_value(value)
+            else:
+                self.data[name] = Variable(statement.var_type, value)
 
     def edit_var_value(self, var_name: str, new_var_value: str):
         """
         Изменяет значение переменной во всех файлах, включая импортированные.
 
+        Переменные, которые ссылаются на измененную переменную (напрямую
+        или через другие переменные), пересчитываются в порядке зависимостей.
+
         Параметры:
             var_name: Имя переменной.
             new_var_value: Новое значение переменной.
         """
 
+        self.resolve(var_name)
         if var_name in self.data:
             var_type = self.data[var_name].get_type()
             parsed_value = self.parse_value(var_type, new_var_value)
-            self.data[var_name].set_value(parsed_value)
         else:
             raise ValueError(f"Переменная {var_name} не найдена.")
 
-        self.update_file_var_value(self.current_file, var_name, new_var_value)
+        with self.transaction() as transaction:
+            transaction.remember(var_name)
+            self.data[var_name].set_value(parsed_value)
+            transaction.update_var(self.current_file, var_name, new_var_value)
+            graph = self.dependency_graph()
+            graph.set_dependencies(var_name, references(value_node(var_type, str(new_var_value))))
+            self.propagate([var_name])
+
+    def propagate(self, names: List[str]) -> List[str]:
+        """
+        Пересчитывает переменные, зависящие от изменившихся имен.
+
+        Пересчитываются только затронутые переменные, каждая после всех
+        переменных, от которых она зависит. Значения, еще не вычисленные
+        в ленивом режиме, не пересчитываются: они будут вычислены при обращении.
+        Внутри транзакции прежние значения запоминаются для отката.
+
+        Параметры:
+            names (List[str]): Имена изменившихся переменных и констант.
+
+        Возврат:
+            List[str]: Имена пересчитанных переменных в порядке пересчета.
+
+        Исключения:
+            ValueError: Если зависимости образуют цикл.
+        """
+        changed = set(names)
+        recomputed = []
+        for name in self.dependency_graph().order(changed):
+            if name in changed or name not in self.data or name not in self.declarations:
+                continue
+            if self.active_transaction is not None:
+                self.active_transaction.remember(name)
+            self.recompute(name)
+            recomputed.append(name)
+        return recomputed
 
     def update_file_var_value(self, file_path: str, var_name: str, new_var_value: str):
         """
@@ -349,34 +808,134 @@ class Parser:
             var_name: Имя переменной.
             new_var_value: Новое значение переменной.
         """
+        with self.transaction() as transaction:
+            transaction.update_var(file_path, var_name, new_var_value)
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """
+        Объединяет изменения переменных в одну транзакцию.
 
-        new_lines = []
-        var_assignment_pattern = re.compile(rf'(\b{var_name}\b)\((\w+)\) = (.+)')
+        Внутри блока with вызовы edit_var_value, create_var и remove_var
+        сразу меняют значения в памяти, а изменения файлов накапливаются.
+        При выходе из блока каждый затронутый файл записывается один раз
+        и атомарно (через временный файл и переименование). Если в блоке
+        возникло исключение, файлы не изменяются, а значения в памяти
+        восстанавливаются. Вложенные транзакции входят во внешнюю;
+        транзакция другого потока ждет завершения текущей.
 
-        for line in lines:
-            match = var_assignment_pattern.match(line.strip())
-            if match:
-                name, var_type, value = match.groups()
-                if name == var_name:
-                    new_line = f"{var_name}({var_type}) = {new_var_value}\n"
-                    new_lines.append(new_line)
-                    continue
-            new_lines.append(line)
+        Возврат:
+            Iterator[Transaction]: Текущая транзакция.
+        """
+        with self.transaction_lock:
+            if self.active_transaction is not None:
+                yield self.active_transaction
+                return
+            transaction = Transaction(self)
+            self.active_transaction = transaction
+            try:
+                yield transaction
+                transaction.commit()
+            except BaseException:
+                transaction.rollback()
+                raise
+            finally:
+                self.active_transaction = None
+
+    def save(self, path: Optional[str] = None, format: Optional[str] = None) -> None:
+        """
+        Записывает значения переменных в файлы.
 
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.writelines(new_lines)
+        Без пути изменения значений в памяти записываются в разобранные
+        файлы одной транзакцией: каждый файл записывается один раз,
+        объявления, значения которых не изменились, а также комментарии
+        и форматирование остаются как есть. Измененные переменные
+        записываются литералами, новые добавляются в конец текущего файла,
+        удаленные из data удаляются из файлов. Константы не записываются.
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if line.startswith('(import)'):
-                    import_path = line.strip().split(' ')[1].strip('()')
-                    import_file_path = f"{import_path.replace('.', '/')}.fl"
-                    full_import_file_path = os.path.join(os.path.dirname(file_path), import_file_path)
-                    self.update_file_var_value(full_import_file_path, var_name, new_var_value)
+        С путем все константы и переменные записываются в новый файл
+        одним потоковым проходом (см. flk.serializer.dump).
 
+        Параметры:
+            path (Optional[str]): Путь к файлу для записи всего пространства имен.
+            format (Optional[str]): 'fl', 'json' или 'binary'; по умолчанию
+                определяется по расширению файла.
+
+        Исключения:
+            ValueError: Если значение нельзя записать в файл FL или, без пути,
+                файл для новых переменных неизвестен.
+        """
+        if path is not None:
+            dump(self, path, format)
+            return
+
+        written: Dict[str, Tuple[Optional[Assignment], str]] = {}
+        with self.transaction() as transaction:
+            # Сначала литералы, затем, после пересчета зависящих от них
+            # переменных, выражения и ссылки - как при edit_var_value.
+            declared = [(name, statement) for name, statement in self.declarations.items()
+                        if name not in self.pending]
+            literals = [item for item in declared if not references(item[1].value)]
+            derived = [item for item in declared if references(item[1].value)]
+            changed = self.save_declarations(transaction, literals, written)
+            self.propagate(changed)
+            self.save_declarations(transaction, derived, written)
+            for name, variable in self.data.items():
+                if name not in self.declarations:
+                    if self.current_file is None:
+                        raise ValueError("Файл для новых переменных неизвестен: укажите путь")
+                    text = format_value(variable.get_type(), variable.value)
+                    transaction.remember(name)
+                    transaction.append_var(self.current_file, name, variable.get_type(), text)
+                    written[name] = (None, text)
+        # При построчной правке файла транзакция не обновляет объявления.
+        for name, (previous, text) in written.items():
+            if self.declarations.get(name) is previous:
+                self.declarations[name] = parse_module(
+                    f"{name}({self.data[name].get_type()}) = {text}").statements[0]
+                if previous is None:
+                    self.owners[name] = os.path.abspath(self.current_file)
+
+    def save_declarations(self, transaction: Transaction, declared: List[Tuple[str, Assignment]],
+                          written: Dict[str, Tuple[Optional[Assignment], str]]) -> List[str]:
+        """
+        Записывает в транзакцию объявления, значения которых отличаются
+        от значений в памяти, и удаляет объявления удаленных переменных.
+
+        Параметры:
+            transaction (Transaction): Текущая транзакция.
+            declared (List[Tuple[str, Assignment]]): Имена и действующие объявления.
+            written (Dict[str, Tuple[Optional[Assignment], str]]): Прежние объявления
+                и новые тексты значений записанных переменных; дополняется.
+
+        Возврат:
+            List[str]: Имена переменных, объявления которых изменились.
+        """
+        changed = []
+        for name, statement in declared:
+            variable = self.data.get(name)
+            owner = self.owners.get(name) or self.current_file
+            if variable is None:
+                transaction.remember(name)
+                transaction.remove_var(owner, name)
+                del self.declarations[name]
+                self.owners.pop(name, None)
+                if self.graph is not None:
+                    self.graph.remove(name)
+                continue
+            try:
+                same = _same_value(self.evaluate(statement.value), variable.value)
+            except ValueError:
+                same = False
+            if not same:
+                text = format_value(variable.get_type(), variable.value)
+                transaction.remember(name)
+                transaction.update_var(owner, name, text)
+                written[name] = (statement, text)
+                if self.graph is not None:
+                    self.graph.set_dependencies(name, frozenset())
+                changed.append(name)
+        return changed
 
     def parse_logical_expression(self, expression: str) -> bool:
         """
@@ -389,7 +948,7 @@ class Parser:
             bool: Результат логического выражения.
         """
         expression = expression.strip()
-        match = re.match(r'\$([\w]+)\s*([><=])\s*\$([\w]+)', expression)
+        match = LOGICAL_EXPRESSION.match(expression)
         if match:
             var1, operator, var2 = match.groups()
             value1 = self.parse_reference(var1)
@@ -412,15 +971,48 @@ class Parser:
         """
         parts = line.strip().split(' ')
         if len(parts) > 1:
-            import_path = parts[1].strip('()')
-            path = f"{import_path.replace('.', '/')}.fl"
-            full_path = os.path.join(os.path.dirname(self.current_file), path)
-            original_file = self.current_file
-            self.parse_file(full_path)
-            self.current_file = original_file
+            self.import_module(parts[1].strip('()'))
         else:
             raise ValueError("Неправильный формат директивы импорта: " + line)
 
+    def import_module(self, module: str) -> None:
+        """
+        Загружает данные модуля, импортированного из текущего файла.
+
+        Каждый файл разбирается один раз: повторные импорты того же файла
+        (например, общего модуля, импортируемого из нескольких мест) пропускаются.
+
+        Параметры:
+            module (str): Путь модуля через точку.
+
+        Исключения:
+            CircularImportError: Если импорт образует цикл.
+        """
+        full_path = self.resolve_import(module, self.current_file)
+        key = os.path.abspath(full_path)
+        if key in self.import_stack:
+            cycle = self.import_stack[self.import_stack.index(key):] + [key]
+            raise CircularImportError(cycle)
+        if key in self.modules:
+            return
+        original_file = self.current_file
+        self.load_file(full_path)
+        self.current_file = original_file
+
+    def resolve_import(self, module: str, file_path: str) -> str:
+        """
+        Возвращает путь к файлу импортируемого модуля.
+
+        Параметры:
+            module (str): Путь модуля через точку.
+            file_path (str): Путь к файлу, содержащему директиву импорта.
+
+        Возврат:
+            str: Путь к файлу модуля.
+        """
+        path = f"{module.replace('.', '/')}.fl"
+        return os.path.join(os.path.dirname(file_path), path)
+
     def get_var(self, name: str) -> Variable:
         """
         Возвращает объект переменной по имени.
@@ -431,49 +1023,654 @@ class Parser:
         Возврат:
             Variable: Объект переменной.
         """
+        self.resolve(name)
         if name in self.data:
             return self.data[name]
         else:
             raise ValueError(f"Переменная {name} не найдена в файле.")
 
+    def get_view(self, name: str) -> Any:
+        """
+        Возвращает значение переменной без копирования, только для чтения.
+
+        Параметры:
+            name (str): Имя переменной.
+
+        Возврат:
+            Any: Значение переменной или его представление только для чтения
+                (см. Variable.get_view).
+        """
+        variable = self.data.get(name)
+        if variable is None:
+            variable = self.get_var(name)
+        return variable.get_view()
+
+    def query_index(self) -> QueryIndex:
+        """
+        Возвращает индекс имен переменных, построенный при первом обращении.
+
+        Возврат:
+            QueryIndex: Индекс имен и ключей вложенных словарей.
+        """
+        if self.key_index is None:
+            self.key_index = QueryIndex(self.data.keys() | self.pending.keys())
+        return self.key_index
+
+    def get_path(self, path: str) -> Any:
+        """
+        Возвращает значение по пути через точку любой глубины.
+
+        Параметры:
+            path (str): Путь, например 'db.primary.port' или 'servers.0.host'.
+
+        Возврат:
+            Any: Значение переменной, константы или вложенное значение.
+
+        Исключения:
+            ValueError: Если путь неправильный или значения нет.
+        """
+        split_path(path)
+        return self.parse_reference(path)
+
+    def find(self, pattern: str) -> List[str]:
+        """
+        Находит пути переменных и вложенных значений по шаблону.
+
+        Шаблон состоит из частей через точку; каждая часть - имя или шаблон
+        fnmatch ('*', '?', '[...]') для одного уровня: 'db_*' - все переменные
+        с префиксом db_, 'db_*.host' - ключ host в каждой из них,
+        'servers.*.port' - ключ port во всех словарях словаря servers.
+        Поиск идет по отсортированным индексам, поэтому часть с буквальным
+        префиксом не просматривает весь уровень.
+
+        Параметры:
+            pattern (str): Шаблон пути.
+
+        Возврат:
+            List[str]: Найденные пути в порядке имен и ключей.
+
+        Исключения:
+            ValueError: Если шаблон неправильный.
+        """
+        parts = split_path(pattern)
+        index = self.query_index()
+        names = index.names.match(parts[0])
+        if len(parts) == 1:
+            return names
+        matches = [(name, self.get_var(name).value) for name in names]
+        for part in parts[1:]:
+            deeper = []
+            for path, value in matches:
+                keys = index.keys(path, value)
+                if keys is not None:
+                    for key in keys.match(part):
+                        deeper.append((f"{path}.{key}", value[keys.originals[key]]))
+            matches = deeper
+        return [path for path, _ in matches]
+
+    def scan(self, start: Optional[str] = None, stop: Optional[str] = None,
+             path: Optional[str] = None) -> List[str]:
+        """
+        Возвращает имена переменных или ключи словаря из диапазона [start, stop)
+        в порядке сортировки строк.
+
+        Параметры:
+            start (Optional[str]): Нижняя граница; None - с начала.
+            stop (Optional[str]): Верхняя граница, не включается; None - до конца.
+            path (Optional[str]): Путь к словарю, ключи которого просматриваются;
+                None - имена переменных.
+
+        Возврат:
+            List[str]: Имена или ключи (в виде строк).
+
+        Исключения:
+            ValueError: Если значение по пути не определено или не является словарем.
+        """
+        index = self.query_index()
+        if path is None:
+            return index.names.range(start, stop)
+        keys = index.keys(path, self.get_path(path))
+        if keys is None:
+            raise ValueError(f"Значение {path} не является словарем")
+        return keys.range(start, stop)
+
+    def read_source(self, filename: str) -> str:
+        """
+        Читает исходный текст файла FL.
+
+        Параметры:
+            filename (str): Имя файла.
+
+        Возврат:
+            str: Содержимое файла.
+        """
+        if self.journal is not None:
+            return self.journal.read(filename, self.record_source).decode('utf-8')
+        with open(filename, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            content = file.read()
+        self.record_source(filename, stat, content)
+        return content.decode('utf-8')
+
+    def record_source(self, filename: str, stat: os.stat_result, content: bytes) -> None:
+        """
+        Запоминает состояние прочитанного файла для перезагрузки и кэша.
+
+        Параметры:
+            filename (str): Имя файла.
+            stat (os.stat_result): Состояние файла в момент чтения.
+            content (bytes): Содержимое файла.
+        """
+        self.file_states[os.path.abspath(filename)] = (stat.st_mtime_ns, stat.st_size)
+        if self.sources is not None:
+            self.sources.append(source_info(filename, stat, content))
+
+    def parse_source(self, filename: str) -> Module:
+        """
+        Читает файл и строит его синтаксическое дерево.
+
+        Параметры:
+            filename (str): Имя файла.
+
+        Возврат:
+            Module: Синтаксическое дерево файла.
+        """
+        return parse_module(self.read_source(filename), filename)
+
+    def load_file(self, filename: str) -> None:
+        """
+        Разбирает файл и выполняет его объявления.
+
+        Параметры:
+            filename (str): Имя файла для парсинга.
+        """
+        key = os.path.abspath(filename)
+        self.current_file = filename
+        self.import_stack.append(key)
+        try:
+            module = self.parse_source(filename)
+            self.modules[key] = module
+            self.execute(module)
+        finally:
+            self.import_stack.pop()
+
     def parse_file(self, filename: str) -> Dict[str, DataType]:
         """
         Парсит файл и возвращает данные в виде словаря.
 
+        Файл целиком разбирается лексером, который сразу строит узлы
+        синтаксического дерева; вычисление значений выполняется отдельным проходом.
+        Если включен кэш и парсер еще пуст, результат берется из кэша, пока
+        файл и все его импорты не изменились.
+
         Параметры:
             filename (str): Имя файла для парсинга.
+
+        Возврат:
+            Dict[str, DataType]: Значения всех переменных; в ленивом режиме - словарь,
+                вычисляющий значения при обращении.
         """
-        self.current_file = filename
-        with open(filename, 'r', encoding='utf-8') as file:
-            multiline_buffer = ""
-            open_braces = 0
-            in_multiline_comment = False
-            for line in file:
-                line = line.strip()
-                if line.startswith('/*'):
-                    in_multiline_comment = True
-                if in_multiline_comment:
-                    if '*/' in line:
-                        in_multiline_comment = False
-                    continue
-                if line.startswith('(import)'):
-                    self.parse_import(line)
+        if self.cache is not None and self.sources is None and not self.data and not self.constants:
+            cached = self.cache.load(filename, self.literals.numeric_arrays)
+            if cached is not None:
+                self.current_file = filename
+                self.data, self.constants, sources, syntax = cached
+                # Объявления нужны для пересчета зависимых значений при изменениях.
+                for name, value in syntax.items():
+                    setattr(self, name, value)
+                for source in sources:
+                    self.file_states[source.path] = (source.mtime_ns, source.size)
+            elif self.lazy:
+                self.load_file(filename)
+            else:
+                self.sources = []
+                try:
+                    self.load_file(filename)
+                    self.cache.store(filename, self.sources, self.data, self.constants,
+                                     self.literals.numeric_arrays, self.syntax_state())
+                finally:
+                    self.sources = None
+        else:
+            self.load_file(filename)
+        if filename not in self.root_files:
+            self.root_files.append(filename)
+        self.publish()
+        if self.pending:
+            return LazyValues(self)
+        return {name: variable.value for name, variable in self.data.items()}
+
+    def syntax_state(self) -> Dict[str, Any]:
+        """
+        Возвращает синтаксические деревья файлов и объявления для сохранения в кэше.
+
+        Возврат:
+            Dict[str, Any]: Значения атрибутов парсера по их именам.
+        """
+        return {
+            'modules': self.modules,
+            'declarations': self.declarations,
+            'constant_declarations': self.constant_declarations,
+            'owners': self.owners,
+        }
+
+    def iter_file(self, filename: str, keep: bool = False) -> Iterator[Tuple[str, Variable]]:
+        """
+        Разбирает файл потоком и выдает переменные по мере чтения объявлений.
+
+        Файл читается буферизованными блоками и разбирается построчно, так что
+        в памяти одновременно находится только текущее объявление. Импорты
+        загружаются целиком, константы запоминаются. Без keep переменные
+        только выдаются и не сохраняются в парсере, поэтому ссылки на
+        переменные самого файла не вычисляются; ссылки на импортированные
+        переменные и константы работают. С журналом изменений файл
+        читается целиком, чтобы применить журнал.
+
+        Параметры:
+            filename (str): Имя файла.
+            keep (bool): Сохранять переменные в парсере, как parse_file.
+
+        Возврат:
+            Iterator[Tuple[str, Variable]]: Имена и переменные в порядке объявления.
+
+        Исключения:
+            ValueError: Если объявление имеет неправильный формат или ссылка не определена.
+        """
+        key = os.path.abspath(filename)
+        if self.journal is not None:
+            file = io.StringIO(self.read_source(filename))
+        else:
+            file = open(filename, 'r', encoding='utf-8', newline='')
+            if keep:
+                stat = os.fstat(file.fileno())
+                self.file_states[key] = (stat.st_mtime_ns, stat.st_size)
+        with file:
+            for statement in parse_lines(file):
+                assignment = type(statement) is Assignment
+                # Между выдачами парсер может использоваться для других файлов.
+                self.current_file = filename
+                self.import_stack.append(key)
+                try:
+                    if keep or not assignment:
+                        self.execute(Module(filename, [statement]))
+                    else:
+                        variable = Variable(statement.var_type, self.evaluate(statement.value))
+                finally:
+                    self.import_stack.pop()
+                if assignment:
+                    yield statement.name, self.get_var(statement.name) if keep else variable
+        if keep and filename not in self.root_files:
+            self.root_files.append(filename)
+
+    def file_spans(self, path: str) -> Optional[SpanIndex]:
+        """
+        Возвращает индекс диапазонов байт объявлений переменных файла.
+
+        Индекс строится по синтаксическому дереву при первом обращении
+        и обновляется транзакциями при записи файла. Лексер не считает
+        байты, поэтому для перевода смещений в байты файл читается здесь -
+        только когда индекс понадобился для правки файла.
+
+        Параметры:
+            path (str): Абсолютный путь к файлу.
+
+        Возврат:
+            Optional[SpanIndex]: Индекс или None, если синтаксическое дерево файла неизвестно.
+        """
+        spans = self.spans.get(path)
+        if spans is None:
+            module = self.modules.get(path)
+            if module is None:
+                return None
+            content = None
+            # С журналом диапазоны не используются для записи файла (см. Transaction.commit_journal).
+            if self.journal is None:
+                try:
+                    with open(path, 'rb') as file:
+                        content = file.read()
+                except OSError:
+                    pass
+            spans = self.spans[path] = SpanIndex(module, content)
+        return spans
+
+    def changed_files(self) -> List[str]:
+        """
+        Возвращает прочитанные файлы, изменившиеся с момента чтения.
+
+        Изменение журнала считается изменением его файла.
+
+        Возврат:
+            List[str]: Абсолютные пути измененных или удаленных файлов.
+        """
+        changed = []
+        for path, state in self.file_states.items():
+            try:
+                stat = os.stat(path)
+                if (stat.st_mtime_ns, stat.st_size) == state:
                     continue
-                if line and not line.startswith('#'):
-                    if '{' in line:
-                        open_braces += line.count('{')
-                    if '}' in line:
-                        open_braces -= line.count('}')
-                    
-                    multiline_buffer += line + " "
-                    
-                    if open_braces == 0 and multiline_buffer:
-                        if multiline_buffer.startswith("const "):
-                            self.parse_constant_line(multiline_buffer)
-                        else:
-                            self.parse_line(multiline_buffer)
-                        multiline_buffer = ""  
-                elif open_braces > 0:
-                    multiline_buffer += line + " "
-                    
-        return {name: variable.value for name, variable in self.data.items()}
\ No newline at end of file
+            except OSError:
+                pass
+            if self.journal is not None:
+                path = self.journal.source_for(path) or path
+            if path not in changed:
+                changed.append(path)
+        return changed
+
+    def compact(self) -> List[str]:
+        """
+        Переносит журналы всех прочитанных файлов в сами файлы.
+
+        Возврат:
+            List[str]: Абсолютные пути файлов, в которые были перенесены изменения.
+
+        Исключения:
+            ValueError: Если парсер создан без journal.
+        """
+        if self.journal is None:
+            raise ValueError("Журнал изменений не включен: создайте парсер с journal=True")
+        return [path for path in list(self.modules) if self.journal.compact(path)]
+
+    def dependency_graph(self) -> DependencyGraph:
+        """
+        Возвращает граф зависимостей между объявлениями, строя его при первом вызове.
+
+        Возврат:
+            DependencyGraph: Граф зависимостей.
+        """
+        if self.graph is None:
+            graph = DependencyGraph()
+            for name in self.declarations.keys() | self.constant_declarations.keys():
+                graph.set_dependencies(name, self.declaration_references(name))
+            self.graph = graph
+        return self.graph
+
+    def declaration_references(self, name: str) -> Set[str]:
+        """
+        Возвращает имена, на которые ссылаются действующие объявления имени.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+
+        Возврат:
+            Set[str]: Имена зависимостей.
+        """
+        names: Set[str] = set()
+        for declarations in (self.declarations, self.constant_declarations):
+            statement = declarations.get(name)
+            if statement is not None:
+                names.update(references(statement.value))
+        return names
+
+    def reload(self) -> List[str]:
+        """
+        Перечитывает изменившиеся файлы и пересчитывает зависящие от них значения.
+
+        Заново разбираются только изменившиеся файлы; пересчитываются только
+        объявления, изменившиеся в этих файлах, и переменные, которые от них
+        зависят (в порядке зависимостей). Новые импорты загружаются.
+        Если файл был загружен из кэша, все файлы разбираются заново.
+
+        Перезагрузка выполняется целиком или не выполняется вовсе: если
+        разбор или вычисление завершились ошибкой, состояние парсера
+        (значения, объявления и сведения о прочитанных файлах) восстанавливается,
+        поэтому следующий вызов reload снова попробует прочитать те же файлы.
+
+        Возврат:
+            List[str]: Имена переменных и констант, значения которых изменились;
+                в ленивом режиме - имена, которые будут вычислены заново.
+        """
+        changed_files = self.changed_files()
+        if not changed_files:
+            return []
+        state = self.reload_state()
+        touched: List[Tuple[Variable, Any]] = []
+        try:
+            if any(path not in self.modules for path in changed_files):
+                return self.reload_all()
+            changed = self.reload_files(changed_files, touched)
+        except BaseException:
+            self.restore_reload_state(state, touched)
+            raise
+        self.publish()
+        return changed
+
+    def reload_state(self) -> Dict[str, Any]:
+        """
+        Запоминает состояние парсера, которое меняет перезагрузка.
+
+        Словари копируются без копирования значений: значения переменных,
+        изменяемые на месте, запоминает reload_files.
+
+        Возврат:
+            Dict[str, Any]: Копии словарей состояния по именам атрибутов.
+        """
+        return {name: copy(getattr(self, name)) for name in _RELOAD_STATE}
+
+    def restore_reload_state(self, state: Dict[str, Any], touched: List[Tuple[Variable, Any]]) -> None:
+        """
+        Восстанавливает состояние парсера после неудачной перезагрузки.
+
+        Параметры:
+            state (Dict[str, Any]): Состояние, сохраненное reload_state.
+            touched (List[Tuple[Variable, Any]]): Переменные, измененные на месте,
+                и их прежние значения.
+        """
+        for variable, value in reversed(touched):
+            variable.set_value(value)
+        for name, value in state.items():
+            setattr(self, name, value)
+        # Производные структуры строятся заново при следующем обращении.
+        self.graph = None
+        self.key_index = None
+        self.forget_expressions()
+
+    def reload_files(self, changed_files: List[str], touched: List[Tuple[Variable, Any]]) -> List[str]:
+        """
+        Перечитывает изменившиеся файлы, уже разобранные парсером (см. reload).
+
+        Параметры:
+            changed_files (List[str]): Абсолютные пути изменившихся файлов.
+            touched (List[Tuple[Variable, Any]]): Сюда добавляются переменные,
+                значения которых изменяются на месте, с прежними значениями.
+
+        Возврат:
+            List[str]: Имена переменных и констант, значения которых изменились.
+        """
+        graph = self.dependency_graph()
+        changed: Set[str] = set()
+        added: Set[str] = set()
+        for path in changed_files:
+            module_changed, module_added = self.reload_module(path)
+            changed |= module_changed
+            added |= module_added
+        for name in changed | added:
+            graph.set_dependencies(name, self.declaration_references(name))
+
+        order = graph.order(changed | added)
+        if self.lazy:
+            for name in order:
+                if name not in added:
+                    self.invalidate(name)
+            return order
+
+        before = {name: self.value_state(name) for name in order}
+        for name in order:
+            if name not in added:
+                variable = self.data.get(name)
+                if variable is not None:
+                    touched.append((variable, variable.value))
+                self.recompute(name)
+        return [name for name in order if name in added or before[name] != self.value_state(name)]
+
+    def reload_module(self, path: str) -> Tuple[Set[str], Set[str]]:
+        """
+        Заново разбирает один файл и обновляет действующие объявления.
+
+        Параметры:
+            path (str): Абсолютный путь к файлу.
+
+        Возврат:
+            Tuple[Set[str], Set[str]]: Имена, объявления которых изменились, появились
+                или исчезли в самом файле, и имена, объявленные в новых импортах.
+        """
+        old_module = self.modules[path]
+        filename = old_module.path
+        if not os.path.exists(path):
+            new_module = Module(filename, [])
+            self.file_states.pop(path, None)
+        else:
+            new_module = self.parse_source(filename)
+        self.modules[path] = new_module
+        self.spans.pop(path, None)
+
+        changed: Set[str] = set()
+        for statement_type, declarations in ((Assignment, self.declarations),
+                                             (Constant, self.constant_declarations)):
+            old = {statement.name: statement for statement in old_module.statements
+                   if type(statement) is statement_type}
+            new = {statement.name: statement for statement in new_module.statements
+                   if type(statement) is statement_type}
+            for name, statement in new.items():
+                current = declarations.get(name)
+                previous = old.get(name)
+                if current is None or current is previous:
+                    declarations[name] = statement
+                    if statement_type is Assignment:
+                        self.owners[name] = path
+                    if previous is None or previous[:3] != statement[:3]:
+                        changed.add(name)
+            for name, statement in old.items():
+                if name not in new and declarations.get(name) is statement:
+                    del declarations[name]
+                    if statement_type is Assignment:
+                        self.owners.pop(name, None)
+                    changed.add(name)
+
+        old_imports = {statement.module for statement in old_module.statements if type(statement) is Import}
+        added = [statement.module for statement in new_module.statements
+                 if type(statement) is Import and statement.module not in old_imports]
+        imported: Set[str] = set()
+        if added:
+            known = self.declarations.keys() | self.constant_declarations.keys()
+            original_file = getattr(self, 'current_file', filename)
+            self.current_file = filename
+            try:
+                for module in added:
+                    self.import_module(module)
+            finally:
+                self.current_file = original_file
+            imported = (self.declarations.keys() | self.constant_declarations.keys()) - known
+        return changed - imported, imported
+
+    def recompute(self, name: str) -> None:
+        """
+        Заново вычисляет значение переменной или константы по ее объявлению.
+
+        Если объявления больше нет, значение удаляется.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+        """
+        if name in self.constants:
+            self.forget_expressions()
+        statement = self.constant_declarations.get(name)
+        if statement is not None:
+            self.constants[name] = self.evaluate(statement.value)
+        else:
+            self.constants.pop(name, None)
+
+        statement = self.declarations.get(name)
+        if statement is None:
+            self.data.pop(name, None)
+            if self.key_index is not None:
+                self.key_index.discard(name)
+            return
+        value = self.evaluate(statement.value)
+        variable = self.data.get(name)
+        if variable is not None and variable.get_type() == statement.var_type:
+            variable.set_value(value)
+        else:
+            self.data[name] = Variable(statement.var_type, value)
+            if self.key_index is not None:
+                self.key_index.add(name)
+
+    def invalidate(self, name: str) -> None:
+        """
+        Возвращает имя в число отложенных объявлений ленивого режима.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+        """
+        if name in self.constants:
+            self.forget_expressions()
+        self.data.pop(name, None)
+        self.constants.pop(name, None)
+        self.pending.pop(name, None)
+        self.pending_constants.pop(name, None)
+        if name in self.declarations:
+            self.pending[name] = self.declarations[name]
+        elif self.key_index is not None:
+            self.key_index.discard(name)
+        if name in self.constant_declarations:
+            self.pending_constants[name] = self.constant_declarations[name]
+
+    def reload_all(self) -> List[str]:
+        """
+        Полностью заново разбирает все файлы, переданные в parse_file.
+
+        Возврат:
+            List[str]: Имена переменных и констант, значения которых изменились.
+        """
+        before = {name: self.value_state(name) for name in self.data.keys() | self.constants.keys()}
+        root_files = self.root_files
+        self.data, self.constants = {}, {}
+        self.modules, self.file_states, self.root_files = {}, {}, []
+        self.declarations, self.constant_declarations = {}, {}
+        self.pending, self.pending_constants = {}, {}
+        self.owners, self.spans = {}, {}
+        self.forget_expressions()
+        self.graph = None
+        self.key_index = None
+        # Промежуточные снимки содержали бы только часть файлов.
+        self.publish_held += 1
+        try:
+            for filename in root_files:
+                self.parse_file(filename)
+        finally:
+            self.publish_held -= 1
+        self.publish()
+        names = before.keys() | self.data.keys() | self.constants.keys()
+        return sorted(name for name in names if before.get(name) != self.value_state(name))
+
+    def watch(self, interval: float = 1.0, callback=None, on_error=None) -> Watcher:
+        """
+        Запускает фоновую горячую перезагрузку изменившихся файлов.
+
+        Параметры:
+            interval (float): Интервал опроса в секундах.
+            callback (Optional[Callable[[List[str]], None]]): Функция, получающая
+                имена изменившихся переменных после каждой перезагрузки.
+            on_error (Optional[Callable[[Exception], None]]): Функция, получающая
+                исключение, если перезагрузка не удалась.
+
+        Возврат:
+            Watcher: Запущенный наблюдатель; остановить его можно методом stop.
+        """
+        return Watcher(self, interval, callback, on_error).start()
+
+    def value_state(self, name: str) -> Tuple[Any, Any]:
+        """
+        Возвращает текущие значения переменной и константы с данным именем.
+
+        Значение переменной копируется, чтобы его можно было сравнить
+        со значением после пересчета.
+
+        Параметры:
+            name (str): Имя переменной или константы.
+
+        Возврат:
+            Tuple[Any, Any]: Значения переменной и константы; отсутствующее значение
+                обозначается специальным маркером.
+        """
+        variable = self.data.get(name)
+        return (_MISSING if variable is None else variable.get_value(),
+                self.constants.get(name, _MISSING))
@@ -0,0 +1,206 @@
+import os
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from flk.parser import Parser
+
+# Этапы работы парсера и методы, время которых к ним относится.
+PHASES = {
+    'read': ('read_source',),
+    'parse': ('load_file',),
+    'execute': ('execute', 'index', 'resolve'),
+    'imports': ('import_module',),
+    'expressions': ('evaluate_expression', 'parse_logical_expression'),
+    'collections': ('parse_list', 'parse_dict', 'parse_set', 'parse_tuple'),
+    'references': ('parse_reference',),
+}
+
+_COUNTERS = ('files_opened', 'bytes_read', 'lines_parsed', 'statements',
+             'expressions_evaluated', 'references_resolved', 'collections_parsed')
+
+
+class Profiler:
+    """
+    Счетчики и таймеры этапов работы парсера.
+
+    Профилировщик заменяет методы конкретного экземпляра парсера обертками,
+    замеряющими время, поэтому парсер без профилировщика не выполняет
+    никакого дополнительного кода. Время каждого этапа считается без учета
+    вложенных вызовов других этапов: например, время разбора файла не включает
+    время импортированных файлов и вычисления выражений, поэтому сумма времени
+    всех этапов равна общему времени.
+
+    Атрибуты:
+        phases (Dict[str, float]): Собственное время этапов в секундах.
+        calls (Dict[str, int]): Число вызовов по этапам.
+        counters (Dict[str, int]): Счетчики: открытые файлы, прочитанные байты
+            и строки, объявления, вычисленные выражения, ссылки и коллекции.
+        files (Dict[str, List[float]]): Полное и собственное время разбора по файлам.
+        imports (Dict[str, List[float]]): Полное время и число импортов по модулям.
+        values (Dict[int, List[Any]]): Узел значения и время его вычисления
+            по идентификатору узла; имена переменных определяются в stats().
+        parser (Optional[Parser]): Профилируемый парсер.
+    """
+    def __init__(self):
+        """
+        Инициализация профилировщика с нулевыми счетчиками.
+        """
+        self.frames: List[float] = []
+        self.parser: Optional['Parser'] = None
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.calls: Dict[str, int] = dict.fromkeys(PHASES, 0)
+        self.counters: Dict[str, int] = dict.fromkeys(_COUNTERS, 0)
+        self.files: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+        self.imports: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        self.values: Dict[int, List[Any]] = {}
+
+    def reset(self) -> None:
+        """
+        Обнуляет все счетчики и таймеры.
+        """
+        # Словари очищаются на месте: обертки методов ссылаются на них напрямую.
+        self.phases.update(dict.fromkeys(PHASES, 0.0))
+        self.calls.update(dict.fromkeys(PHASES, 0))
+        self.counters.update(dict.fromkeys(_COUNTERS, 0))
+        self.files.clear()
+        self.imports.clear()
+        self.values.clear()
+
+    def attach(self, parser: 'Parser') -> None:
+        """
+        Устанавливает обертки на методы парсера.
+
+        Параметры:
+            parser (Parser): Профилируемый парсер.
+        """
+        counters = self.counters
+
+        def on_read(args, result, elapsed, own):
+            counters['files_opened'] += 1
+            counters['bytes_read'] += parser.file_states[os.path.abspath(args[0])][1]
+            counters['lines_parsed'] += result.count('\n') + 1
+
+        def on_load(args, result, elapsed, own):
+            path = os.path.abspath(args[0])
+            counters['statements'] += len(parser.modules[path].statements) if path in parser.modules else 0
+            times = self.files[path]
+            times[0] += elapsed
+            times[1] += own
+
+        def on_import(args, result, elapsed, own):
+            times = self.imports[args[0]]
+            times[0] += elapsed
+            times[1] += 1
+
+        def on_expression(args, result, elapsed, own):
+            counters['expressions_evaluated'] += 1
+
+        def on_collection(args, result, elapsed, own):
+            counters['collections_parsed'] += 1
+
+        def on_reference(args, result, elapsed, own):
+            counters['references_resolved'] += 1
+
+        hooks = {
+            'read_source': on_read,
+            'load_file': on_load,
+            'import_module': on_import,
+            'parse_reference': on_reference,
+            'expressions': on_expression,
+            'collections': on_collection,
+        }
+        for phase, names in PHASES.items():
+            for name in names:
+                hook = hooks.get(name) or hooks.get(phase)
+                setattr(parser, name, self.timed(phase, getattr(parser, name), hook))
+
+        evaluate = parser.evaluate
+        values = self.values
+
+        def timed_evaluate(node):
+            start = time.perf_counter()
+            try:
+                return evaluate(node)
+            finally:
+                entry = values.get(id(node))
+                if entry is None:
+                    entry = values[id(node)] = [node, 0.0]
+                entry[1] += time.perf_counter() - start
+
+        parser.evaluate = timed_evaluate
+        self.parser = parser
+
+    def timed(self, phase: str, method: Callable, hook: Optional[Callable] = None) -> Callable:
+        """
+        Возвращает обертку метода, учитывающую время этапа.
+
+        Параметры:
+            phase (str): Название этапа.
+            method (Callable): Оборачиваемый метод.
+            hook (Optional[Callable]): Функция (аргументы, результат, полное время,
+                собственное время), вызываемая после успешного вызова.
+
+        Возврат:
+            Callable: Обертка.
+        """
+        frames = self.frames
+        phases = self.phases
+        calls = self.calls
+
+        def wrapper(*args, **kwargs):
+            frames.append(0.0)
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                own = elapsed - frames.pop()
+                phases[phase] += own
+                calls[phase] += 1
+                if frames:
+                    frames[-1] += elapsed
+            if hook is not None:
+                hook(args, result, elapsed, own)
+            return result
+
+        return wrapper
+
+    def stats(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Возвращает собранную статистику.
+
+        Параметры:
+            top (Optional[int]): Сколько самых медленных файлов, импортов
+                и переменных включить; по умолчанию все.
+
+        Возврат:
+            Dict[str, Any]: Словарь с ключами 'total', 'phases', 'counters',
+                'files', 'imports' и 'variables'. Файлы, импорты и переменные
+                упорядочены по убыванию времени.
+        """
+        def slowest(items, key):
+            return sorted(items, key=key, reverse=True)[:top]
+
+        names: Dict[int, str] = {}
+        if self.parser is not None:
+            for declarations in (self.parser.constant_declarations, self.parser.declarations):
+                for name, statement in declarations.items():
+                    names[id(statement.value)] = name
+        variables: Dict[str, float] = defaultdict(float)
+        for key, (node, seconds) in self.values.items():
+            if key in names:
+                variables[names[key]] += seconds
+
+        return {
+            'total': sum(self.phases.values()),
+            'phases': {phase: {'time': seconds, 'calls': self.calls[phase]}
+                       for phase, seconds in self.phases.items()},
+            'counters': dict(self.counters),
+            'files': {path: {'time': times[0], 'self_time': times[1]}
+                      for path, times in slowest(self.files.items(), lambda item: item[1][1])},
+            'imports': {module: {'time': times[0], 'calls': times[1]}
+                        for module, times in slowest(self.imports.items(), lambda item: item[1][0])},
+            'variables': dict(slowest(variables.items(), lambda item: item[1])),
+        }
@@ -0,0 +1,208 @@
+import re
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_WILDCARD = re.compile(r'[*?\[]')
+
+
+def split_path(path: str) -> List[str]:
+    """
+    Разбивает путь через точку на части.
+
+    Параметры:
+        path (str): Путь, например 'db.primary.host'.
+
+    Возврат:
+        List[str]: Части пути.
+
+    Исключения:
+        ValueError: Если путь пустой или содержит пустую часть.
+    """
+    parts = path.split('.')
+    if not all(parts):
+        raise ValueError(f"Неправильный путь: {path!r}")
+    return parts
+
+
+def step(value: Any, key: str) -> Any:
+    """
+    Возвращает значение на один уровень глубже: ключ словаря или номер
+    элемента списка и кортежа. Ключ словаря ищется как строка, затем как число.
+
+    Параметры:
+        value (Any): Словарь, список или кортеж.
+        key (str): Часть пути.
+
+    Возврат:
+        Any: Вложенное значение.
+
+    Исключения:
+        KeyError: Если вложенного значения нет.
+    """
+    if isinstance(value, Mapping):
+        if key in value:
+            return value[key]
+        if key.lstrip('-').isdigit() and int(key) in value:
+            return value[int(key)]
+    elif isinstance(value, (list, tuple)) and key.isdigit() and int(key) < len(value):
+        return value[int(key)]
+    raise KeyError(key)
+
+
+def _upper_bound(prefix: str) -> str:
+    """
+    Возвращает наименьшую строку, которая больше всех строк с этим префиксом.
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SortedKeys:
+    """
+    Отсортированные ключи одного уровня для поиска делением пополам.
+
+    Атрибуты:
+        keys (List[str]): Ключи в виде строк по возрастанию.
+        originals (Dict[str, Any]): Исходный ключ словаря по его строке.
+    """
+    __slots__ = ('keys', 'originals')
+
+    def __init__(self, keys: Iterable[Any]):
+        """
+        Инициализация индекса.
+
+        Параметры:
+            keys (Iterable[Any]): Ключи; нестроковые ключи индексируются по str(key).
+        """
+        self.originals = {str(key): key for key in keys}
+        self.keys = sorted(self.originals)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.originals
+
+    def add(self, key: str) -> None:
+        """
+        Добавляет строковый ключ, если его еще нет.
+        """
+        if key not in self.originals:
+            self.originals[key] = key
+            insort(self.keys, key)
+
+    def discard(self, key: str) -> None:
+        """
+        Удаляет ключ, если он есть.
+        """
+        if self.originals.pop(key, None) is not None:
+            del self.keys[bisect_left(self.keys, key)]
+
+    def range(self, start: Optional[str] = None, stop: Optional[str] = None) -> List[str]:
+        """
+        Возвращает ключи из полуинтервала [start, stop) за O(log n + k).
+
+        Параметры:
+            start (Optional[str]): Нижняя граница; None - без границы.
+            stop (Optional[str]): Верхняя граница, не включается; None - без границы.
+
+        Возврат:
+            List[str]: Ключи по возрастанию.
+        """
+        keys = self.keys
+        low = 0 if start is None else bisect_left(keys, start)
+        high = len(keys) if stop is None else bisect_left(keys, stop)
+        return keys[low:high]
+
+    def prefix(self, prefix: str) -> List[str]:
+        """
+        Возвращает ключи, начинающиеся с префикса, за O(log n + k).
+
+        Параметры:
+            prefix (str): Префикс.
+
+        Возврат:
+            List[str]: Ключи по возрастанию.
+        """
+        if not prefix:
+            return list(self.keys)
+        return self.range(prefix, _upper_bound(prefix))
+
+    def match(self, pattern: str) -> List[str]:
+        """
+        Возвращает ключи, подходящие под шаблон fnmatch ('*', '?', '[...]').
+
+        Проверяются только ключи с буквальным началом шаблона, поэтому
+        шаблон вида 'db_*' не просматривает весь уровень, а шаблон без
+        подстановочных знаков ищется как один ключ.
+
+        Параметры:
+            pattern (str): Шаблон.
+
+        Возврат:
+            List[str]: Ключи по возрастанию.
+        """
+        wildcard = _WILDCARD.search(pattern)
+        if wildcard is None:
+            return [pattern] if pattern in self.originals else []
+        candidates = self.prefix(pattern[:wildcard.start()])
+        return [key for key in candidates if fnmatchcase(key, pattern)]
+
+
+class QueryIndex:
+    """
+    Индекс имен переменных и ключей вложенных словарей.
+
+    Имена переменных поддерживаются парсером при каждом изменении набора
+    переменных. Ключи словаря индексируются при первом запросе к нему
+    и строятся заново, когда значение по этому пути заменяется.
+
+    Атрибуты:
+        names (SortedKeys): Имена переменных.
+        nested (Dict[str, Tuple[Mapping, SortedKeys]]): Словарь и индекс
+            его ключей по пути.
+    """
+    def __init__(self, names: Iterable[str]):
+        """
+        Инициализация индекса.
+
+        Параметры:
+            names (Iterable[str]): Имена переменных.
+        """
+        self.names = SortedKeys(names)
+        self.nested: Dict[str, Tuple[Mapping, SortedKeys]] = {}
+
+    def add(self, name: str) -> None:
+        """
+        Добавляет имя переменной.
+        """
+        self.names.add(name)
+
+    def discard(self, name: str) -> None:
+        """
+        Удаляет имя переменной и индексы ее вложенных словарей.
+        """
+        self.names.discard(name)
+        nested = self.nested
+        if nested:
+            inner = name + '.'
+            for path in [path for path in nested if path == name or path.startswith(inner)]:
+                del nested[path]
+
+    def keys(self, path: str, value: Any) -> Optional[SortedKeys]:
+        """
+        Возвращает индекс ключей словаря по пути.
+
+        Параметры:
+            path (str): Путь к словарю.
+            value (Any): Текущее значение по этому пути.
+
+        Возврат:
+            Optional[SortedKeys]: Индекс ключей; None, если значение не словарь.
+        """
+        if not isinstance(value, Mapping):
+            return None
+        cached = self.nested.get(path)
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        keys = SortedKeys(value)
+        self.nested[path] = (value, keys)
+        return keys
@@ -0,0 +1,358 @@
+import json
+import marshal
+import os
+import re
+from decimal import Decimal
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+from flk.fileio import atomic_open
+from flk.variable import Variable
+
+if TYPE_CHECKING:
+    from flk.parser import Parser
+
+BINARY_MAGIC = b'FLKB\x01'
+# Формат записи по расширению файла; остальные файлы записываются в формате FL.
+FORMATS = {'.fl': 'fl', '.json': 'json', '.flb': 'binary'}
+
+_NAME = re.compile(r'\w+\Z')
+_ARITHMETIC_OPERATORS = frozenset('+-*/%')
+
+
+def json_default(value: Any) -> Any:
+    """
+    Преобразует значения, которые json не умеет сериализовать.
+
+    Множества и числовые массивы записываются списками, представления
+    словарей - словарями, остальные объекты - строками.
+
+    Параметры:
+        value (Any): Значение.
+
+    Возврат:
+        Any: Значение, пригодное для json.
+    """
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'keys'):
+        return dict(value)
+    return str(value)
+
+
+def value_type(value: Any) -> str:
+    """
+    Определяет тип FL по значению Python.
+
+    Параметры:
+        value (Any): Значение.
+
+    Возврат:
+        str: Тип FL ('str', 'int', 'float', 'bool', 'list', 'dict', 'set', 'tuple').
+
+    Исключения:
+        ValueError: Если значение нельзя записать в файл FL.
+    """
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    if isinstance(value, tuple):
+        return 'tuple'
+    if isinstance(value, (set, frozenset)):
+        return 'set'
+    if isinstance(value, Mapping):
+        return 'dict'
+    if isinstance(value, list) or hasattr(value, 'tolist'):
+        return 'list'
+    raise ValueError(f"Значение типа {type(value).__name__} нельзя записать в файл FL")
+
+
+def format_value(var_type: str, value: Any, constant: bool = False) -> str:
+    """
+    Записывает значение в виде текста объявления файла FL.
+
+    Строка верхнего уровня в переменной записывается как есть, как и при
+    разборе; в кавычки она заключается, только если иначе была бы
+    прочитана как выражение или ссылка. Строки внутри коллекций и в
+    константах всегда заключаются в кавычки.
+
+    Параметры:
+        var_type (str): Тип FL.
+        value (Any): Значение.
+        constant (bool): Значение константы: в нем допустимо '//'.
+
+    Возврат:
+        str: Текст значения.
+
+    Исключения:
+        ValueError: Если значение нельзя записать так, чтобы оно прочиталось без изменений.
+    """
+    if var_type == 'str':
+        text = str(value)
+        _check_text(text, constant)
+        if constant:
+            return _quote(text)
+        if not text or text != text.strip():
+            raise ValueError(f"Строку с пробелами по краям нельзя записать в переменную: {text!r}")
+        if not _ARITHMETIC_OPERATORS.isdisjoint(text):
+            # Выражение из одной строки в кавычках дает саму строку.
+            return _quote(text)
+        if text[0] == '$':
+            raise ValueError(f"Строку, начинающуюся с '$', нельзя записать в переменную: {text!r}")
+        return text
+    if var_type == 'dict':
+        entries = [_format_entry(key, item, constant) for key, item in value.items()]
+        if not entries:
+            return '{}'
+        return '{\n    ' + ',\n    '.join(entries) + '\n}'
+    return _format_item(_convert(var_type, value), constant)
+
+
+def _convert(var_type: str, value: Any) -> Any:
+    """
+    Приводит значение к объявленному типу, как Variable.get_value.
+    """
+    if var_type in ('int', 'float', 'bool'):
+        return {'int': int, 'float': float, 'bool': bool}[var_type](value)
+    if var_type == 'list' and hasattr(value, 'tolist'):
+        return value.tolist()
+    if var_type in ('list', 'tuple', 'set'):
+        return {'list': list, 'tuple': tuple, 'set': set}[var_type](value)
+    raise ValueError(f"Неизвестный тип данных: {var_type}")
+
+
+def _format_item(value: Any, constant: bool) -> str:
+    """
+    Записывает скалярное значение или элемент коллекции.
+    """
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return _format_float(value)
+    if isinstance(value, str):
+        _check_text(value, constant)
+        return _quote(value)
+    if hasattr(value, 'tolist') and not isinstance(value, Mapping):
+        value = value.tolist()
+    if isinstance(value, list):
+        return '[' + ', '.join([_format_item(item, constant) for item in value]) + ']'
+    if isinstance(value, tuple):
+        return '(' + ', '.join([_format_item(item, constant) for item in value]) + ')'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ', '.join([_format_item(item, constant) for item in value]) + '}'
+    if isinstance(value, Mapping):
+        if not value:
+            raise ValueError("Пустой словарь внутри коллекции прочитался бы как множество")
+        return '{ ' + ', '.join([_format_entry(key, item, constant) for key, item in value.items()]) + ' }'
+    raise ValueError(f"Значение типа {type(value).__name__} нельзя записать в файл FL")
+
+
+def _format_entry(key: Any, value: Any, constant: bool) -> str:
+    """
+    Записывает элемент словаря в виде 'ключ(key): value(тип) = значение'.
+    """
+    if not isinstance(key, str) or not _NAME.match(key):
+        raise ValueError(f"Ключ словаря должен состоять из букв, цифр и '_': {key!r}")
+    var_type = value_type(value)
+    if var_type == 'str':
+        _check_text(value, constant)
+        return f"{key}(key): value(str) = {_quote(value)}"
+    return f"{key}(key): value({var_type}) = {_format_item(value, constant)}"
+
+
+def _format_float(value: float) -> str:
+    """
+    Записывает дробное число без экспоненты: 1e-05 читалось бы как выражение.
+    """
+    text = repr(value)
+    if text in ('nan', 'inf', '-inf'):
+        raise ValueError(f"Число {text} нельзя записать в файл FL")
+    if 'e' in text:
+        text = format(Decimal(text), 'f')
+        if '.' not in text:
+            text += '.0'
+    return text
+
+
+def _check_text(text: str, constant: bool) -> None:
+    """
+    Проверяет, что строку можно записать в строку файла FL.
+
+    Исключения:
+        ValueError: Если строка содержит перевод строки или фигурные скобки,
+            а в переменной - '//', начинающий комментарий.
+    """
+    if '\n' in text or '\r' in text or '{' in text or '}' in text or (not constant and '//' in text):
+        raise ValueError(f"Строку нельзя записать в файл FL: {text!r}")
+
+
+def _quote(text: str) -> str:
+    """
+    Заключает строку в кавычки, которых в ней нет.
+    """
+    if '"' not in text:
+        return f'"{text}"'
+    if "'" not in text:
+        return f"'{text}'"
+    raise ValueError(f"Строка содержит оба вида кавычек: {text!r}")
+
+
+def namespace(source: Union['Parser', Mapping[str, Any]]) -> Tuple[Dict[str, Tuple[str, Any]],
+                                                                    Iterator[Tuple[str, str, Any]]]:
+    """
+    Возвращает константы и переменные парсера или словаря значений.
+
+    Отложенные значения ленивого парсера вычисляются; для словаря
+    типы определяются по значениям, а констант в нем нет.
+
+    Параметры:
+        source (Union[Parser, Mapping[str, Any]]): Парсер или словарь значений.
+
+    Возврат:
+        Tuple[Dict[str, Tuple[str, Any]], Iterator[Tuple[str, str, Any]]]: Константы
+            (тип и значение по имени) и переменные (имя, тип, значение).
+    """
+    if isinstance(source, Mapping):
+        return {}, ((name, value_type(value), value) for name, value in source.items())
+    types = {name: statement.var_type for name, statement in source.constant_declarations.items()}
+    for name in list(source.pending_constants):
+        source.resolve(name)
+    constants = {name: (types.get(name) or value_type(value), value) for name, value in source.constants.items()}
+    names = list(source.data)
+    names += [name for name in source.pending if name not in source.data]
+
+    def variables() -> Iterator[Tuple[str, str, Any]]:
+        for name in names:
+            variable = source.get_var(name)
+            yield name, variable.get_type(), variable.value
+    return constants, variables()
+
+
+def write_fl(source: Union['Parser', Mapping[str, Any]], file: IO[str]) -> None:
+    """
+    Записывает константы и переменные в поток в формате FL,
+    по одному объявлению за раз.
+
+    Параметры:
+        source (Union[Parser, Mapping[str, Any]]): Парсер или словарь значений.
+        file (IO[str]): Текстовый поток.
+
+    Исключения:
+        ValueError: Если значение нельзя записать в файл FL.
+    """
+    constants, variables = namespace(source)
+    write = file.write
+    for name, (var_type, value) in constants.items():
+        write(f"const {name}({var_type}) = {format_value(var_type, value, True)}\n")
+    for name, var_type, value in variables:
+        if not _NAME.match(name):
+            raise ValueError(f"Неправильное имя переменной: {name!r}")
+        write(f"{name}({var_type}) = {format_value(var_type, value)}\n")
+
+
+def write_json(source: Union['Parser', Mapping[str, Any]], file: IO[str]) -> None:
+    """
+    Записывает значения переменных в поток в формате JSON - так же,
+    как python -m flk --json.
+
+    Параметры:
+        source (Union[Parser, Mapping[str, Any]]): Парсер или словарь значений.
+        file (IO[str]): Текстовый поток.
+    """
+    _, variables = namespace(source)
+    file.write(json.dumps({name: value for name, _, value in variables},
+                          ensure_ascii=False, default=json_default))
+
+
+def write_binary(source: Union['Parser', Mapping[str, Any]], file: IO[bytes]) -> None:
+    """
+    Записывает константы и переменные с их типами в компактном двоичном
+    формате (marshal), который читается функцией load_binary.
+
+    Параметры:
+        source (Union[Parser, Mapping[str, Any]]): Парсер или словарь значений.
+        file (IO[bytes]): Двоичный поток.
+
+    Исключения:
+        ValueError: Если значение нельзя сохранить в двоичном формате.
+    """
+    constants, variables = namespace(source)
+    # Порядок переменных сохраняется; тип каждой переменной - номер в списке типов.
+    types: List[str] = []
+    codes = bytearray()
+    names: List[str] = []
+    values: List[Any] = []
+    for name, var_type, value in variables:
+        if var_type not in types:
+            types.append(var_type)
+        codes.append(types.index(var_type))
+        names.append(name)
+        values.append(value.tolist() if hasattr(value, 'tolist') else value)
+    file.write(BINARY_MAGIC)
+    file.write(marshal.dumps((constants, types, bytes(codes), names, values), 4))
+
+
+def dump(source: Union['Parser', Mapping[str, Any]], path: str, format: Optional[str] = None) -> None:
+    """
+    Записывает константы и переменные в файл одним потоковым проходом.
+
+    Файл заменяется атомарно: при ошибке прежнее содержимое сохраняется.
+
+    Параметры:
+        source (Union[Parser, Mapping[str, Any]]): Парсер или словарь значений.
+        path (str): Путь к файлу.
+        format (Optional[str]): 'fl', 'json' или 'binary'; по умолчанию
+            определяется по расширению (.json, .flb, иначе FL).
+
+    Исключения:
+        ValueError: Если формат неизвестен или значение нельзя записать.
+    """
+    if format is None:
+        format = FORMATS.get(os.path.splitext(path)[1].lower(), 'fl')
+    if format == 'binary':
+        with atomic_open(path, binary=True) as file:
+            write_binary(source, file)
+    elif format in ('fl', 'json'):
+        with atomic_open(path) as file:
+            (write_fl if format == 'fl' else write_json)(source, file)
+    else:
+        raise ValueError(f"Неизвестный формат: {format}")
+
+
+def load_binary(path: str) -> 'Parser':
+    """
+    Загружает константы и переменные, записанные в двоичном формате.
+
+    Формат основан на marshal и предназначен для файлов, записанных
+    самим приложением: его не следует читать из недоверенных источников.
+
+    Параметры:
+        path (str): Путь к файлу.
+
+    Возврат:
+        Parser: Парсер с загруженными константами и переменными.
+
+    Исключения:
+        ValueError: Если файл не является двоичным файлом FLK.
+    """
+    from flk.parser import Parser
+
+    with open(path, 'rb') as file:
+        if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"Файл {path} не является двоичным файлом FLK")
+        try:
+            constants, types, codes, names, values = marshal.loads(file.read())
+        except (EOFError, TypeError) as error:
+            raise ValueError(f"Файл {path} поврежден: {error}") from None
+    parser = Parser()
+    parser.constants = {name: value for name, (_, value) in constants.items()}
+    parser.data = dict(zip(names, [Variable(types[code], value) for code, value in zip(codes, values)]))
+    return parser
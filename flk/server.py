@@ -0,0 +1,241 @@
+import json
+import os
+import socketserver
+import stat
+import threading
+from typing import IO, Any, Dict, Iterable, List, Optional
+
+from flk.parser import Parser
+from flk.serializer import format_value, json_default
+
+# Запросы, которые только читают снимки и выполняются без блокировки.
+_READS = frozenset(('get', 'keys', 'ping'))
+
+
+def collect_files(paths: Iterable[str]) -> List[str]:
+    """
+    Возвращает список файлов FL: файлы берутся как есть, каталоги
+    обходятся рекурсивно в поиске файлов с расширением .fl.
+
+    Параметры:
+        paths (Iterable[str]): Пути к файлам и каталогам.
+
+    Возврат:
+        List[str]: Пути к файлам в порядке аргументов; файлы каталога отсортированы.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for folder, folders, names in os.walk(path):
+                folders[:] = [name for name in folders if name != '__flcache__']
+                found += [os.path.join(folder, name) for name in names if name.endswith('.fl')]
+            files += sorted(found)
+        else:
+            files.append(path)
+    return files
+
+
+class Server:
+    """
+    Долгоживущий процесс, хранящий разобранные файлы в памяти и отвечающий
+    на запросы в формате JSON Lines: одна строка - один запрос или ответ.
+
+    Запрос - объект с полем "op":
+        {"op": "get", "key": "имя"} - значение переменной или константы;
+        {"op": "set", "key": "имя", "value": значение} - изменение переменной в файле;
+            значение JSON записывается по объявленному типу переменной, как
+            в Parser.save; вместо "value" можно передать "source" - текст
+            значения FL, как в edit_var_value (например, ссылку "$имя");
+        {"op": "keys"} - имена переменных;
+        {"op": "load", "file": "путь"} - разбор еще одного файла;
+        {"op": "reload"} - перечитывание изменившихся файлов;
+        {"op": "ping"}.
+    Если загружено несколько файлов, в запросах get, set, keys и reload
+    нужно указать поле "file". Ответ: {"ok": true, "value": ...}
+    или {"ok": false, "error": "текст ошибки"}.
+
+    Атрибуты:
+        parsers (Dict[str, Parser]): Парсеры по путям загруженных файлов.
+        lock (threading.Lock): Блокировка, под которой выполняются изменяющие запросы;
+            get, keys и ping читают опубликованные снимки парсеров без блокировки.
+        unix_server (Optional[socketserver.BaseServer]): Запущенный сервер
+            UNIX-сокета; его метод shutdown останавливает serve_unix.
+    """
+    def __init__(self, files: Iterable[str] = ()):
+        """
+        Инициализация сервера и разбор файлов.
+
+        Параметры:
+            files (Iterable[str]): Пути к файлам, загружаемым сразу.
+        """
+        self.parsers: Dict[str, Parser] = {}
+        self.lock = threading.Lock()
+        self.unix_server: Optional[socketserver.BaseServer] = None
+        for path in files:
+            self.load(path)
+
+    def load(self, path: str) -> List[str]:
+        """
+        Разбирает файл отдельным парсером.
+
+        Параметры:
+            path (str): Путь к файлу.
+
+        Возврат:
+            List[str]: Имена переменных файла.
+        """
+        parser = Parser(snapshots=True)
+        data = parser.parse_file(path)
+        self.parsers[path] = parser
+        return list(data)
+
+    def parser(self, request: Dict[str, Any]) -> Parser:
+        """
+        Возвращает парсер файла, указанного в запросе.
+
+        Исключения:
+            ValueError: Если файл не загружен или не указан при нескольких загруженных файлах.
+        """
+        path = request.get('file')
+        if path is None:
+            if len(self.parsers) != 1:
+                raise ValueError("Укажите файл: загружено файлов - " + str(len(self.parsers)))
+            return next(iter(self.parsers.values()))
+        if path not in self.parsers:
+            raise ValueError(f"Файл {path} не загружен")
+        return self.parsers[path]
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполняет один запрос.
+
+        Параметры:
+            request (Dict[str, Any]): Запрос.
+
+        Возврат:
+            Dict[str, Any]: Ответ.
+        """
+        try:
+            if request.get('op') in _READS:
+                return {'ok': True, 'value': self.execute(request)}
+            with self.lock:
+                return {'ok': True, 'value': self.execute(request)}
+        except Exception as error:
+            return {'ok': False, 'error': str(error)}
+
+    def execute(self, request: Dict[str, Any]) -> Any:
+        """
+        Выполняет запрос и возвращает значение для ответа.
+
+        Исключения:
+            ValueError: Если запрос неизвестен или неправилен.
+        """
+        op = request.get('op')
+        if op == 'get':
+            snapshot = self.parser(request).snapshot()
+            key = request['key']
+            if key in snapshot:
+                return snapshot[key]
+            if key in snapshot.constants:
+                return snapshot.constants[key]
+            raise ValueError(f"Переменная {key} не найдена в файле.")
+        if op == 'set':
+            parser = self.parser(request)
+            key = request['key']
+            if 'source' in request:
+                text = request['source']
+                if not isinstance(text, str):
+                    raise ValueError("Поле source должно быть строкой с текстом значения FL")
+            else:
+                var_type = parser.get_var(key).get_type()
+                # edit_var_value принимает строку только в кавычках, как значение константы.
+                text = format_value(var_type, request['value'], constant=var_type == 'str')
+            parser.edit_var_value(key, text)
+            return parser.get_view(key)
+        if op == 'keys':
+            return list(self.parser(request).snapshot())
+        if op == 'load':
+            return self.load(request['file'])
+        if op == 'reload':
+            return self.parser(request).reload()
+        if op == 'ping':
+            return 'pong'
+        raise ValueError(f"Неизвестный запрос: {op}")
+
+    def handle_line(self, line: str) -> str:
+        """
+        Выполняет запрос из строки JSON и возвращает строку ответа.
+
+        Параметры:
+            line (str): Строка запроса.
+
+        Возврат:
+            str: Строка ответа без перевода строки.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Запрос должен быть объектом JSON")
+        except ValueError as error:
+            response = {'ok': False, 'error': str(error)}
+        else:
+            response = self.handle(request)
+        return json.dumps(response, ensure_ascii=False, default=json_default)
+
+    def serve_stream(self, input: IO[str], output: IO[str]) -> None:
+        """
+        Отвечает на запросы из потока input до его окончания.
+
+        Параметры:
+            input (IO[str]): Поток запросов, например sys.stdin.
+            output (IO[str]): Поток ответов, например sys.stdout.
+        """
+        for line in input:
+            if line.strip():
+                output.write(self.handle_line(line) + '\n')
+                output.flush()
+
+    def serve_unix(self, path: str, ready: Optional[threading.Event] = None) -> None:
+        """
+        Отвечает на запросы, приходящие через UNIX-сокет; каждое соединение
+        обслуживается отдельным потоком, запросы выполняются по очереди.
+
+        Параметры:
+            path (str): Путь к сокету; оставшийся от прошлого запуска сокет заменяется.
+            ready (Optional[threading.Event]): Событие, устанавливаемое,
+                когда сокет готов принимать соединения.
+
+        Исключения:
+            ValueError: Если платформа не поддерживает UNIX-сокеты
+                или путь занят файлом, не являющимся сокетом.
+        """
+        base_class = getattr(socketserver, 'ThreadingUnixStreamServer', None)
+        if base_class is None:
+            raise ValueError("UNIX-сокеты не поддерживаются на этой платформе")
+        server = self
+
+        class UnixServer(base_class):
+            # Остановка сервера не ждет отключения клиентов.
+            daemon_threads = True
+            block_on_close = False
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write((server.handle_line(line.decode('utf-8')) + '\n').encode('utf-8'))
+
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError(f"Путь {path} занят и не является сокетом")
+            os.remove(path)
+        with UnixServer(path, Handler) as unix_server:
+            self.unix_server = unix_server
+            if ready is not None:
+                ready.set()
+            try:
+                unix_server.serve_forever()
+            finally:
+                self.unix_server = None
+                os.remove(path)
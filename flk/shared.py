@@ -0,0 +1,234 @@
+import marshal
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping as MappingType, Optional, Union
+
+from flk.fileio import atomic_open
+from flk.serializer import namespace
+
+if TYPE_CHECKING:
+    from flk.parser import Parser
+
+SHARED_MAGIC = b'FLKS\x01\x00\x00\x00'
+# Заголовок: номер версии, число переменных, смещения таблицы смещений и индекса.
+_HEADER = struct.Struct('<QQQQ')
+_HEADER_SIZE = len(SHARED_MAGIC) + _HEADER.size
+
+
+def _read_version(path: str) -> int:
+    """
+    Возвращает номер версии уже опубликованного файла или 0, если файла нет.
+    """
+    try:
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER_SIZE)
+    except OSError:
+        return 0
+    if len(header) != _HEADER_SIZE or not header.startswith(SHARED_MAGIC):
+        return 0
+    return _HEADER.unpack_from(header, len(SHARED_MAGIC))[0]
+
+
+def publish_shared(source: Union['Parser', MappingType[str, Any]], path: str) -> int:
+    """
+    Публикует константы и переменные в файл для чтения через отображение
+    в память (см. attach).
+
+    Каждое значение записывается отдельным блоком marshal, поэтому процессы,
+    подключенные через attach, декодируют только те значения, к которым
+    обращаются, а сами данные в страничном кэше хранятся один раз
+    на машину. Файл заменяется атомарно, а номер версии растет с каждой
+    публикацией. Для разделяемой памяти файл можно разместить в /dev/shm.
+
+    Параметры:
+        source (Union[Parser, Mapping[str, Any]]): Парсер или словарь значений.
+        path (str): Путь к файлу.
+
+    Возврат:
+        int: Номер опубликованной версии.
+
+    Исключения:
+        ValueError: Если значение нельзя сохранить в двоичном формате.
+    """
+    constants, variables = namespace(source)
+    version = _read_version(path) + 1
+    types: List[str] = []
+    codes = bytearray()
+    names: List[str] = []
+    offsets = array('Q')
+    with atomic_open(path, binary=True) as file:
+        file.write(bytes(_HEADER_SIZE))
+        position = _HEADER_SIZE
+        for name, var_type, value in variables:
+            if var_type not in types:
+                types.append(var_type)
+            codes.append(types.index(var_type))
+            names.append(name)
+            offsets.append(position)
+            block = marshal.dumps(value.tolist() if hasattr(value, 'tolist') else value, 4)
+            file.write(block)
+            position += len(block)
+        offsets.append(position)
+        # Таблица смещений выравнивается, чтобы читать ее напрямую из отображения.
+        padding = -position % offsets.itemsize
+        file.write(bytes(padding))
+        table_offset = position + padding
+        file.write(offsets.tobytes())
+        index_offset = table_offset + len(offsets) * offsets.itemsize
+        file.write(marshal.dumps((constants, types, bytes(codes), names), 4))
+        file.seek(0)
+        file.write(SHARED_MAGIC + _HEADER.pack(version, len(names), table_offset, index_offset))
+    return version
+
+
+def attach(path: str) -> 'SharedNamespace':
+    """
+    Подключается к файлу, опубликованному publish_shared или Parser.share.
+
+    Параметры:
+        path (str): Путь к файлу.
+
+    Возврат:
+        SharedNamespace: Значения переменных только для чтения.
+
+    Исключения:
+        ValueError: Если файл не является опубликованным файлом FLK.
+    """
+    return SharedNamespace(path)
+
+
+class SharedNamespace(Mapping):
+    """
+    Значения переменных из файла, отображенного в память только для чтения.
+
+    Значение декодируется при каждом обращении и возвращается новым
+    объектом, поэтому процесс не хранит копий значений, которые не держит
+    сам. Обновления публикуются заменой файла: refresh подключается
+    к новой версии, а уже прочитанные значения остаются прежними.
+    Формат основан на marshal: файл не следует читать из недоверенных источников.
+
+    Атрибуты:
+        path (str): Путь к файлу.
+        version (int): Номер подключенной версии.
+        constants (Dict[str, Any]): Значения констант.
+    """
+    def __init__(self, path: str):
+        """
+        Инициализация и подключение к файлу.
+
+        Параметры:
+            path (str): Путь к файлу.
+
+        Исключения:
+            ValueError: Если файл не является опубликованным файлом FLK.
+        """
+        self.path = path
+        self.version = 0
+        self.constants: Dict[str, Any] = {}
+        self.memory: Optional[mmap.mmap] = None
+        self.table: Optional[memoryview] = None
+        self.inode: Optional[int] = None
+        self.map()
+
+    def map(self) -> None:
+        """
+        Отображает текущий файл в память и читает индекс имен.
+
+        Исключения:
+            ValueError: Если файл не является опубликованным файлом FLK.
+        """
+        with open(self.path, 'rb') as file:
+            inode = os.fstat(file.fileno()).st_ino
+            memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if memory[:len(SHARED_MAGIC)] != SHARED_MAGIC:
+                raise ValueError(f"Файл {self.path} не является опубликованным файлом FLK")
+            version, count, table_offset, index_offset = _HEADER.unpack_from(memory, len(SHARED_MAGIC))
+            constants, types, codes, names = marshal.loads(memory[index_offset:])
+            table = memoryview(memory)[table_offset:index_offset].cast('Q')
+        except (EOFError, TypeError, struct.error) as error:
+            memory.close()
+            raise ValueError(f"Файл {self.path} поврежден: {error}") from None
+        except BaseException:
+            memory.close()
+            raise
+        self.close()
+        self.memory = memory
+        self.table = table
+        self.inode = inode
+        self.version = version
+        self.types = types
+        self.codes = codes
+        self.positions = {name: position for position, name in enumerate(names)}
+        self.constants = {name: value for name, (_, value) in constants.items()}
+
+    def refresh(self) -> bool:
+        """
+        Подключается к новой версии файла, если она была опубликована.
+
+        Проверка стоит одного вызова stat, поэтому ее можно выполнять
+        перед каждым запросом.
+
+        Возврат:
+            bool: True, если подключена новая версия.
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            return False
+        if inode == self.inode:
+            return False
+        self.map()
+        return True
+
+    def get_type(self, name: str) -> str:
+        """
+        Возвращает тип переменной.
+
+        Параметры:
+            name (str): Имя переменной.
+
+        Возврат:
+            str: Тип переменной.
+
+        Исключения:
+            KeyError: Если переменной нет.
+        """
+        return self.types[self.codes[self.positions[name]]]
+
+    def __getitem__(self, name: str) -> Any:
+        position = self.positions[name]
+        table = self.table
+        return marshal.loads(self.memory[table[position]:table[position + 1]])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.positions
+
+    def __repr__(self) -> str:
+        return f"SharedNamespace({self.path!r}, version={self.version}, variables={len(self.positions)})"
+
+    def close(self) -> None:
+        """
+        Освобождает отображение файла.
+        """
+        if self.table is not None:
+            self.table.release()
+            self.table = None
+        if self.memory is not None:
+            self.memory.close()
+            self.memory = None
+
+    def __enter__(self) -> 'SharedNamespace':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,92 @@
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+def freeze(value: Any) -> Any:
+    """
+    Возвращает значение в виде только для чтения по его типу: список -
+    кортеж, множество - frozenset, словарь - MappingProxyType.
+
+    Параметры:
+        value (Any): Значение.
+
+    Возврат:
+        Any: Значение или его представление только для чтения.
+    """
+    value_type = type(value)
+    if value_type is list:
+        return tuple(value)
+    if value_type is set:
+        return frozenset(value)
+    if value_type is dict:
+        return MappingProxyType(value)
+    return value
+
+
+class Snapshot(Mapping):
+    """
+    Неизменяемый снимок значений переменных и констант парсера.
+
+    Снимок - обычное отображение имен переменных на значения в виде
+    только для чтения (см. Variable.get_view). Изменения парсера
+    публикуются новым снимком, а уже полученные снимки не меняются,
+    поэтому читатели могут держать снимок сколько угодно без блокировок
+    и всегда видят согласованное пространство имен.
+
+    Атрибуты:
+        version (int): Номер снимка; растет с каждой публикацией.
+        values (Mapping[str, Any]): Значения переменных.
+        constants (Mapping[str, Any]): Значения констант.
+    """
+    __slots__ = ('version', 'values', 'constants')
+
+    def __init__(self, version: int, values: Dict[str, Any], constants: Dict[str, Any]):
+        """
+        Инициализация снимка.
+
+        Параметры:
+            version (int): Номер снимка.
+            values (Dict[str, Any]): Значения переменных; словарь передается во владение снимку.
+            constants (Dict[str, Any]): Значения констант; словарь передается во владение снимку.
+        """
+        self.version = version
+        self.values = MappingProxyType(values)
+        self.constants = MappingProxyType(constants)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.values
+
+    def __repr__(self) -> str:
+        return f"Snapshot(version={self.version}, variables={len(self.values)})"
+
+    def evolve(self, values: Dict[str, Any], removed: Iterable[str] = (),
+               constants: Optional[Dict[str, Any]] = None) -> 'Snapshot':
+        """
+        Строит следующий снимок копированием этого с заменой измененных значений.
+
+        Параметры:
+            values (Dict[str, Any]): Новые значения измененных переменных.
+            removed (Iterable[str]): Имена удаленных переменных.
+            constants (Optional[Dict[str, Any]]): Новые значения всех констант;
+                None - константы не изменились.
+
+        Возврат:
+            Snapshot: Новый снимок со следующим номером.
+        """
+        new_values = self.values.copy()
+        new_values.update(values)
+        for name in removed:
+            new_values.pop(name, None)
+        snapshot = Snapshot(self.version + 1, new_values, {})
+        snapshot.constants = self.constants if constants is None else MappingProxyType(constants)
+        return snapshot
@@ -0,0 +1,216 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from flk.syntax import Assignment, Module
+
+
+class SpanIndex:
+    """
+    Диапазоны байт объявлений переменных одного файла.
+
+    Объявления хранятся в порядке следования в файле. Изменение длины
+    объявления сдвигает все следующие объявления; сдвиги накапливаются
+    в дереве Фенвика по порядковым номерам объявлений, поэтому и запись
+    сдвига, и чтение диапазона занимают O(log n) независимо от размера файла.
+
+    Индекс также поддерживает список объявлений синтаксического дерева файла.
+    Удаленные объявления отмечаются во втором дереве Фенвика, поэтому номер
+    узла в списке тоже вычисляется за O(log n); само удаление узла из
+    module.statements - сдвиг списка (memmove).
+
+    Атрибуты:
+        module (Module): Синтаксическое дерево файла.
+        positions (Dict[str, int]): Порядковый номер действующего объявления по имени.
+        starts (List[int]): Начала объявлений без учета накопленных сдвигов.
+        lengths (List[int]): Длины объявлений в байтах.
+        statements (List[Optional[Assignment]]): Узлы объявлений.
+        indices (List[int]): Номера объявлений в списке module.statements
+            без учета удаленных перед ними объявлений (см. statement_index).
+    """
+    def __init__(self, module: Module, content: Optional[bytes] = None):
+        """
+        Строит индекс по синтаксическому дереву файла.
+
+        Если имя объявлено в файле несколько раз, действующим считается
+        последнее объявление. Лексер отмечает объявления смещениями
+        в символах; если текст файла содержит не только ASCII, они
+        переводятся в байты здесь, один раз для всего файла.
+
+        Параметры:
+            module (Module): Синтаксическое дерево файла.
+            content (Optional[bytes]): Текст, из которого построено дерево;
+                None - смещения уже совпадают с байтовыми.
+        """
+        self.module = module
+        self.positions: Dict[str, int] = {}
+        self.starts: List[int] = []
+        self.statements: List[Optional[Assignment]] = []
+        self.indices: List[int] = []
+        ends: List[int] = []
+        for index, statement in enumerate(module.statements):
+            if type(statement) is Assignment:
+                self.positions[statement.name] = len(self.starts)
+                self.starts.append(statement.start)
+                ends.append(statement.end)
+                self.statements.append(statement)
+                self.indices.append(index)
+        if content is not None and not content.isascii():
+            offsets = _byte_offsets(content.decode('utf-8'), self.starts + ends)
+            self.starts = [offsets[start] for start in self.starts]
+            ends = [offsets[end] for end in ends]
+        self.lengths: List[int] = [end - start for start, end in zip(self.starts, ends)]
+        self.tree = [0] * (len(self.starts) + 64)
+        self.removed = [0] * len(self.tree)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.positions)
+
+    def __getitem__(self, name: str) -> Tuple[int, int]:
+        """
+        Возвращает текущий диапазон объявления.
+
+        Параметры:
+            name (str): Имя переменной.
+
+        Возврат:
+            Tuple[int, int]: Начало и конец объявления в байтах.
+        """
+        position = self.positions[name]
+        start = self.starts[position] + self.offset(position)
+        return start, start + self.lengths[position]
+
+    def offset(self, position: int) -> int:
+        """
+        Возвращает суммарный сдвиг объявления с данным порядковым номером.
+
+        Параметры:
+            position (int): Порядковый номер объявления.
+
+        Возврат:
+            int: Сдвиг в байтах.
+        """
+        return _prefix_sum(self.tree, position)
+
+    def statement_index(self, position: int) -> int:
+        """
+        Возвращает номер объявления в списке module.statements.
+
+        Параметры:
+            position (int): Порядковый номер объявления.
+
+        Возврат:
+            int: Номер узла в списке.
+        """
+        return self.indices[position] - _prefix_sum(self.removed, position)
+
+    def shift_after(self, position: int, delta: int) -> None:
+        """
+        Сдвигает все объявления после данного.
+
+        Параметры:
+            position (int): Порядковый номер объявления.
+            delta (int): Сдвиг в байтах.
+        """
+        _add_after(self.tree, position, delta)
+
+    def statement(self, name: str) -> Optional[Assignment]:
+        """
+        Возвращает узел действующего объявления с данным именем.
+
+        Параметры:
+            name (str): Имя переменной.
+
+        Возврат:
+            Optional[Assignment]: Узел объявления или None.
+        """
+        position = self.positions.get(name)
+        return None if position is None else self.statements[position]
+
+    def replace(self, name: str, length: int, statement: Assignment, delta: int) -> None:
+        """
+        Заменяет объявление новым, начинающимся на том же месте.
+
+        Параметры:
+            name (str): Имя переменной.
+            length (int): Длина нового объявления в байтах.
+            statement (Assignment): Узел нового объявления.
+            delta (int): На сколько байт сдвинулось все, что идет после объявления.
+        """
+        position = self.positions[name]
+        self.lengths[position] = length
+        self.statements[position] = statement
+        self.module.statements[self.statement_index(position)] = statement
+        self.shift_after(position, delta)
+
+    def remove(self, name: str, delta: int) -> None:
+        """
+        Удаляет объявление из индекса.
+
+        Параметры:
+            name (str): Имя переменной.
+            delta (int): На сколько байт сдвинулось все, что идет после объявления.
+        """
+        position = self.positions.pop(name)
+        del self.module.statements[self.statement_index(position)]
+        self.statements[position] = None
+        _add_after(self.removed, position, 1)
+        self.shift_after(position, delta)
+
+    def append(self, name: str, start: int, end: int, statement: Assignment) -> None:
+        """
+        Добавляет объявление в конец файла.
+
+        Параметры:
+            name (str): Имя переменной.
+            start (int): Начало объявления в байтах.
+            end (int): Конец объявления в байтах.
+            statement (Assignment): Узел объявления.
+        """
+        position = len(self.starts)
+        if position + 1 >= len(self.tree):
+            # Деревья заполнены: сдвиги и удаления переносятся в начала и номера объявлений.
+            self.starts = [begin + self.offset(index) for index, begin in enumerate(self.starts)]
+            self.indices = [self.statement_index(index) for index in range(position)]
+            self.tree = [0] * (2 * len(self.tree))
+            self.removed = [0] * len(self.tree)
+        self.positions[name] = position
+        self.starts.append(start - self.offset(position))
+        self.lengths.append(end - start)
+        self.statements.append(statement)
+        self.indices.append(len(self.module.statements) + _prefix_sum(self.removed, position))
+        self.module.statements.append(statement)
+
+
+def _byte_offsets(text: str, offsets: List[int]) -> Dict[int, int]:
+    """
+    Переводит смещения в символах текста в смещения в байтах UTF-8.
+    """
+    result: Dict[int, int] = {}
+    position = size = 0
+    for offset in sorted(set(offsets)):
+        size += len(text[position:offset].encode('utf-8'))
+        result[offset] = size
+        position = offset
+    return result
+
+
+def _prefix_sum(tree: List[int], position: int) -> int:
+    """
+    Возвращает сумму значений дерева Фенвика для номеров меньше position.
+    """
+    total = 0
+    while position > 0:
+        total += tree[position]
+        position &= position - 1
+    return total
+
+
+def _add_after(tree: List[int], position: int, delta: int) -> None:
+    """
+    Добавляет delta к сумме дерева Фенвика для всех номеров больше position.
+    """
+    position += 1
+    while position < len(tree):
+        tree[position] += delta
+        position += position & -position
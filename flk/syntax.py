@@ -0,0 +1,302 @@
+import re
+from typing import FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Union
+from flk.lexer import Token, IMPORT, CONST, ASSIGN, tokenize, tokenize_lines
+from flk.literal import enclosed
+
+_ARITHMETIC_OPERATOR = re.compile(r'[-+*/%]')
+# Значение без скобки, знака или '$' в начале и без операторов: строка или скалярный литерал.
+PLAIN_VALUE = re.compile(r'[^-+*/%$\[({][^-+*/%]*\Z')
+_LOGICAL_OPERATORS = "<>="
+_COLLECTION_TYPES = frozenset(('list', 'tuple', 'set'))
+_NUMBER_TYPES = frozenset(('int', 'float'))
+_SIGNED_NUMBER = re.compile(r'-\d+(?:\.\d+)?\Z')
+_REFERENCE = re.compile(r'\$(\w+)')
+_NAME = re.compile(r'(?<![\w$.])([A-Za-z_]\w*)')
+# Логическое выражение: сравнение двух ссылок.
+LOGICAL_EXPRESSION = re.compile(r'\$([\w]+)\s*([><=])\s*\$([\w]+)')
+
+
+class Literal(NamedTuple):
+    """
+    Литерал, значение которого разбирается по объявленному типу.
+
+    Атрибуты:
+        var_type (str): Объявленный тип.
+        text (str): Текст литерала.
+    """
+    var_type: str
+    text: str
+
+
+class RawString(NamedTuple):
+    """
+    Строковое значение верхнего уровня, сохраняемое как есть.
+
+    Атрибуты:
+        text (str): Текст значения.
+    """
+    text: str
+
+
+class Expression(NamedTuple):
+    """
+    Арифметическое выражение.
+
+    Атрибуты:
+        text (str): Текст выражения.
+    """
+    text: str
+
+
+class LogicalExpression(NamedTuple):
+    """
+    Логическое выражение сравнения двух ссылок.
+
+    Атрибуты:
+        text (str): Текст выражения.
+    """
+    text: str
+
+
+class Reference(NamedTuple):
+    """
+    Ссылка на переменную или константу.
+
+    Атрибуты:
+        ref (str): Имя переменной или константы без символа '$'.
+    """
+    ref: str
+
+
+ValueNode = Union[Literal, RawString, Expression, LogicalExpression, Reference]
+
+
+class Import(NamedTuple):
+    """
+    Директива импорта.
+
+    Атрибуты:
+        module (str): Путь модуля через точку.
+        line (int): Номер строки.
+    """
+    module: str
+    line: int
+
+
+class Constant(NamedTuple):
+    """
+    Объявление константы.
+
+    Атрибуты:
+        name (str): Имя константы.
+        var_type (str): Тип константы.
+        value (ValueNode): Значение.
+        line (int): Номер строки.
+        start (int): Смещение начала объявления в символах (см. Token).
+        end (int): Смещение конца объявления в символах.
+    """
+    name: str
+    var_type: str
+    value: ValueNode
+    line: int
+    start: int
+    end: int
+
+
+class Assignment(NamedTuple):
+    """
+    Объявление переменной.
+
+    Атрибуты:
+        name (str): Имя переменной.
+        var_type (str): Тип переменной.
+        value (ValueNode): Значение.
+        line (int): Номер строки.
+        start (int): Смещение начала объявления в символах (см. Token).
+        end (int): Смещение конца объявления в символах.
+    """
+    name: str
+    var_type: str
+    value: ValueNode
+    line: int
+    start: int
+    end: int
+
+
+Statement = Union[Import, Constant, Assignment]
+
+
+class Module(NamedTuple):
+    """
+    Разобранный файл FL.
+
+    Атрибуты:
+        path (Optional[str]): Путь к файлу.
+        statements (List[Statement]): Объявления и импорты в порядке следования.
+    """
+    path: Optional[str]
+    statements: List[Statement]
+
+
+def value_node(var_type: str, text: str) -> ValueNode:
+    """
+    Определяет вид значения переменной по его тексту.
+
+    Параметры:
+        var_type (str): Объявленный тип.
+        text (str): Текст значения.
+
+    Возврат:
+        ValueNode: Узел значения.
+    """
+    if PLAIN_VALUE.match(text) is not None:
+        return RawString(text) if var_type == 'str' else Literal(var_type, text)
+    first = text[0]
+    if first == '{':
+        return Literal(var_type, text)
+    if (first == '[' or first == '(') and var_type in _COLLECTION_TYPES and enclosed(text):
+        # Знаки внутри литерала коллекции ([-1, 2]) не делают его выражением.
+        return Literal(var_type, text)
+    if first == '-' and var_type in _NUMBER_TYPES and _SIGNED_NUMBER.match(text):
+        # Отрицательное число - литерал, а не выражение с округлением результата.
+        return Literal(var_type, text)
+    if _ARITHMETIC_OPERATOR.search(text) is not None:
+        return Expression(text)
+    if first == '$':
+        for op in _LOGICAL_OPERATORS:
+            if op in text:
+                return LogicalExpression(text)
+        return Reference(text[1:])
+    if var_type == 'str':
+        return RawString(text)
+    return Literal(var_type, text)
+
+
+def references(node: ValueNode) -> FrozenSet[str]:
+    """
+    Возвращает имена переменных и констант, от которых зависит значение.
+
+    Для выражений учитываются также имена без '$', которые могут
+    обозначать константы.
+
+    Параметры:
+        node (ValueNode): Узел значения.
+
+    Возврат:
+        FrozenSet[str]: Имена зависимостей.
+    """
+    node_type = type(node)
+    if node_type is Reference:
+        return frozenset((node.ref.split('.', 1)[0],))
+    if node_type is RawString:
+        return frozenset()
+    names = set(_REFERENCE.findall(node.text))
+    if node_type is Expression:
+        names.update(_NAME.findall(node.text))
+    return frozenset(names)
+
+
+def build_module(tokens: Iterable[Token], path: Optional[str] = None) -> Module:
+    """
+    Строит синтаксическое дерево файла из последовательности токенов.
+
+    Параметры:
+        tokens (Iterable[Token]): Токены, полученные от лексера.
+        path (Optional[str]): Путь к файлу.
+
+    Возврат:
+        Module: Синтаксическое дерево файла.
+    """
+    return Module(path, list(iter_statements(tokens)))
+
+
+def parse_module(text: str, path: Optional[str] = None) -> Module:
+    """
+    Строит синтаксическое дерево файла прямо по его тексту.
+
+    Результат тот же, что у build_module(tokenize(text)), но узлы
+    объявлений создаются лексером без промежуточных токенов.
+
+    Параметры:
+        text (str): Содержимое файла.
+        path (Optional[str]): Путь к файлу.
+
+    Возврат:
+        Module: Синтаксическое дерево файла.
+    """
+    return Module(path, tokenize(text, statement))
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[Statement]:
+    """
+    Выдает узлы объявлений по мере чтения строк файла (см. tokenize_lines).
+
+    Параметры:
+        lines (Iterable[str]): Строки файла вместе с символами перевода строки.
+
+    Возврат:
+        Iterator[Statement]: Узлы объявлений и импортов.
+    """
+    return tokenize_lines(lines, statement)
+
+
+def iter_statements(tokens: Iterable[Token]) -> Iterator[Statement]:
+    """
+    Последовательно превращает токены в узлы объявлений.
+
+    Параметры:
+        tokens (Iterable[Token]): Токены, полученные от лексера.
+
+    Возврат:
+        Iterator[Statement]: Узлы объявлений и импортов.
+
+    Исключения:
+        ValueError: Если встречен неизвестный токен.
+    """
+    for token in tokens:
+        yield statement(*token)
+
+
+def statement(kind: str, name: Optional[str], var_type: Optional[str], value: str,
+              line: int, start: int, end: int) -> Statement:
+    """
+    Строит узел объявления по полям токена.
+
+    Параметры:
+        kind (str): Вид токена.
+        name (Optional[str]): Имя переменной или константы.
+        var_type (Optional[str]): Объявленный тип.
+        value (str): Текст значения или путь импортируемого модуля.
+        line (int): Номер строки.
+        start (int): Смещение начала объявления.
+        end (int): Смещение конца объявления.
+
+    Возврат:
+        Statement: Узел объявления или импорта.
+
+    Исключения:
+        ValueError: Если вид токена неизвестен.
+    """
+    if kind == ASSIGN:
+        return Assignment(name, var_type, value_node(var_type, value), line, start, end)
+    if kind == CONST:
+        return Constant(name, var_type, constant_node(var_type, value), line, start, end)
+    if kind == IMPORT:
+        return Import(value, line)
+    raise ValueError(f"Неизвестный токен {kind} на строке {line}")
+
+
+def constant_node(var_type: str, text: str) -> ValueNode:
+    """
+    Определяет вид значения константы по его тексту.
+
+    Параметры:
+        var_type (str): Объявленный тип.
+        text (str): Текст значения.
+
+    Возврат:
+        ValueNode: Узел значения.
+    """
+    if text[0] == '$':
+        return Reference(text[1:])
+    return Literal(var_type, text)
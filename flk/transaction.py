@@ -0,0 +1,516 @@
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from flk.fileio import atomic_write_many
+from flk.spans import SpanIndex
+from flk.syntax import Import, parse_module, references
+from flk.variable import Variable
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from flk.parser import Parser
+
+# Новые диапазоны объявлений (None - объявление удалено), объявления,
+# записанные в файл, и изменения длины файла после каждого замененного объявления.
+PatchResult = Tuple[Dict[str, Optional[Tuple[int, int]]], Dict[str, str], Dict[str, int]]
+
+
+def patch_content(spans: SpanIndex, patches: Dict[str, Optional[str]], appends: Dict[str, str],
+                  buffer: bytes, base: int) -> Tuple[bytes, PatchResult]:
+    """
+    Заменяет диапазоны объявлений в содержимом файла и добавляет новые
+    объявления в конец.
+
+    Удаленное объявление убирается вместе со своей строкой, если кроме
+    него на ней ничего нет.
+
+    Параметры:
+        spans (SpanIndex): Диапазоны объявлений файла.
+        patches (Dict[str, Optional[str]]): Новые объявления по именам;
+            None означает удаление объявления.
+        appends (Dict[str, str]): Объявления, добавляемые в конец файла.
+        buffer (bytes): Содержимое файла начиная со смещения base.
+        base (int): Смещение начала buffer в файле; все заменяемые
+            диапазоны должны начинаться не раньше него.
+
+    Возврат:
+        Tuple[bytes, PatchResult]: Новое содержимое начиная с base
+            и сведения для обновления индекса диапазонов.
+    """
+    edits = sorted((*spans[name], name, declaration)
+                   for name, declaration in patches.items())
+    parts: List[bytes] = []
+    new_spans: Dict[str, Optional[Tuple[int, int]]] = {}
+    written: Dict[str, str] = {}
+    deltas: Dict[str, int] = {}
+    position = base
+    delta = 0
+    for start, end, name, declaration in edits:
+        if declaration is None:
+            line_start = buffer.rfind(b'\n', 0, start - base) + 1
+            if base + line_start >= position and not buffer[line_start:start - base].strip():
+                start = base + line_start
+        parts.append(buffer[position - base:start - base])
+        if declaration is None:
+            line_end = buffer.find(b'\n', end - base)
+            line_end = len(buffer) if line_end == -1 else line_end + 1
+            rest = buffer[end - base:line_end].strip()
+            if not rest or rest.startswith(b'//'):
+                end = base + line_end
+            new_spans[name] = None
+            deltas[name] = start - end
+        else:
+            encoded = declaration.encode('utf-8')
+            parts.append(encoded)
+            new_spans[name] = (start + delta, start + delta + len(encoded))
+            written[name] = declaration
+            deltas[name] = len(encoded) - (end - start)
+        delta += deltas[name]
+        position = end
+    parts.append(buffer[position - base:])
+
+    size = base + sum(map(len, parts))
+    for name, declaration in appends.items():
+        encoded = declaration.encode('utf-8')
+        parts.append(b'\n' + encoded + b'\n')
+        new_spans[name] = (size + 1, size + 1 + len(encoded))
+        written[name] = declaration
+        size += len(encoded) + 2
+    return b''.join(parts), (new_spans, written, deltas)
+
+
+class Transaction:
+    """
+    Пакет изменений файлов FL, записываемых одним действием.
+
+    Изменения переменных сразу применяются в памяти парсера, а изменения
+    файлов накапливаются. Если файл разобран парсером и с тех пор не менялся,
+    известны файл и диапазон байт каждого объявления: изменение заменяет
+    только этот диапазон в файле-владельце. Иначе файл правится построчно.
+    При фиксации каждый затронутый файл записывается ровно один раз.
+    При откате изменения в памяти отменяются, а файлы остаются нетронутыми.
+    Если у парсера включен журнал изменений, файлы не перезаписываются:
+    изменения каждого файла дописываются в его журнал одной записью.
+
+    Атрибуты:
+        parser (Parser): Парсер, к которому относятся изменения.
+        patches (Dict[str, Dict[str, Optional[str]]]): Новые объявления по файлам
+            и именам; None означает удаление объявления.
+        appends (Dict[str, Dict[str, str]]): Объявления, добавляемые в конец файлов.
+        files (Dict[str, List[str]]): Строки файлов, изменяемых построчно.
+        dirty (Set[str]): Абсолютные пути файлов, изменяемых построчно.
+        journal_entries (Dict[str, Dict[str, Optional[str]]]): Изменения объявлений
+            по файлам для журнала изменений; None означает удаление объявления.
+    """
+    def __init__(self, parser: 'Parser'):
+        """
+        Инициализация транзакции.
+
+        Параметры:
+            parser (Parser): Парсер, к которому относятся изменения.
+        """
+        self.parser = parser
+        self.patches: Dict[str, Dict[str, Optional[str]]] = {}
+        self.appends: Dict[str, Dict[str, str]] = {}
+        self.files: Dict[str, List[str]] = {}
+        self.dirty: Set[str] = set()
+        self.saved: Dict[str, Tuple[Optional[Variable], Any, Any, Any, Optional[str]]] = {}
+        self.imports: Dict[str, List[str]] = {}
+        self.modes: Dict[str, bool] = {}
+        self.journal_entries: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def remember(self, name: str) -> None:
+        """
+        Запоминает состояние переменной до первого изменения в транзакции:
+        значение, отложенное объявление, объявление и файл, в котором оно находится.
+
+        Параметры:
+            name (str): Имя переменной.
+        """
+        if name not in self.saved:
+            parser = self.parser
+            variable = parser.data.get(name)
+            value = None if variable is None else variable.value
+            self.saved[name] = (variable, value, parser.pending.get(name),
+                                parser.declarations.get(name), parser.owners.get(name))
+
+    def can_patch(self, path: str) -> bool:
+        """
+        Проверяет, можно ли править файл заменой диапазонов байт.
+
+        Параметры:
+            path (str): Абсолютный путь к файлу.
+
+        Возврат:
+            bool: True, если файл разобран парсером и не изменялся с момента
+                разбора или последней записи.
+        """
+        mode = self.modes.get(path)
+        if mode is None:
+            mode = False
+            if path not in self.files and self.parser.file_spans(path) is not None:
+                try:
+                    stat = os.stat(path)
+                    mode = self.parser.file_states.get(path) == (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    pass
+            self.modes[path] = mode
+        return mode
+
+    def lines(self, path: str, missing_ok: bool = False) -> List[str]:
+        """
+        Возвращает строки файла, читая его не более одного раза.
+
+        Параметры:
+            path (str): Путь к файлу.
+            missing_ok (bool): Считать отсутствующий файл пустым.
+
+        Возврат:
+            List[str]: Строки файла вместе с символами перевода строки.
+        """
+        path = os.path.abspath(path)
+        lines = self.files.get(path)
+        if lines is None:
+            try:
+                with open(path, 'r', encoding='utf-8', newline='') as file:
+                    lines = file.readlines()
+            except FileNotFoundError:
+                if not missing_ok:
+                    raise
+                lines = []
+            self.files[path] = lines
+        return lines
+
+    def import_tree(self, file_path: str) -> List[str]:
+        """
+        Возвращает файл и все импортированные им файлы, каждый по одному разу.
+
+        Импорты разобранных файлов берутся из синтаксического дерева,
+        остальные файлы читаются.
+
+        Параметры:
+            file_path (str): Путь к корневому файлу.
+
+        Возврат:
+            List[str]: Абсолютные пути файлов в порядке обхода.
+        """
+        tree = self.imports.get(file_path)
+        if tree is None:
+            tree = []
+            visited: Set[str] = set()
+            stack = [os.path.abspath(file_path)]
+            while stack:
+                path = stack.pop()
+                if path in visited:
+                    continue
+                visited.add(path)
+                tree.append(path)
+                if self.can_patch(path):
+                    modules = [statement.module for statement in self.parser.modules[path].statements
+                               if type(statement) is Import]
+                else:
+                    modules = [line.strip().split(' ')[1].strip('()')
+                               for line in self.lines(path) if line.startswith('(import)')]
+                stack.extend(os.path.abspath(self.parser.resolve_import(module, path))
+                             for module in reversed(modules))
+            self.imports[file_path] = tree
+        return tree
+
+    def update_var(self, file_path: str, var_name: str, new_var_value: Any) -> None:
+        """
+        Изменяет объявление переменной.
+
+        Если известен файл, в котором объявлена переменная, заменяется только
+        диапазон ее объявления в этом файле. Иначе объявление ищется в файле
+        и во всех импортированных им файлах.
+
+        Параметры:
+            file_path (str): Путь к файлу.
+            var_name (str): Имя переменной.
+            new_var_value (Any): Новое значение в виде текста файла FL.
+        """
+        variable = self.parser.data.get(var_name)
+        statement = self.parser.declarations.get(var_name)
+        var_type = variable.get_type() if variable is not None else (
+            statement.var_type if statement is not None else None)
+        declaration = f"{var_name}({var_type}) = {new_var_value}"
+        if self.parser.journal is not None:
+            owner = self.parser.owners.get(var_name) or os.path.abspath(file_path)
+            self.journal_entries.setdefault(owner, {})[var_name] = declaration
+            return
+
+        for appended in self.appends.values():
+            if var_name in appended:
+                appended[var_name] = declaration
+                return
+        owner = self.parser.owners.get(var_name)
+        if owner is not None and self.can_patch(owner) and var_name in self.parser.file_spans(owner):
+            self.patches.setdefault(owner, {})[var_name] = declaration
+            return
+
+        pattern = re.compile(rf'({re.escape(var_name)})\((\w+)\) = (.+)')
+        for path in self.import_tree(file_path):
+            if self.can_patch(path):
+                if var_name in self.parser.file_spans(path):
+                    self.patches.setdefault(path, {})[var_name] = declaration
+                continue
+            lines = self.lines(path)
+            for i, line in enumerate(lines):
+                match = pattern.match(line.strip())
+                if match:
+                    lines[i] = f"{var_name}({match.group(2)}) = {new_var_value}\n"
+                    self.dirty.add(path)
+
+    def append_var(self, file_path: str, name: str, var_type: str, value: Any) -> None:
+        """
+        Добавляет объявление переменной в конец файла.
+
+        Параметры:
+            file_path (str): Путь к файлу.
+            name (str): Имя переменной.
+            var_type (str): Тип переменной.
+            value (Any): Значение в виде текста файла FL.
+        """
+        path = os.path.abspath(file_path)
+        if self.parser.journal is not None:
+            self.journal_entries.setdefault(path, {})[name] = f"{name}({var_type}) = {value}"
+            return
+        if self.can_patch(path):
+            self.appends.setdefault(path, {})[name] = f"{name}({var_type}) = {value}"
+            return
+        lines = self.lines(path, missing_ok=True)
+        lines.append("\n")
+        lines.append(f"{name}({var_type}) = {value}\n")
+        self.dirty.add(path)
+
+    def remove_var(self, file_path: str, name: str) -> None:
+        """
+        Удаляет объявления переменной из файла.
+
+        Параметры:
+            file_path (str): Путь к файлу.
+            name (str): Имя переменной.
+        """
+        path = os.path.abspath(file_path)
+        if self.parser.journal is not None:
+            self.journal_entries.setdefault(path, {})[name] = None
+            return
+        if self.can_patch(path):
+            appended = self.appends.get(path, {})
+            if name in appended:
+                del appended[name]
+            elif name in self.parser.file_spans(path):
+                self.patches.setdefault(path, {})[name] = None
+            return
+        pattern = re.compile(rf'{re.escape(name)}\((\w+)\) = (.+)')
+        lines = self.lines(path)
+        kept = [line for line in lines if not pattern.match(line.strip())]
+        if len(kept) != len(lines):
+            lines[:] = kept
+            self.dirty.add(path)
+
+    def commit(self) -> None:
+        """
+        Записывает все измененные файлы, каждый ровно один раз.
+
+        По умолчанию файлы перезаписываются атомарно через временный файл.
+        Если у парсера включен режим in_place_edits, замены диапазонов
+        записываются прямо в файл: перезаписывается только часть файла
+        начиная с первого изменения, а при совпадении длин - только сами диапазоны.
+        С журналом изменений изменения дописываются в журналы (см. commit_journal).
+        После записи публикуется снимок с измененными значениями. Файлы
+        к этому моменту уже заменены, поэтому ошибка публикации (например,
+        при записи общего файла) не отменяет транзакцию, а сообщается через
+        logging; общий файл обновится при следующей публикации.
+        """
+        if self.journal_entries:
+            self.commit_journal()
+        paths = [path for path in self.patches.keys() | self.appends.keys()
+                 if self.patches.get(path) or self.appends.get(path)]
+        contents: Dict[str, bytes] = {path: ''.join(self.files[path]).encode('utf-8') for path in self.dirty}
+        results: Dict[str, PatchResult] = {}
+        for path in paths:
+            if self.parser.in_place_edits:
+                results[path] = self.patch_in_place(path)
+            else:
+                with open(path, 'rb') as file:
+                    contents[path], results[path] = self.apply(path, file.read(), 0)
+        atomic_write_many(contents)
+
+        for path in self.dirty:
+            self.parser.spans.pop(path, None)
+        for path, result in results.items():
+            self.reindex(path, result)
+            stat = os.stat(path)
+            self.parser.file_states[path] = (stat.st_mtime_ns, stat.st_size)
+        self.dirty.clear()
+        self.patches.clear()
+        self.appends.clear()
+        try:
+            self.parser.publish(self.saved)
+        except Exception:
+            logger.exception("Не удалось опубликовать изменения транзакции")
+
+    def apply(self, path: str, buffer: bytes, base: int) -> Tuple[bytes, PatchResult]:
+        """
+        Применяет накопленные замены к содержимому файла (см. patch_content).
+
+        Параметры:
+            path (str): Абсолютный путь к файлу.
+            buffer (bytes): Содержимое файла начиная со смещения base.
+            base (int): Смещение начала buffer в файле.
+
+        Возврат:
+            Tuple[bytes, PatchResult]: Новое содержимое начиная с base
+                и сведения для обновления индекса диапазонов.
+        """
+        return patch_content(self.parser.file_spans(path), self.patches.get(path, {}),
+                             self.appends.get(path, {}), buffer, base)
+
+    def patch_in_place(self, path: str) -> PatchResult:
+        """
+        Заменяет диапазоны объявлений прямо в файле.
+
+        Читается и перезаписывается только часть файла начиная с первого
+        изменения; если длина каждой замены совпадает с длиной исходного
+        объявления, перезаписываются только сами диапазоны.
+
+        Параметры:
+            path (str): Абсолютный путь к файлу.
+
+        Возврат:
+            PatchResult: Сведения для обновления индекса диапазонов.
+        """
+        spans = self.parser.file_spans(path)
+        patches = self.patches.get(path, {})
+        current = {name: spans[name] for name in patches}
+        with open(path, 'r+b') as file:
+            if not self.appends.get(path) and all(
+                    declaration is not None and len(declaration.encode('utf-8')) == current[name][1] - current[name][0]
+                    for name, declaration in patches.items()):
+                for name, declaration in patches.items():
+                    file.seek(current[name][0])
+                    file.write(declaration.encode('utf-8'))
+                return current, dict(patches), {}
+            base = min((start for start, _ in current.values()), default=None)
+            if base is None:
+                base = file.seek(0, os.SEEK_END)
+            else:
+                file.seek(max(0, base - 256))
+                indent = file.read(base - file.tell()).rpartition(b'\n')[2]
+                if not indent.strip():
+                    base -= len(indent)
+            file.seek(base)
+            content, result = self.apply(path, file.read(), base)
+            file.seek(base)
+            file.write(content)
+            file.truncate()
+        return result
+
+    def commit_journal(self) -> None:
+        """
+        Дописывает изменения в журналы файлов-владельцев и обновляет
+        объявления парсера так, как если бы файлы были перезаписаны.
+
+        Каждый файл получает одну запись журнала, поэтому изменения
+        одного файла применяются при чтении целиком или не применяются
+        вовсе; изменения разных файлов фиксируются по отдельности.
+        """
+        parser = self.parser
+        journal = parser.journal
+        for path, entries in self.journal_entries.items():
+            journal_path = journal.path_for(path)
+            state = parser.file_states.get(journal_path)
+            size, stat = journal.append(path, entries)
+            # Если журнал не менялся с момента чтения, изменения других
+            # процессов не пропущены и перезагружать файл не нужно.
+            if state is not None and state[1] == size:
+                parser.file_states[journal_path] = (stat.st_mtime_ns, stat.st_size)
+            spans = parser.file_spans(path)
+            if spans is None:
+                continue
+            # Диапазоны байт в режиме журнала не используются для записи;
+            # индекс обновляется ради объявлений синтаксического дерева.
+            new_spans: Dict[str, Optional[Tuple[int, int]]] = {}
+            written: Dict[str, str] = {}
+            for name, declaration in entries.items():
+                if declaration is not None:
+                    new_spans[name] = (0, len(declaration.encode('utf-8')))
+                    written[name] = declaration
+                elif name in spans:
+                    new_spans[name] = None
+            self.reindex(path, (new_spans, written, dict.fromkeys(new_spans, 0)))
+        self.journal_entries.clear()
+
+    def reindex(self, path: str, result: PatchResult) -> None:
+        """
+        Обновляет индекс диапазонов и объявления парсера после записи файла.
+
+        Параметры:
+            path (str): Абсолютный путь к файлу.
+            result (PatchResult): Сведения, полученные при записи файла.
+        """
+        parser = self.parser
+        new_spans, written, deltas = result
+        spans = parser.file_spans(path)
+        for name, span in new_spans.items():
+            previous = spans.statement(name)
+            if span is None:
+                spans.remove(name, deltas[name])
+                if parser.graph is not None and name not in parser.declarations:
+                    parser.graph.remove(name)
+                continue
+            line = previous.line if previous is not None else 0
+            statement = parse_module(written[name], path).statements[0]._replace(
+                line=line, start=span[0], end=span[1])
+            if previous is None:
+                spans.append(name, span[0], span[1], statement)
+            else:
+                spans.replace(name, span[1] - span[0], statement, deltas.get(name, 0))
+            current = parser.declarations.get(name)
+            if current is None or current is previous:
+                parser.declarations[name] = statement
+                parser.owners[name] = path
+                if parser.graph is not None:
+                    parser.graph.set_dependencies(name, references(statement.value))
+
+    def rollback(self) -> None:
+        """
+        Отменяет изменения переменных в памяти парсера; файлы не изменяются.
+        """
+        parser = self.parser
+        data = parser.data
+        pending = parser.pending
+        key_index = parser.key_index
+        for name, (variable, value, statement, declaration, owner) in self.saved.items():
+            if variable is None:
+                data.pop(name, None)
+            else:
+                variable.set_value(value)
+                data[name] = variable
+            if statement is not None:
+                pending[name] = statement
+            if declaration is None:
+                parser.declarations.pop(name, None)
+                parser.owners.pop(name, None)
+            else:
+                parser.declarations[name] = declaration
+                parser.owners[name] = owner
+            if parser.graph is not None:
+                if name in parser.declarations or name in parser.constant_declarations:
+                    parser.graph.set_dependencies(name, parser.declaration_references(name))
+                else:
+                    parser.graph.remove(name)
+            if key_index is not None:
+                if name in data or name in pending:
+                    key_index.add(name)
+                else:
+                    key_index.discard(name)
+        self.saved.clear()
+        self.dirty.clear()
+        self.files.clear()
+        self.patches.clear()
+        self.appends.clear()
+        self.journal_entries.clear()
@@ -1,4 +1,39 @@
-from typing import Any
+from array import array
+from types import MappingProxyType
+from typing import Any, Callable, Dict
+
+# Функции копирования значения по типу переменной.
+_COPY: Dict[str, Callable[[Any], Any]] = {
+    'list': list,
+    'dict': dict,
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'set': set,
+    'tuple': tuple,
+}
+# Неизменяемые типы значений: копирование возвращает тот же объект.
+_IMMUTABLE: Dict[str, type] = {'str': str, 'int': int, 'float': float, 'bool': bool, 'tuple': tuple}
+# Функции построения представления только для чтения для изменяемых типов.
+_FREEZE: Dict[str, Callable[[Any], Any]] = {
+    'list': tuple,
+    'dict': MappingProxyType,
+    'set': frozenset,
+}
+
+
+def _readonly_array(value: Any) -> Any:
+    """
+    Возвращает представление числового массива только для чтения без копирования:
+    memoryview для array.array и представление с запретом записи для numpy.ndarray.
+    """
+    if isinstance(value, array):
+        return memoryview(value).toreadonly()
+    view = value.view()
+    view.flags.writeable = False
+    return view
+
 
 class Variable:
     """
@@ -8,6 +43,8 @@ class Variable:
         type (str): Тип переменной (например, 'str', 'int', 'float', 'bool', 'list').
         value (Any): Значение переменной.
     """
+    __slots__ = ('type', 'value', '_view')
+
     def __init__(self, var_type: str, value: Any):
         """
         Инициализация переменной.
@@ -18,6 +55,7 @@ class Variable:
         """
         self.type = var_type
         self.value = value
+        self._view = None
 
     def set_value(self, value: Any) -> None:
         """
@@ -27,6 +65,7 @@ class Variable:
             value (Any): Новое значение переменной.
         """
         self.value = value
+        self._view = None
 
     def get_type(self) -> str:
         """
@@ -39,28 +78,41 @@ class Variable:
 
     def get_value(self):
         """
-        Возвращает переменную.
+        Возвращает копию значения переменной, приведенную к ее типу.
+
+        Значения неизменяемых типов, уже имеющие нужный тип, не копируются.
+        Числовой массив (Parser(numeric_arrays=...)) возвращается обычным списком.
 
         Возврат:
-            Переменная с ее типом 
+            Значение переменной.
+        """
+        value = self.value
+        if type(value) is _IMMUTABLE.get(self.type):
+            return value
+        if self.type == 'list' and hasattr(value, 'tolist'):
+            return value.tolist()
+        copy = _COPY.get(self.type)
+        return value if copy is None else copy(value)
+
+    def get_view(self) -> Any:
         """
+        Возвращает значение переменной без копирования, только для чтения.
 
-        value_type = self.get_type()
-        if value_type == 'list':
-            return list(self.value)
-        elif value_type == 'dict':
-            return dict(self.value)
-        elif value_type == 'str':
-            return str(self.value)
-        elif value_type == 'int':
-            return int(self.value)
-        elif value_type == 'float':
-            return float(self.value)
-        elif value_type == 'bool':
-            return bool(self.value)
-        elif value_type == 'set':
-            return set(self.value)
-        elif value_type == 'tuple':
-            return tuple(self.value) 
-        else:
-            return self.value
\ No newline at end of file
+        Список возвращается как кортеж, множество - как frozenset, словарь -
+        как MappingProxyType поверх самого словаря, числовой массив - как
+        memoryview или массив NumPy только для чтения. Представление строится
+        при первом обращении и используется повторно до следующего set_value;
+        вложенные коллекции не замораживаются.
+
+        Возврат:
+            Any: Значение переменной или его представление только для чтения.
+        """
+        view = self._view
+        if view is None:
+            freeze = _FREEZE.get(self.type)
+            if self.type == 'list' and hasattr(self.value, 'tolist'):
+                freeze = _readonly_array
+            elif freeze is None or not isinstance(self.value, (list, dict, set)):
+                return self.value
+            view = self._view = freeze(self.value)
+        return view
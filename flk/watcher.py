@@ -0,0 +1,112 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from flk.parser import Parser
+
+logger = logging.getLogger(__name__)
+
+
+class Watcher:
+    """
+    Фоновое отслеживание изменений файлов FL с горячей перезагрузкой.
+
+    Watcher периодически проверяет время изменения и размер всех прочитанных
+    парсером файлов и вызывает Parser.reload, когда какой-либо из них изменился.
+
+    Атрибуты:
+        parser (Parser): Отслеживаемый парсер.
+        interval (float): Интервал опроса в секундах.
+        callback (Optional[Callable[[List[str]], None]]): Функция, получающая
+            имена изменившихся переменных после каждой перезагрузки.
+        on_error (Optional[Callable[[Exception], None]]): Функция, получающая
+            исключение, если перезагрузка не удалась; без нее ошибка
+            сообщается через logging. В обоих случаях опрос продолжается.
+    """
+    def __init__(self, parser: 'Parser', interval: float = 1.0,
+                 callback: Optional[Callable[[List[str]], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        Инициализация наблюдателя.
+
+        Параметры:
+            parser (Parser): Отслеживаемый парсер.
+            interval (float): Интервал опроса в секундах.
+            callback (Optional[Callable[[List[str]], None]]): Функция для имен изменившихся переменных.
+            on_error (Optional[Callable[[Exception], None]]): Функция для ошибок перезагрузки.
+        """
+        self.parser = parser
+        self.interval = interval
+        self.callback = callback
+        self.on_error = on_error
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def poll(self) -> List[str]:
+        """
+        Проверяет файлы один раз и перезагружает изменившиеся.
+
+        Перезагрузка выполняется под блокировкой парсера. Пока идет
+        транзакция, проверка пропускается: файлы, которые она записывает,
+        будут проверены при следующем опросе.
+
+        Возврат:
+            List[str]: Имена изменившихся переменных и констант.
+        """
+        parser = self.parser
+        if not parser.transaction_lock.acquire(blocking=False):
+            return []
+        try:
+            if parser.active_transaction is not None:
+                return []
+            changed = parser.reload()
+        finally:
+            parser.transaction_lock.release()
+        if changed and self.callback is not None:
+            self.callback(changed)
+        return changed
+
+    def run(self) -> None:
+        """
+        Цикл опроса, выполняемый в фоновом потоке до вызова stop.
+
+        Ошибка перезагрузки не останавливает поток: состояние парсера
+        остается прежним, а файлы проверяются снова при следующем опросе.
+        """
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as error:
+                if self.on_error is None:
+                    logger.exception("Не удалось перезагрузить файлы FL")
+                else:
+                    self.on_error(error)
+
+    def start(self) -> 'Watcher':
+        """
+        Запускает фоновый поток опроса.
+
+        Возврат:
+            Watcher: Этот же наблюдатель.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name='flk-watcher', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновый поток опроса.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> 'Watcher':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()